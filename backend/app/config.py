@@ -12,16 +12,154 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY is not set! Please set it in your environment or .env file.")
 
+# Where chunk and query embeddings are computed: "groq" (embeddings API) or
+# "local" (sentence-transformers on this machine's CPU, see below)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "groq")
+
+# Embedding model used for both chunk and query embeddings. Changing provider or
+# model changes the vector space: re-ingest documents afterwards.
+EMBEDDING_MODEL = os.getenv(
+    "EMBEDDING_MODEL",
+    "nomic-ai/nomic-embed-text-v1.5" if EMBEDDING_PROVIDER == "local" else "nomic-embed-text-v1.5"
+)
+
+# -----------------------------
+# Shared HTTP client (Groq REST calls)
+# -----------------------------
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # keep-alive connections per worker
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))       # seconds
+HTTP_USE_HTTP2 = os.getenv("HTTP_USE_HTTP2", "1") == "1"  # only if httpx + h2 are installed
+# OpenAI-compatible endpoint for embeddings and chat completions
+GROQ_API_BASE = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+
+# -----------------------------
+# Embedding requests
+# -----------------------------
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "128"))
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "8000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # in-flight requests per process
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "0.5"))  # seconds
+EMBED_BACKOFF_MAX = float(os.getenv("EMBED_BACKOFF_MAX", "30"))     # seconds
+
+# -----------------------------
+# Local embeddings (EMBEDDING_PROVIDER=local)
+# -----------------------------
+# "torch", "torch-int8" (dynamic int8 quantization of the linear layers) or "onnx"
+LOCAL_EMBED_RUNTIME = os.getenv("LOCAL_EMBED_RUNTIME", "torch")
+# ONNX file in the model repo, e.g. onnx/model_quantized.onnx for int8 weights
+LOCAL_EMBED_ONNX_FILE = os.getenv("LOCAL_EMBED_ONNX_FILE", "")
+LOCAL_EMBED_THREADS = int(os.getenv("LOCAL_EMBED_THREADS", "0"))  # CPU threads per inference, 0 = runtime default
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "32"))
+
+# -----------------------------
+# Query embedding cache
+# -----------------------------
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+QUERY_EMBED_CACHE_TTL = int(os.getenv("QUERY_EMBED_CACHE_TTL", str(24 * 3600)))  # seconds
+# SQLite file for the on-disk tier; leave empty to keep the cache in memory only
+QUERY_EMBED_CACHE_PATH = os.getenv("QUERY_EMBED_CACHE_PATH", "")
+
+# -----------------------------
+# Semantic answer cache
+# -----------------------------
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+# Minimum cosine similarity between query embeddings to reuse an answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
 # -----------------------------
 # MongoDB config
 # -----------------------------
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongo:27017/ragdb")
 DB_NAME = "ragdb"
+# /metadata page size (default and upper bound)
+METADATA_PAGE_SIZE = int(os.getenv("METADATA_PAGE_SIZE", "50"))
+METADATA_MAX_PAGE_SIZE = int(os.getenv("METADATA_MAX_PAGE_SIZE", "500"))
+# Chunk metadata rows per insert_many call
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "1000"))
 
 # -----------------------------
 # Chroma Vector DB
 # -----------------------------
 VECTOR_DB_DIR = os.getenv("VECTOR_DB_DIR", "./vector_db")
+VECTOR_COLLECTION = os.getenv("VECTOR_COLLECTION", "rag_collection")
+# Run one query at startup so the on-disk index is loaded before the first request
+VECTOR_WARMUP = os.getenv("VECTOR_WARMUP", "1") == "1"
+# Number of chunks written to the vector store per collection.upsert call
+VECTOR_BATCH_SIZE = int(os.getenv("VECTOR_BATCH_SIZE", "1000"))
+
+# Vector engine: "chroma" or "numpy" (exact search over an in-memory matrix)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# Row storage for the numpy backend: "float32", or "float16" to halve memory
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")
+
+# FAISS backend: "flat", "ivf_flat", "ivf_pq" or "hnsw"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "ivf_flat")
+# IVF lists (0 = ~4*sqrt(n) at training time)
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))
+FAISS_PQ_BITS = int(os.getenv("FAISS_PQ_BITS", "8"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+# IVF indexes are trained once this many vectors exist; exact search until then
+FAISS_MIN_TRAIN = int(os.getenv("FAISS_MIN_TRAIN", "10000"))
+# Default recall/latency knobs, overridable per query
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# IVF-PQ candidates per result, re-ranked with the exact stored vectors
+FAISS_REFINE = int(os.getenv("FAISS_REFINE", "4"))
+# Filtered queries selecting at most this many vectors skip the index and run exactly
+FAISS_FILTER_EXACT_MAX = int(os.getenv("FAISS_FILTER_EXACT_MAX", "20000"))
+# Save the index after this many new vectors; load it memory-mapped
+FAISS_SAVE_EVERY = int(os.getenv("FAISS_SAVE_EVERY", "10000"))
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") == "1"
+
+# Deleted vectors and BM25 postings are tombstoned, then purged by a background
+# compactor once tombstones make up this share of an index (and number at least
+# COMPACT_MIN_TOMBSTONES); checked every COMPACT_INTERVAL seconds (0 = never)
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("COMPACT_TOMBSTONE_RATIO", "0.2"))
+COMPACT_MIN_TOMBSTONES = int(os.getenv("COMPACT_MIN_TOMBSTONES", "1000"))
+COMPACT_INTERVAL = int(os.getenv("COMPACT_INTERVAL", "60"))
+
+# --- Retrieval ---
+# Chunks retrieved per /query request by default, and the most a request may ask for
+QUERY_TOP_K = int(os.getenv("QUERY_TOP_K", "3"))
+QUERY_MAX_TOP_K = int(os.getenv("QUERY_MAX_TOP_K", "20"))
+# /query/batch: most questions per request, and chat completions in flight per process
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "500"))
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "8"))
+# "hybrid" (BM25 + dense, fused by reciprocal rank), "dense" or "lexical"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Candidates taken from each retriever per requested result before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# MMR diversification: retrieve top_k * MMR_CANDIDATES chunks, then pick top_k by
+# maximal marginal relevance. MMR_LAMBDA weighs relevance to the question (1.0)
+# against novelty w.r.t. chunks already picked (0.0); chunks less similar to the
+# question than MMR_MIN_SCORE (cosine, 0 = off) are dropped. Overridable per request.
+MMR_ENABLED = os.getenv("MMR_ENABLED", "1") == "1"
+MMR_CANDIDATES = int(os.getenv("MMR_CANDIDATES", "4"))
+MMR_MAX_CANDIDATES = int(os.getenv("MMR_MAX_CANDIDATES", "10"))  # per-request upper bound
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_MIN_SCORE = float(os.getenv("MMR_MIN_SCORE", "0"))
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(VECTOR_DB_DIR, "lexical_index.jsonl"))
+
+# --- Context packing ---
+# Merge adjacent retrieved chunks, drop the text their overlap repeats and trim
+# the prompt context to CONTEXT_MAX_TOKENS (0 = no limit). The default leaves
+# room in an 8k window for the system prompt, question and 1000-token answer.
+# CONTEXT_PACKING=0 sends the raw top-k chunks instead.
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1") == "1"
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "6000"))
+
+# -----------------------------
+# Async (FastAPI) app
+# -----------------------------
+# Upstream connections per event loop; one in-flight query holds one (HTTP/1.1)
+ASYNC_HTTP_POOL_SIZE = int(os.getenv("ASYNC_HTTP_POOL_SIZE", "100"))
+# Threads running blocking vector/BM25 searches and Mongo-backed deletes for the event loop
+ASYNC_SEARCH_THREADS = int(os.getenv("ASYNC_SEARCH_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
 
 # -----------------------------
 # Flask Upload Settings
@@ -30,5 +168,31 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max per file
 ALLOWED_EXTENSIONS = {"pdf", "txt", "docx"}
+
+# -----------------------------
+# Chunking
+# -----------------------------
+# "tokens": sentence-aware chunks sized in tokens; "chars": fixed character windows
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "tokens")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))        # chars strategy
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))   # chars strategy
+
+# -----------------------------
+# Background ingestion jobs
+# -----------------------------
+# Jobs in flight at once; each one waits on the ingestion pipeline below
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "8"))
+# Running jobs whose lease was not renewed for this long are assumed orphaned and re-queued
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+# How often a worker renews the lease of the jobs it runs; keep well below JOB_STALE_SECONDS
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+
+# Concurrent extract -> embed -> write pipeline (set INGEST_PIPELINE=0 to ingest serially)
+INGEST_PIPELINE = os.getenv("INGEST_PIPELINE", "1") == "1"
+EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES", str(os.cpu_count() or 1)))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
 print("✅ GROQ_API_KEY loaded:", bool(GROQ_API_KEY))
 
@@ -111,6 +111,9 @@ import os
 from app.routes.upload import upload_bp
 from app.routes.query import query_bp
 from app.routes.metadata import metadata_bp
+from app.routes import metadata as metadata_routes
+from app.routes.metrics import metrics_bp
+from app.services import jobs, corpus_version, compactor
 
 app = Flask(__name__)
 CORS(app)  # Allow frontend to communicate
@@ -125,13 +128,25 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.register_blueprint(upload_bp, url_prefix="/upload", strict_slashes=False) 
 app.register_blueprint(query_bp, url_prefix="/query", strict_slashes=False)
 app.register_blueprint(metadata_bp, url_prefix="/metadata", strict_slashes=False) 
+app.register_blueprint(metrics_bp, url_prefix="/metrics", strict_slashes=False)
+
+# ---------------- MongoDB Indexes ----------------
+db_models.ensure_indexes()
+
+# ---------------- Background Ingestion ----------------
+# Resume jobs that were queued (or orphaned mid-run) before the last restart
+jobs.recover()
+
+# ---------------- Background Compaction ----------------
+# Purge deleted (tombstoned) vectors once they pass COMPACT_TOMBSTONE_RATIO
+compactor.start()
 
 # ---------------- Home Route ----------------
 @app.route("/", methods=["GET"])
 def home():
     return jsonify({
         "message": "✅ Backend is running.",
-        "routes": ["/upload (POST)", "/metadata (GET)", "/query (POST)"] # Removed /ask for cleaner structure
+        "routes": ["/upload (POST)", "/upload/jobs/<job_id> (GET)", "/metadata (GET)", "/metadata/export (GET)", "/metadata/<doc_id> (DELETE)", "/query (POST)", "/query/batch (POST)", "/metrics (GET)"] # Removed /ask for cleaner structure
     }), 200
 
 # ---------------- File Upload (Legacy/Root Handlers) ----------------
@@ -158,16 +173,15 @@ def upload_file():
         file_size=os.path.getsize(filepath),
         doc_id=doc_id
     )
+    corpus_version.bump()  # the document list changed
 
     return jsonify({"message": "✅ File uploaded successfully", "filename": file.filename}), 200
 
 @app.route("/metadata", methods=["GET"])
 def get_metadata():
+    # Same paginated, cacheable listing as the metadata blueprint
     try:
-        docs = db_models.get_all_doc()
-        if not docs:
-            return jsonify({"message": "No documents found", "data": []}), 200
-        return jsonify(docs), 200
+        return metadata_routes.metadata()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
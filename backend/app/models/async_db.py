@@ -0,0 +1,56 @@
+# backend/app/models/async_db.py
+"""
+Async MongoDB access for the FastAPI app (rag_backend.py), using PyMongo's
+native asyncio client. Queries are built by the helpers in db_models so both
+apps read and write the same documents the same way.
+"""
+from pymongo import AsyncMongoClient
+
+import app.config as config
+from app.models.db_models import DOCUMENT_ORDER, documents_page, new_job
+
+# Connects lazily, on the event loop of the first query
+client = AsyncMongoClient(config.MONGO_URI)
+db = client[config.DB_NAME]
+
+documents_collection = db.documents
+jobs_collection = db.jobs
+
+
+def find_documents(query=None, fields=None, after=None, limit=50):
+    """
+    Async cursor over document metadata, newest first (see db_models.find_documents).
+    """
+    query, projection = documents_page(query, fields, after)
+    cursor = documents_collection.find(query, projection).sort(DOCUMENT_ORDER)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+async def get_document(doc_id):
+    """
+    Metadata of one document without MongoDB _id, or None.
+    """
+    return await documents_collection.find_one({"doc_id": doc_id}, {"_id": 0})
+
+
+async def create_job(job_id, filename, filepath, doc_id=None):
+    """
+    Persist a queued ingestion job (see db_models.create_job).
+    """
+    job = new_job(job_id, filename, filepath, doc_id=doc_id)
+    await jobs_collection.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+
+async def get_job(job_id):
+    """
+    Retrieve one job without MongoDB _id, or None.
+    """
+    return await jobs_collection.find_one({"job_id": job_id}, {"_id": 0})
+
+
+async def close():
+    await client.close()
@@ -1,6 +1,8 @@
 # backend/app/models/db_models.py
+import re
 import app.config as config  # Absolute import
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 from datetime import datetime
 
 # MongoDB client
@@ -10,6 +12,22 @@ db = client[config.DB_NAME]
 # Collections
 documents_collection = db.documents
 chunks_collection = db.chunks
+jobs_collection = db.jobs
+
+# Duplicate key error code
+DUPLICATE_KEY = 11000
+
+def ensure_indexes():
+    """
+    Create the indexes every lookup relies on. Idempotent; called at startup.
+    """
+    documents_collection.create_index([("doc_id", ASCENDING)])
+    documents_collection.create_index([("created_at", DESCENDING), ("doc_id", DESCENDING)])
+    chunks_collection.create_index([("chunk_id", ASCENDING)], unique=True)
+    chunks_collection.create_index([("doc_id", ASCENDING), ("position", ASCENDING)])
+    jobs_collection.create_index([("job_id", ASCENDING)], unique=True)
+    jobs_collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+    jobs_collection.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
 
 def insert_document_metadata(filename, filepath, num_chunks, file_size, doc_id):
     """
@@ -25,6 +43,31 @@ def insert_document_metadata(filename, filepath, num_chunks, file_size, doc_id):
     }
     documents_collection.insert_one(doc)
 
+def upsert_document_metadata(filename, filepath, num_chunks, file_size, doc_id):
+    """
+    Create or update the metadata of a document with a stable doc_id.
+    created_at is kept from the first ingest; updated_at marks the latest.
+
+    Returns:
+        True if the document already existed
+    """
+    now = datetime.utcnow()
+    res = documents_collection.update_one(
+        {"doc_id": doc_id},
+        {
+            "$set": {
+                "filename": filename,
+                "filepath": filepath,
+                "num_chunks": num_chunks,
+                "file_size": file_size,
+                "updated_at": now
+            },
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )
+    return res.upserted_id is None
+
 def insert_chunk_metadata(doc_id, chunk_id, text):
     """
     Insert a chunk's metadata into MongoDB.
@@ -37,6 +80,84 @@ def insert_chunk_metadata(doc_id, chunk_id, text):
     }
     chunks_collection.insert_one(chunk)
 
+def insert_chunks_metadata(chunks, batch_size=None):
+    """
+    Bulk insert chunk metadata with unordered insert_many calls.
+
+    Chunk text is not stored here: it lives once in the vector store, and
+    `chunk_id` is the reference to it. Chunks that already exist (duplicate
+    chunk_id, e.g. a retried job) are skipped.
+
+    Returns:
+        number of chunks inserted
+    """
+    batch_size = batch_size or config.MONGO_BATCH_SIZE
+    now = datetime.utcnow()
+    rows = [
+        {
+            "chunk_id": c["chunk_id"],
+            "doc_id": c["doc_id"],
+            "content_hash": c.get("content_hash"),
+            "position": c.get("position"),
+            "created_at": now
+        }
+        for c in chunks
+    ]
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        try:
+            inserted += len(chunks_collection.insert_many(rows[start:start + batch_size], ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            inserted += e.details.get("nInserted", 0)
+    return inserted
+
+def get_document_chunks(doc_id):
+    """
+    Stored chunks of a document: chunk_id, content_hash and position.
+    """
+    return list(chunks_collection.find(
+        {"doc_id": doc_id}, {"_id": 0, "chunk_id": 1, "content_hash": 1, "position": 1}
+    ))
+
+def update_chunk_positions(chunks, batch_size=None):
+    """
+    Bulk update the position of chunks whose content moved within a document.
+    """
+    batch_size = batch_size or config.MONGO_BATCH_SIZE
+    ops = [UpdateOne({"chunk_id": c["chunk_id"]}, {"$set": {"position": c["position"]}}) for c in chunks]
+    for start in range(0, len(ops), batch_size):
+        chunks_collection.bulk_write(ops[start:start + batch_size], ordered=False)
+
+def delete_chunks_metadata(chunk_ids, batch_size=None):
+    """
+    Bulk delete chunk metadata by chunk_id.
+
+    Returns:
+        number of chunks deleted
+    """
+    batch_size = batch_size or config.MONGO_BATCH_SIZE
+    chunk_ids = list(chunk_ids)
+    deleted = 0
+    for start in range(0, len(chunk_ids), batch_size):
+        res = chunks_collection.delete_many({"chunk_id": {"$in": chunk_ids[start:start + batch_size]}})
+        deleted += res.deleted_count
+    return deleted
+
+def get_document(doc_id):
+    """
+    Metadata of one document without MongoDB _id, or None.
+    """
+    return documents_collection.find_one({"doc_id": doc_id}, {"_id": 0})
+
+def delete_document_metadata(doc_id):
+    """
+    Delete a document's metadata row(s). Returns the number deleted.
+    """
+    return documents_collection.delete_many({"doc_id": doc_id}).deleted_count
+
 def get_all_doc():
     """
     Retrieve all document metadata from MongoDB.
@@ -45,3 +166,148 @@ def get_all_doc():
     """
     docs = list(documents_collection.find({}, {"_id": 0}))
     return docs
+
+# Fields /metadata may project
+DOCUMENT_FIELDS = ("doc_id", "filename", "filepath", "num_chunks", "file_size", "created_at", "updated_at")
+
+def document_filter(filename=None, created_after=None, created_before=None):
+    """
+    Mongo query for documents whose filename contains `filename`
+    (case-insensitive) and that were created in [created_after, created_before).
+    """
+    query = {}
+    if filename:
+        query["filename"] = {"$regex": re.escape(filename), "$options": "i"}
+    if created_after or created_before:
+        query["created_at"] = {}
+        if created_after:
+            query["created_at"]["$gte"] = created_after
+        if created_before:
+            query["created_at"]["$lt"] = created_before
+    return query
+
+# Newest first; matches the (created_at, doc_id) index
+DOCUMENT_ORDER = [("created_at", DESCENDING), ("doc_id", DESCENDING)]
+
+def documents_page(query=None, fields=None, after=None):
+    """
+    (filter, projection) for find_documents; shared with the async client.
+    """
+    query = dict(query or {})
+    if after:
+        created_at, doc_id = after
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "doc_id": {"$lt": doc_id}}
+        ]}]}
+    projection = {"_id": 0, "created_at": 1, "doc_id": 1}
+    for field in fields or DOCUMENT_FIELDS:
+        projection[field] = 1
+    return query, projection
+
+def find_documents(query=None, fields=None, after=None, limit=50):
+    """
+    Cursor over document metadata, newest first, using the
+    (created_at, doc_id) index.
+
+    Args:
+        query: filter from document_filter
+        fields: fields to return (created_at and doc_id are always included,
+            since they form the page cursor)
+        after: (created_at, doc_id) of the last document of the previous page
+        limit: page size (0 = no limit, e.g. for streaming exports)
+    """
+    query, projection = documents_page(query, fields, after)
+    cursor = documents_collection.find(query, projection).sort(DOCUMENT_ORDER)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+# -----------------------------
+# Ingestion jobs
+# -----------------------------
+def new_job(job_id, filename, filepath, doc_id=None):
+    """
+    Job document in its initial queued state.
+    """
+    now = datetime.utcnow()
+    return {
+        "job_id": job_id,
+        "filename": filename,
+        "filepath": filepath,
+        "doc_id": doc_id,
+        "status": "queued",
+        "stage": "queued",
+        "owner": None,
+        "chunks_done": 0,
+        "chunks_total": None,
+        "error": None,
+        "result": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+def create_job(job_id, filename, filepath, doc_id=None):
+    """
+    Persist a queued ingestion job. `doc_id` is the caller-supplied document
+    identity (None = derived from the filename).
+    """
+    job = new_job(job_id, filename, filepath, doc_id=doc_id)
+    jobs_collection.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+def claim_job(job_id, owner=None):
+    """
+    Atomically move a queued job to running under `owner` (the claiming
+    process). Returns the job, or None if another worker already claimed it.
+    """
+    now = datetime.utcnow()
+    job = jobs_collection.find_one_and_update(
+        {"job_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "stage": "starting", "owner": owner, "started_at": now, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is not None:
+        job.pop("_id", None)
+    return job
+
+def update_job(job_id, **fields):
+    """
+    Update job fields (stage, progress, status, error, result).
+    """
+    fields["updated_at"] = datetime.utcnow()
+    jobs_collection.update_one({"job_id": job_id}, {"$set": fields})
+
+def get_job(job_id):
+    """
+    Retrieve one job without MongoDB _id, or None.
+    """
+    return jobs_collection.find_one({"job_id": job_id}, {"_id": 0})
+
+def heartbeat_jobs(job_ids, owner):
+    """
+    Renew the lease (updated_at) of running jobs still held by `owner`.
+    Returns the number renewed.
+    """
+    res = jobs_collection.update_many(
+        {"job_id": {"$in": list(job_ids)}, "status": "running", "owner": owner},
+        {"$set": {"updated_at": datetime.utcnow()}}
+    )
+    return res.modified_count
+
+def requeue_stale_jobs(stale_before):
+    """
+    Put jobs left running by a dead worker (lease not renewed since `stale_before`) back in the queue.
+    """
+    res = jobs_collection.update_many(
+        {"status": "running", "updated_at": {"$lt": stale_before}},
+        {"$set": {"status": "queued", "stage": "queued", "owner": None, "updated_at": datetime.utcnow()}}
+    )
+    return res.modified_count
+
+def get_queued_job_ids():
+    """
+    Ids of all queued jobs, oldest first.
+    """
+    return [j["job_id"] for j in jobs_collection.find({"status": "queued"}, {"job_id": 1}).sort("created_at", 1)]
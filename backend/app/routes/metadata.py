@@ -1,10 +1,182 @@
 # backend/app/routes/metadata.py
-from flask import Blueprint, jsonify
-from app.models.db_models import get_all_doc  # <-- fixed absolute import
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from datetime import datetime
+import base64
+import json
+
+from app.models.db_models import DOCUMENT_FIELDS, document_filter, find_documents  # <-- fixed absolute import
+from app.services import corpus_version
+import app.config as config
 
 metadata_bp = Blueprint("metadata", __name__)
 
+
+# ---------------- Request parsing ----------------
+def _encode_cursor(doc):
+    raw = json.dumps([doc["created_at"].isoformat(), doc["doc_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), doc_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date")
+
+
+def _parse_fields(args):
+    fields = args.get("fields")
+    if not fields:
+        return list(DOCUMENT_FIELDS)
+    fields = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in DOCUMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(DOCUMENT_FIELDS)})")
+    return fields
+
+
+def _parse_query(args):
+    """
+    Filters shared by the page and export endpoints:
+    ?filename=<substring>&created_after=<iso>&created_before=<iso>&fields=a,b
+    """
+    query = document_filter(
+        filename=args.get("filename"),
+        created_after=_parse_date(args, "created_after"),
+        created_before=_parse_date(args, "created_before")
+    )
+    return query, _parse_fields(args)
+
+
+def _parse_page(args):
+    """
+    (after, limit) of a page request: ?cursor=<next_cursor>&limit=<n>
+    """
+    cursor = args.get("cursor")
+    after = _decode_cursor(cursor) if cursor else None
+    limit = int(args.get("limit", config.METADATA_PAGE_SIZE))
+    if not 1 <= limit <= config.METADATA_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {config.METADATA_MAX_PAGE_SIZE}")
+    return after, limit
+
+
+def _serialize(doc, fields):
+    out = {}
+    for field in fields:
+        value = doc.get(field)
+        out[field] = value.isoformat() if isinstance(value, datetime) else value
+    return out
+
+
+# ---------------- Conditional requests ----------------
+def _validators():
+    """
+    ETag and Last-Modified for the document list. Both come from the corpus
+    version file, so checking them costs a stat() and no Mongo query.
+    """
+    etag = f"corpus-{corpus_version.get_version()}"
+    mtime = corpus_version.get_mtime()
+    last_modified = datetime.utcfromtimestamp(int(mtime)) if mtime else None
+    return etag, last_modified
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and last_modified <= since.replace(tzinfo=None))
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Clients may keep pages but must revalidate them
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# ---------------- Routes ----------------
+@metadata_bp.route("/", methods=["GET"])
 @metadata_bp.route("/metadata", methods=["GET"])
 def metadata():
-    docs = get_all_doc()  # fetch all document metadata
-    return jsonify({"documents": docs}), 200
+    """
+    One page of document metadata, newest first.
+
+    Query params: limit, cursor (next_cursor of the previous page), fields,
+    filename, created_after, created_before.
+    """
+    etag, last_modified = _validators()
+    if _not_modified(etag, last_modified):
+        return _with_validators(Response(status=304), etag, last_modified)
+
+    try:
+        query, fields = _parse_query(request.args)
+        after, limit = _parse_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # One extra row tells whether another page exists
+    docs = list(find_documents(query, fields, after=after, limit=limit + 1))
+    next_cursor = _encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    response = jsonify({
+        "documents": [_serialize(d, fields) for d in docs[:limit]],
+        "next_cursor": next_cursor,
+        "limit": limit
+    })
+    return _with_validators(response, etag, last_modified), 200
+
+
+@metadata_bp.route("/export", methods=["GET"])
+def export():
+    """
+    Stream every matching document as NDJSON (one JSON object per line),
+    reading Mongo in batches instead of building the whole list.
+    """
+    etag, last_modified = _validators()
+    if _not_modified(etag, last_modified):
+        return _with_validators(Response(status=304), etag, last_modified)
+
+    try:
+        query, fields = _parse_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        for doc in find_documents(query, fields, limit=0).batch_size(1000):
+            yield json.dumps(_serialize(doc, fields)) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers["Content-Disposition"] = "attachment; filename=documents.ndjson"
+    return _with_validators(response, etag, last_modified)
+
+
+@metadata_bp.route("/<doc_id>", methods=["DELETE"])
+def delete(doc_id):
+    """
+    Delete a document, its chunks and its vectors. Vectors are tombstoned
+    immediately and physically purged by the background compactor.
+    """
+    # Imported here so listing metadata does not need the vector store loaded
+    from app.services import compactor, ingest
+
+    try:
+        deleted = ingest.delete_document(doc_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if deleted is None:
+        return jsonify({"error": f"Document not found: {doc_id}"}), 404
+
+    compactor.report()
+    return jsonify({"doc_id": doc_id, "chunks_deleted": deleted, "status": "deleted"}), 200
@@ -0,0 +1,9 @@
+# backend/app/routes/metrics.py
+from flask import Blueprint, jsonify
+from app.services import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/", methods=["GET"])
+def get_metrics():
+    return jsonify(metrics.snapshot()), 200
@@ -108,12 +108,19 @@
 #         return jsonify({"answer": f"A critical backend error occurred: {str(e)}"}), 500
 
 # app/routes/query.py
-from flask import Blueprint, request, jsonify
-from app.services.vector_store import search_embeddings
-from app.config import GROQ_API_KEY
-import requests
-import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.services.vector_store import (
+    search_embeddings, dense_search_batch, finish_search, get_text_embedding, get_text_embeddings, build_where
+)
+from app.services import http_client, metrics, corpus_version
+from app.services.chunker import estimate_tokens
+from app.services.context import pack_context
+from app.services.answer_cache import SemanticAnswerCache
 from app.utils import log 
+import app.config as config
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
 
 # FIX 1: Ensure the blueprint is created without a local url_prefix.
 # The prefix is handled by main.py.
@@ -126,7 +133,243 @@ GROQ_MODELS = {
     "mixtral": "mixtral-8x7b-32768"
 }
 
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_CHAT_PATH = "/chat/completions"
+
+SYSTEM_PROMPT = "You are an assistant that answers based on the document context. If you cannot find an answer in the context, politely state that you do not have enough information."
+
+NO_CONTEXT_ANSWER = "⚠️ No relevant content found. Please upload a document first."
+
+# Paraphrased questions against an unchanged corpus reuse earlier answers
+answer_cache = SemanticAnswerCache(
+    max_size=config.ANSWER_CACHE_SIZE,
+    threshold=config.ANSWER_CACHE_THRESHOLD
+)
+
+
+def _resolve_model(model_choice):
+    return GROQ_MODELS.get(model_choice, "llama3-8b-8192")
+
+
+def _retrieval_options(data):
+    """
+    Parse the optional retrieval scope of a query request:
+    `doc_ids` (list of document ids), `filters` (Chroma-style predicates on
+    chunk metadata) and `top_k`. Raises ValueError on malformed input.
+    """
+    doc_ids = data.get("doc_ids")
+    if doc_ids is not None and (
+        not isinstance(doc_ids, list) or not all(isinstance(d, str) for d in doc_ids)
+    ):
+        raise ValueError("doc_ids must be a list of document ids")
+    filters = data.get("filters")
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    try:
+        top_k = int(data.get("top_k", config.QUERY_TOP_K))
+    except (TypeError, ValueError):
+        raise ValueError("top_k must be an integer")
+    if not 1 <= top_k <= config.QUERY_MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {config.QUERY_MAX_TOP_K}")
+    return build_where(doc_ids, filters), top_k
+
+
+def _rerank_options(data):
+    """
+    Parse the optional MMR options of a query request: `mmr` (on/off),
+    `mmr_lambda` (1.0 = relevance only), `mmr_candidates` (chunks retrieved
+    per result) and `min_score` (minimum cosine similarity to the question,
+    null = no cutoff), defaulting to the MMR_* settings. Returns None when
+    MMR is off. Raises ValueError on malformed input.
+    """
+    enabled = data.get("mmr", config.MMR_ENABLED)
+    if not isinstance(enabled, bool):
+        raise ValueError("mmr must be true or false")
+    if not enabled:
+        return None
+    try:
+        lambda_mult = float(data.get("mmr_lambda", config.MMR_LAMBDA))
+        candidates = int(data.get("mmr_candidates", config.MMR_CANDIDATES))
+        min_score = data.get("min_score", config.MMR_MIN_SCORE or None)
+        min_score = None if min_score is None else float(min_score)
+    except (TypeError, ValueError):
+        raise ValueError("mmr_lambda and min_score must be numbers, mmr_candidates an integer")
+    if not 0 <= lambda_mult <= 1:
+        raise ValueError("mmr_lambda must be between 0 and 1")
+    if not 1 <= candidates <= config.MMR_MAX_CANDIDATES:
+        raise ValueError(f"mmr_candidates must be between 1 and {config.MMR_MAX_CANDIDATES}")
+    return {"lambda": lambda_mult, "candidates": candidates, "min_score": min_score}
+
+
+def _cache_scope(model_choice, where, top_k, rerank=None):
+    # Answers depend on the model and on which chunks retrieval could see
+    if not where and top_k == config.QUERY_TOP_K and rerank == _rerank_options({}):
+        return _resolve_model(model_choice)
+    return f"{_resolve_model(model_choice)}|{top_k}|{json.dumps(where, sort_keys=True)}|{json.dumps(rerank, sort_keys=True)}"
+
+
+def _cache_lookup(query_embedding, model):
+    """
+    Returns (cached_entry_or_None, corpus_version) for the query.
+    """
+    version = corpus_version.get_version()
+    if not config.ANSWER_CACHE_ENABLED or query_embedding is None:
+        return None, version
+    hit = answer_cache.get(query_embedding, model, version)
+    if hit is None:
+        return None, version
+    entry, similarity = hit
+    return dict(entry, cached=True, cache_similarity=similarity), version
+
+
+def _cache_store(query_embedding, model, version, entry):
+    if config.ANSWER_CACHE_ENABLED and query_embedding is not None:
+        answer_cache.put(query_embedding, model, version, entry)
+
+
+def _retrieved_ids(relevant_docs):
+    metadatas = (relevant_docs.get("metadatas") or [[]])[0] or []
+    return [m.get("chunk_id") for m in metadatas], [m.get("doc_id") for m in metadatas]
+
+
+def _get_context(relevant_docs):
+    # NOTE: Using "documents" key as per vector_store.py results structure
+    if not (relevant_docs and relevant_docs.get("documents", [[]]) and relevant_docs["documents"][0]):
+        return ""
+    documents = relevant_docs["documents"][0]
+    if not config.CONTEXT_PACKING:
+        context = "\n\n".join(documents)
+        tokens = estimate_tokens(context)
+        metrics.observe("context.raw_tokens", tokens)
+        metrics.observe("context.tokens", tokens)
+        return context
+
+    # ✅ Merge adjacent chunks, drop repeated overlap, fit the token budget
+    with metrics.timer("context.pack_ms"):
+        context, stats = pack_context(documents, (relevant_docs.get("metadatas") or [None])[0])
+    metrics.observe("context.raw_tokens", stats["raw_tokens"])
+    metrics.observe("context.tokens", stats["tokens"])
+    if stats["truncated"]:
+        metrics.incr("context.truncated")
+    return context
+
+
+def _observe_usage(usage):
+    # Prompt size as billed by Groq, to compare packed and unpacked contexts
+    if usage and usage.get("prompt_tokens") is not None:
+        metrics.observe("llm.prompt_tokens", usage["prompt_tokens"])
+
+
+def _build_payload(user_query, context, model_choice, stream=False):
+    payload = {
+        "model": _resolve_model(model_choice),
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{user_query}"}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 1000
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _read_completion(response):
+    """
+    Returns (answer, None) for a Groq chat completion response, or
+    (None, error_body) when it failed. Works for requests and httpx responses.
+    """
+    # ✅ Handle non-200 responses safely
+    if response.status_code != 200:
+        log(f"❌ Groq API Error: {response.text}")
+        return None, {
+            "answer": "Groq API request failed.",
+            "details": response.text
+        }
+
+    # ✅ Parse response JSON safely
+    try:
+        result = response.json()
+    except Exception as e:
+        log(f"❌ Invalid JSON from Groq: {e}")
+        return None, {
+            "answer": "Groq returned invalid JSON response.",
+            "details": str(e)
+        }
+
+    # ⚠️ Check for model response
+    if not result.get("choices") or not result["choices"][0].get("message"):
+        log(f"❌ Groq Response Lacks Choices/Message: {result}")
+        return None, {
+            "answer": "Groq returned an empty response or an unexpected structure.",
+            "details": result.get("error", "No error details provided.")
+        }
+
+    _observe_usage(result.get("usage"))
+
+    # ✅ Safe parsing of the content
+    return result["choices"][0]["message"].get("content", "No content provided by Groq model."), None
+
+
+def _answer_payload(user_query, relevant_docs, model_choice):
+    """
+    Groq payload answering from the retrieved chunks, or None if there are none.
+    """
+    context = _get_context(relevant_docs)
+    if not context:
+        return None
+    return _build_payload(user_query, context, model_choice)
+
+
+def _answer_body(response, relevant_docs, payload, query_embedding, scope, version):
+    """
+    (body, status) for a chat completion response; caches successful answers.
+    """
+    answer, error = _read_completion(response)
+    if error:
+        return error, 500
+
+    log(f"✅ Groq Response: {answer[:200]} ...")
+    chunk_ids, doc_ids = _retrieved_ids(relevant_docs)
+    _cache_store(query_embedding, scope, version, {
+        "answer": answer,
+        "context_used": len(relevant_docs["documents"][0]),
+        "model_used": payload["model"],
+        "chunk_ids": chunk_ids,
+        "doc_ids": doc_ids
+    })
+    return {
+        "answer": answer,
+        "context_used": len(relevant_docs["documents"][0]),
+        "model_used": payload["model"]
+    }, 200
+
+
+def _answer(user_query, relevant_docs, model_choice, query_embedding, scope, version):
+    """
+    Ask Groq to answer from the retrieved chunks. Returns (body, status).
+    """
+    # ✅ Construct Groq API payload
+    payload = _answer_payload(user_query, relevant_docs, model_choice)
+    if payload is None:
+        return {"answer": NO_CONTEXT_ANSWER}, 200
+
+    # Use log() instead of print() if utils.py defines it
+    log(f"\n🚀 Sending request to Groq model: {payload['model']}")
+    with metrics.timer("llm.latency_ms"):
+        response = http_client.groq_post(GROQ_CHAT_PATH, payload)
+    log(f"📩 Groq Status: {response.status_code}")
+    return _answer_body(response, relevant_docs, payload, query_embedding, scope, version)
+
+
+def _cached_body(cached):
+    return {
+        "answer": cached["answer"],
+        "context_used": cached["context_used"],
+        "model_used": cached["model_used"],
+        "cached": True
+    }
+
 
 # FIX 2: Define the route as "/", which, combined with the prefix "/query" 
 # in main.py, creates the route /query/. The strict_slashes=False in main.py 
@@ -135,83 +378,300 @@ GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 def query():
     try:
         data = request.get_json()
+        if data.get("stream"):
+            return query_stream()
+
         user_query = data.get("query", "").strip()
         model_choice = data.get("model", "llama3-8b")
 
         if not user_query:
             return jsonify({"error": "No query provided"}), 400
+        try:
+            where, top_k = _retrieval_options(data)
+            rerank = _rerank_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        scope = _cache_scope(model_choice, where, top_k, rerank)
+
+        # ✅ Serve paraphrases of recent questions from the answer cache
+        query_embedding = get_text_embedding(user_query)
+        cached, version = _cache_lookup(query_embedding, scope)
+        if cached:
+            return jsonify(_cached_body(cached))
 
         # ✅ Retrieve top relevant chunks from vector store
-        relevant_docs = search_embeddings(user_query, top_k=3)
-        
-        # NOTE: Using "documents" key as per vector_store.py results structure
-        if relevant_docs and relevant_docs.get("documents", [[]]) and relevant_docs["documents"][0]:
-            context = "\n\n".join(relevant_docs["documents"][0])
-        else:
-            context = ""
-            
-        if not context:
-            return jsonify({
-                "answer": "⚠️ No relevant content found. Please upload a document first."
-            })
+        relevant_docs = search_embeddings(
+            user_query, top_k=top_k, query_embedding=query_embedding, where=where, rerank=rerank
+        )
+        body, status = _answer(user_query, relevant_docs, model_choice, query_embedding, scope, version)
+        return jsonify(body), status
 
-        # ✅ Construct Groq API payload
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json",
-        }
+    except Exception as e:
+        log(f"❌ Query error: {e}")
+        return jsonify({"answer": f"A critical backend error occurred: {str(e)}"}), 500
+
+
+# ---------------- Streaming (Server-Sent Events) ----------------
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _iter_groq_deltas(payload):
+    """
+    Yield content deltas from a streamed Groq chat completion, and finally
+    the usage block if Groq reports one (as a dict).
+    """
+    for line in http_client.groq_stream(GROQ_CHAT_PATH, payload):
+        items = _parse_stream_line(line)
+        if items is None:
+            return
+        yield from items
 
-        payload = {
-            "model": GROQ_MODELS.get(model_choice, "llama3-8b-8192"),
-            "messages": [
-                {"role": "system", "content": "You are an assistant that answers based on the document context. If you cannot find an answer in the context, politely state that you do not have enough information."},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{user_query}"}
-            ],
-            "temperature": 0.3,
-            "max_tokens": 1000
-        }
 
-        # Use log() instead of print() if utils.py defines it
-        log(f"\n🚀 Sending request to Groq model: {payload['model']}")
-        response = requests.post(GROQ_URL, headers=headers, data=json.dumps(payload))
-        log(f"📩 Groq Status: {response.status_code}")
+def _parse_stream_line(line):
+    """
+    Usage block (dict) and content deltas carried by one raw SSE line of a
+    streamed completion; None once the stream reports [DONE].
+    """
+    if not line or not line.startswith("data:"):
+        return []
+    chunk = line[len("data:"):].strip()
+    if chunk == "[DONE]":
+        return None
+    event = json.loads(chunk)
+    items = []
+    usage = (event.get("x_groq") or {}).get("usage") or event.get("usage")
+    if usage:
+        items.append(usage)
+    for choice in event.get("choices", []):
+        delta = choice.get("delta", {}).get("content")
+        if delta:
+            items.append(delta)
+    return items
 
-        # ✅ Handle non-200 responses safely
-        if response.status_code != 200:
-            log(f"❌ Groq API Error: {response.text}")
-            return jsonify({
-                "answer": "Groq API request failed.",
-                "details": response.text
-            }), 500
 
-        # ✅ Parse response JSON safely
+@query_bp.route("/stream", methods=["POST"])
+def query_stream():
+    """
+    Same as /query, but relays the answer over SSE as Groq generates it.
+
+    Events: `metadata` (retrieved chunk/doc ids) first, then one `token`
+    event per delta, then `done` with a summary (or `error`).
+    """
+    started = time.perf_counter()
+    data = request.get_json() or {}
+    user_query = data.get("query", "").strip()
+    model_choice = data.get("model", "llama3-8b")
+
+    if not user_query:
+        return jsonify({"error": "No query provided"}), 400
+    try:
+        where, top_k = _retrieval_options(data)
+        rerank = _rerank_options(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    scope = _cache_scope(model_choice, where, top_k, rerank)
+
+    def generate():
         try:
-            result = response.json()
+            query_embedding = get_text_embedding(user_query)
+            cached, version = _cache_lookup(query_embedding, scope)
+            if cached:
+                yield _sse("metadata", {
+                    "chunk_ids": cached["chunk_ids"],
+                    "doc_ids": cached["doc_ids"],
+                    "model_used": cached["model_used"],
+                    "cached": True
+                })
+                yield _sse("token", {"delta": cached["answer"]})
+                yield _sse("done", {
+                    "context_used": cached["context_used"],
+                    "model_used": cached["model_used"],
+                    "answer_chars": len(cached["answer"]),
+                    "total_ms": (time.perf_counter() - started) * 1000,
+                    "cached": True,
+                    "cache_similarity": cached["cache_similarity"]
+                })
+                return
+
+            relevant_docs = search_embeddings(
+                user_query, top_k=top_k, query_embedding=query_embedding, where=where, rerank=rerank
+            )
+            context = _get_context(relevant_docs)
+            chunk_ids, doc_ids = _retrieved_ids(relevant_docs)
+            payload = _build_payload(user_query, context, model_choice, stream=True)
+
+            yield _sse("metadata", {
+                "chunk_ids": chunk_ids,
+                "doc_ids": doc_ids,
+                "model_used": payload["model"]
+            })
+
+            if not context:
+                yield _sse("token", {"delta": NO_CONTEXT_ANSWER})
+                yield _sse("done", {"context_used": 0, "model_used": payload["model"]})
+                return
+
+            log(f"\n🚀 Streaming request to Groq model: {payload['model']}")
+            first_token_ms = None
+            answer_parts = []
+            usage = None
+            for delta in _iter_groq_deltas(payload):
+                if isinstance(delta, dict):
+                    usage = delta
+                    _observe_usage(usage)
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("query.ttft_ms", first_token_ms)
+                answer_parts.append(delta)
+                yield _sse("token", {"delta": delta})
+
+            total_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("query.stream_total_ms", total_ms)
+            answer = "".join(answer_parts)
+            _cache_store(query_embedding, scope, version, {
+                "answer": answer,
+                "context_used": len(chunk_ids),
+                "model_used": payload["model"],
+                "chunk_ids": chunk_ids,
+                "doc_ids": doc_ids
+            })
+            yield _sse("done", {
+                "context_used": len(chunk_ids),
+                "model_used": payload["model"],
+                "answer_chars": len(answer),
+                "ttft_ms": first_token_ms,
+                "total_ms": total_ms,
+                "usage": usage
+            })
         except Exception as e:
-            log(f"❌ Invalid JSON from Groq: {e}")
-            return jsonify({
-                "answer": "Groq returned invalid JSON response.",
-                "details": str(e)
-            }), 500
-
-        # ⚠️ Check for model response
-        if not result.get("choices") or not result["choices"][0].get("message"):
-            log(f"❌ Groq Response Lacks Choices/Message: {result}")
-            return jsonify({
-                "answer": "Groq returned an empty response or an unexpected structure.",
-                "details": result.get("error", "No error details provided.")
-            }), 500
-
-        # ✅ Safe parsing of the content
-        answer = result["choices"][0]["message"].get("content", "No content provided by Groq model.")
-
-        log(f"✅ Groq Response: {answer[:200]} ...")
-        return jsonify({
-            "answer": answer,
-            "context_used": len(relevant_docs["documents"][0]),
-            "model_used": payload["model"]
-        })
+            log(f"❌ Streaming query error: {e}")
+            yield _sse("error", {"answer": f"A critical backend error occurred: {str(e)}"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
+
+# ---------------- Batch (NDJSON) ----------------
+# Shared by every batch request in the process, so it bounds in-flight completions
+_completion_executor = ThreadPoolExecutor(max_workers=config.QUERY_BATCH_CONCURRENCY, thread_name_prefix="llm")
+
+
+def _batch_options(data):
+    """
+    Questions of a /query/batch request and the retrieval options shared by
+    all of them. Raises ValueError on malformed input.
+    """
+    queries = data.get("queries")
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        raise ValueError("queries must be a non-empty list of questions")
+    if len(queries) > config.QUERY_BATCH_MAX:
+        raise ValueError(f"At most {config.QUERY_BATCH_MAX} queries per batch")
+    where, top_k = _retrieval_options(data)
+    return [q.strip() for q in queries], where, top_k, _rerank_options(data)
+
+
+def _batch_lookup(queries, embeddings, scope):
+    """
+    Answer cache lookups for a batch: ({index: cached body}, [corpus version per query]).
+    """
+    cached_bodies, versions = {}, []
+    for i, query_embedding in enumerate(embeddings):
+        cached, version = _cache_lookup(query_embedding, scope)
+        versions.append(version)
+        if cached:
+            cached_bodies[i] = _cached_body(cached)
+    return cached_bodies, versions
+
+
+def _batch_misses(queries, cached_bodies):
+    """
+    Indexes needing retrieval and a completion (first occurrence of each
+    uncached question), and {repeat index: first index} for the rest.
+    """
+    first, misses, same_as = {}, [], {}
+    for i, user_query in enumerate(queries):
+        if i in cached_bodies:
+            continue
+        if user_query in first:
+            same_as[i] = first[user_query]
+        else:
+            first[user_query] = i
+            misses.append(i)
+    return misses, same_as
+
+
+def _batch_line(index, user_query, body, status):
+    return json.dumps(dict(body, index=index, query=user_query, status=status)) + "\n"
+
+
+def _batch_error(e):
+    log(f"❌ Batch query error: {e}")
+    return {"answer": f"A critical backend error occurred: {str(e)}"}, 500
+
+
+@query_bp.route("/batch", methods=["POST"])
+def query_batch():
+    """
+    Answer many questions in one request.
+
+    All questions are embedded in batched embeddings requests and searched
+    with one multi-vector query; BM25/fusion and completions then run on a
+    bounded pool (QUERY_BATCH_CONCURRENCY) and stream back as NDJSON in
+    request order: one {"index", "query", "status", "answer", ...} line per
+    question. Repeated questions share one completion.
+
+    Body: {"queries": [...], "model", "doc_ids", "filters", "top_k", "mmr",
+    "mmr_lambda", "mmr_candidates", "min_score"}; the options apply to every
+    question.
+    """
+    started = time.perf_counter()
+    data = request.get_json(silent=True) or {}
+    model_choice = data.get("model", "llama3-8b")
+    try:
+        queries, where, top_k, rerank = _batch_options(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    scope = _cache_scope(model_choice, where, top_k, rerank)
+    metrics.observe("query.batch_size", len(queries))
+
+    try:
+        embeddings = get_text_embeddings(queries)
+        cached_bodies, versions = _batch_lookup(queries, embeddings, scope)
+        misses, same_as = _batch_misses(queries, cached_bodies)
+        dense = dense_search_batch([embeddings[i] for i in misses], top_k=top_k, where=where, rerank=rerank)
     except Exception as e:
-        log(f"❌ Query error: {e}")
-        return jsonify({"answer": f"A critical backend error occurred: {str(e)}"}), 500
\ No newline at end of file
+        body, status = _batch_error(e)
+        return jsonify(body), status
+
+    def answer(i, dense_candidates):
+        # BM25, fusion and MMR run here, overlapping other questions' completions
+        relevant_docs = finish_search(
+            queries[i], dense_candidates, top_k=top_k, where=where, query_embedding=embeddings[i], rerank=rerank
+        )
+        return _answer(queries[i], relevant_docs, model_choice, embeddings[i], scope, versions[i])
+
+    futures = {i: _completion_executor.submit(answer, i, d) for i, d in zip(misses, dense)}
+
+    def generate():
+        try:
+            for i, user_query in enumerate(queries):
+                if i in cached_bodies:
+                    body, status = cached_bodies[i], 200
+                else:
+                    try:
+                        body, status = futures[same_as.get(i, i)].result()
+                    except Exception as e:
+                        body, status = _batch_error(e)
+                yield _batch_line(i, user_query, body, status)
+        finally:
+            # Client gone or done: drop completions that have not started
+            for future in futures.values():
+                future.cancel()
+            metrics.observe("query.batch_ms", (time.perf_counter() - started) * 1000)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
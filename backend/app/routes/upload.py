@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 import os
-from app.services.ingest import process_and_store_file
+import re
+from werkzeug.utils import secure_filename
+from app.services import jobs
+from app.utils import generate_id
 
 upload_bp = Blueprint("upload", __name__)
 
@@ -8,6 +11,9 @@ upload_bp = Blueprint("upload", __name__)
 UPLOAD_DIR = "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Caller-supplied document ids end up in chunk ids, so keep them simple
+DOC_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
 @upload_bp.route("/", methods=["POST"])
 def upload():
     try:
@@ -19,28 +25,47 @@ def upload():
         if len(files) > 20:
             return jsonify({"error": "Maximum 20 files allowed"}), 400
 
+        # Optional stable ids, one per file; re-uploading under the same id
+        # (or the same filename when omitted) updates that document in place
+        doc_ids = request.form.getlist("doc_id")
+        if doc_ids and len(doc_ids) != len(files):
+            return jsonify({"error": "Pass one doc_id per file"}), 400
+        bad = [d for d in doc_ids if not DOC_ID_RE.match(d)]
+        if bad:
+            return jsonify({"error": f"Invalid doc_id: {bad[0]} (use letters, digits, '_', '-', '.')"}), 400
+
         results = []
 
-        for f in files:
-            # Save each file to disk
-            file_path = os.path.join(UPLOAD_DIR, f.filename)
+        for i, f in enumerate(files):
+            # Save each file to disk under a unique name so queued jobs never
+            # see their file overwritten by a later upload with the same name
+            filename = secure_filename(f.filename)
+            file_path = os.path.join(UPLOAD_DIR, f"{generate_id('upload')}_{filename}")
             f.save(file_path)
 
             print(f" File saved: {file_path}")  # Debug log
-            print(" Calling process_and_store_file...")
 
-            # Call ingestion
+            # Queue ingestion; progress is polled via /upload/jobs/<job_id>
             try:
-                res = process_and_store_file(file_path)
-                print(f" Ingestion completed for: {f.filename}")
-                results.append({"file": f.filename, "status": "success"})
+                job = jobs.enqueue(file_path, filename, doc_id=doc_ids[i] if doc_ids else None)
+                results.append({"file": f.filename, "status": "queued", "job_id": job["job_id"]})
             except Exception as e:
-                print(f" Error ingesting {f.filename}: {e}")
+                print(f" Error queueing {f.filename}: {e}")
                 results.append({"file": f.filename, "status": "failed", "error": str(e)})
 
-        return jsonify({"uploaded": results}), 200
+        # 202 if anything was queued; if every enqueue failed, nothing will run
+        queued = any(r["status"] == "queued" for r in results)
+        return jsonify({"uploaded": results}), 202 if queued else 500
 
     except Exception as e:
         print(f" Upload route error: {e}")
         return jsonify({"error": str(e)}), 500
 
+
+@upload_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = jobs.get_status(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(job), 200
+
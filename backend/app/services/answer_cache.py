@@ -0,0 +1,123 @@
+# backend/app/services/answer_cache.py
+"""
+Semantic answer cache.
+
+Answers are stored under their query embedding. A new query is served from
+the cache when an earlier query for the same model has cosine similarity at
+or above `threshold`. The whole cache is tied to the corpus version it was
+filled under, and is dropped as soon as the version changes, so stale
+answers are never served after an ingest.
+
+Embeddings live in one pre-allocated float32 matrix of unit rows, so a
+lookup is a single matrix-vector product.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.services import metrics
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_size=1024, threshold=0.95, name="answer_cache"):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._version = None
+        self._reset(dim=None)
+
+    def _reset(self, dim):
+        self._matrix = np.zeros((self.max_size, dim), dtype=np.float32) if dim else None
+        self._slot_model = np.full(self.max_size, -1, dtype=np.int32)  # -1 = empty slot
+        self._answers = [None] * self.max_size
+        self._lru = OrderedDict()  # slot -> None, least recently used first
+        self._free = list(range(self.max_size - 1, -1, -1))
+        # Models (cache scopes) with at least one cached slot, and their ids in _slot_model
+        self._model_ids = {}
+        self._model_names = {}
+        self._next_model_id = 0
+
+    def _count(self, stat):
+        self._stats[stat] += 1
+        metrics.incr(f"{self.name}.{stat}")
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._lru:
+                self._count("invalidations")
+            self._reset(self._matrix.shape[1] if self._matrix is not None else None)
+            self._version = version
+
+    @staticmethod
+    def _unit(embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, embedding, model, version):
+        """
+        Return (answer, similarity) for the closest cached query, or None.
+        """
+        with self._lock:
+            self._check_version(version)
+            model_id = self._model_ids.get(model)
+            if not self._lru or model_id is None or self._matrix.shape[1] != len(embedding):
+                self._count("misses")
+                return None
+
+            sims = self._matrix @ self._unit(embedding)
+            sims[self._slot_model != model_id] = -np.inf
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                self._count("misses")
+                return None
+
+            self._lru.move_to_end(slot)
+            self._count("hits")
+            return self._answers[slot], float(sims[slot])
+
+    def put(self, embedding, model, version, answer):
+        with self._lock:
+            self._check_version(version)
+            if self._matrix is None or self._matrix.shape[1] != len(embedding):
+                self._reset(len(embedding))  # embedding model changed dimension
+
+            if not self._free:
+                self._evict()
+
+            model_id = self._model_ids.get(model)
+            if model_id is None:
+                model_id = self._model_ids[model] = self._next_model_id
+                self._model_names[model_id] = model
+                self._next_model_id += 1
+            slot = self._free.pop()
+            self._matrix[slot] = self._unit(embedding)
+            self._slot_model[slot] = model_id
+            self._answers[slot] = answer
+            self._lru[slot] = None
+            metrics.set_gauge(f"{self.name}.size", len(self._lru))
+
+    def _evict(self):
+        slot, _ = self._lru.popitem(last=False)
+        model_id = int(self._slot_model[slot])
+        self._slot_model[slot] = -1
+        self._answers[slot] = None
+        self._free.append(slot)
+        # Scopes embed client-supplied filters; forget one once its last answer is gone
+        if not (self._slot_model == model_id).any():
+            del self._model_ids[self._model_names.pop(model_id)]
+        self._count("evictions")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                size=len(self._lru),
+                max_size=self.max_size,
+                hit_rate=self._stats["hits"] / lookups if lookups else 0.0,
+                corpus_version=self._version
+            )
@@ -0,0 +1,235 @@
+# backend/app/services/chunker.py
+"""
+Token-aware, sentence-boundary chunking.
+
+Text is streamed from the extractor, split into sentences in a single pass,
+and packed greedily into chunks of at most `chunk_tokens` tokens. Chunks end
+on sentence boundaries, and paragraph ends close a chunk early once it is
+reasonably full. Each sentence is tokenized exactly once.
+
+Chunkers are registered per document type (file extension), so formats with
+different structure (e.g. DOCX paragraphs vs PDF pages) can split differently.
+
+This module only depends on app.utils and tiktoken so it can run inside
+extraction worker processes.
+"""
+import os
+import re
+from functools import lru_cache, partial
+
+from app.utils import clean_text, iter_text_from_file, extract_chunks, log
+
+# A chunk that reaches this fraction of its budget is closed at the next paragraph end
+PARAGRAPH_FILL = 0.5
+
+# Text with no boundary at all (unpunctuated transcripts, PDF tables) is
+# force-split once it reaches this many characters per chunk token (~4 chunks)
+FORCE_SPLIT_CHARS_PER_TOKEN = 16
+
+# Paragraph break (blank line) or whitespace after sentence-ending punctuation
+_BOUNDARY_RE = re.compile(r"(\n[ \t\r\f\v]*\n\s*)|(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name="cl100k_base"):
+    """
+    Process-wide cached tiktoken encoding. cl100k_base is a close proxy for
+    LLM context budgets; the embedding model's own tokenizer differs slightly.
+    """
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text, encoding_name="cl100k_base"):
+    return len(get_tokenizer(encoding_name).encode(text))
+
+
+_tokenizer_unavailable = set()
+
+
+def try_tokenizer(encoding_name="cl100k_base"):
+    """
+    The cached encoding, or None when it cannot be loaded (e.g. hosts
+    without access to the tiktoken download). Only the first failure is
+    attempted and logged.
+    """
+    if encoding_name in _tokenizer_unavailable:
+        return None
+    try:
+        return get_tokenizer(encoding_name)
+    except Exception as e:
+        _tokenizer_unavailable.add(encoding_name)
+        log(f"Tokenizer {encoding_name} unavailable, estimating token counts: {e}")
+        return None
+
+
+def estimate_tokens(text, encoding_name="cl100k_base"):
+    """
+    Token count for request budgeting. Falls back to ~4 characters per token
+    when the encoding cannot be loaded, instead of failing the request.
+    """
+    enc = try_tokenizer(encoding_name)
+    if enc is not None:
+        return len(enc.encode(text))
+    return len(text) // 4 + 1
+
+
+class EstimatedEncoding:
+    """
+    Stand-in for a tiktoken encoding when none can be loaded: ~4-character
+    slices count as tokens, so budgets stay close to estimate_tokens and
+    decoding returns the original text.
+    """
+    def encode(self, text):
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+# -----------------------------
+# Sentence splitting
+# -----------------------------
+def iter_sentences(pieces, paragraph_per_piece=False, max_chars=None):
+    """
+    Split streamed text into cleaned sentences. With `max_chars`, a run of
+    text without any boundary is cut (at whitespace when possible) so the
+    buffer never holds more than about `max_chars` plus one piece.
+
+    Yields:
+        (sentence, ends_paragraph) tuples
+    """
+    buf = ""
+    for piece in pieces:
+        # Only rescan from where the previous buffer's trailing whitespace began
+        scan_from = len(buf.rstrip())
+        buf += piece
+        last = 0
+        for m in _BOUNDARY_RE.finditer(buf, scan_from):
+            if m.end() == len(buf):
+                break  # the whitespace run may continue in the next piece
+            sentence = clean_text(buf[last:m.start()])
+            if sentence:
+                yield sentence, m.group(1) is not None
+            last = m.end()
+        buf = buf[last:]
+
+        while max_chars and len(buf) > max_chars:
+            cut = max(buf.rfind(" ", 0, max_chars), buf.rfind("\n", 0, max_chars)) + 1 or max_chars
+            sentence = clean_text(buf[:cut])
+            if sentence:
+                yield sentence, False
+            buf = buf[cut:]
+
+        if paragraph_per_piece:
+            sentence = clean_text(buf)
+            if sentence:
+                yield sentence, True
+            buf = ""
+
+    sentence = clean_text(buf)
+    if sentence:
+        yield sentence, True
+
+
+# -----------------------------
+# Token packing
+# -----------------------------
+def _overlap_tail(sentences, overlap_tokens):
+    """
+    Trailing sentences whose token counts fit in the overlap budget.
+    """
+    tail, total = [], 0
+    for sentence, n in reversed(sentences):
+        if total + n > overlap_tokens:
+            break
+        tail.append((sentence, n))
+        total += n
+    tail.reverse()
+    return tail, total
+
+
+def iter_token_chunks(pieces, chunk_tokens=256, overlap_tokens=32,
+                      paragraph_per_piece=False, encoding_name="cl100k_base"):
+    """
+    Pack sentences into chunks of at most `chunk_tokens` tokens, carrying up
+    to `overlap_tokens` of trailing sentences into the next chunk. Sentences
+    longer than the budget are split on token boundaries. Token counts are
+    estimated when the encoding cannot be loaded, so ingestion still works.
+    """
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+    enc = try_tokenizer(encoding_name) or EstimatedEncoding()
+
+    current, total, fresh = [], 0, 0
+    max_chars = chunk_tokens * FORCE_SPLIT_CHARS_PER_TOKEN
+    for sentence, ends_paragraph in iter_sentences(pieces, paragraph_per_piece, max_chars):
+        tokens = enc.encode(sentence)
+        n = len(tokens)
+
+        if n > chunk_tokens:
+            if fresh:
+                yield " ".join(s for s, _ in current)
+            step = chunk_tokens - overlap_tokens
+            for start in range(0, n, step):
+                yield enc.decode(tokens[start:start + chunk_tokens])
+                if start + chunk_tokens >= n:
+                    break
+            current, total, fresh = [], 0, 0
+            continue
+
+        if total + n > chunk_tokens and fresh:
+            yield " ".join(s for s, _ in current)
+            current, total = _overlap_tail(current, overlap_tokens)
+            if total + n > chunk_tokens:
+                current, total = [], 0
+            fresh = 0
+
+        current.append((sentence, n))
+        total += n
+        fresh += 1
+
+        # Prefer to end chunks where paragraphs end; no overlap across paragraphs
+        if ends_paragraph and total >= chunk_tokens * PARAGRAPH_FILL:
+            yield " ".join(s for s, _ in current)
+            current, total, fresh = [], 0, 0
+
+    if fresh:
+        yield " ".join(s for s, _ in current)
+
+
+# -----------------------------
+# Per-document-type registry
+# -----------------------------
+# extension -> callable(pieces, chunk_tokens, overlap_tokens) yielding chunks
+CHUNKERS = {
+    ".pdf": partial(iter_token_chunks, paragraph_per_piece=False),   # a page is not a paragraph
+    ".docx": partial(iter_token_chunks, paragraph_per_piece=True),   # one piece per paragraph
+    ".txt": partial(iter_token_chunks, paragraph_per_piece=False),   # blank lines mark paragraphs
+}
+
+
+def register_chunker(ext, chunker):
+    """
+    Plug in a token chunker for a file extension (e.g. ".md").
+    """
+    CHUNKERS[ext.lower()] = chunker
+
+
+def chunk_file(filepath, strategy="tokens", chunk_size=1000, overlap=100,
+               chunk_tokens=256, overlap_tokens=32):
+    """
+    Extract and chunk a file with the configured strategy:
+    "tokens" (sentence-aware, token budgeted) or "chars" (fixed character windows).
+
+    Returns an iterator: chunks are produced as the file is read, so callers
+    that consume them one at a time never hold the whole document's chunks.
+    """
+    if strategy == "chars":
+        return extract_chunks(filepath, chunk_size=chunk_size, overlap=overlap)
+    if strategy != "tokens":
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+    ext = os.path.splitext(filepath)[1].lower()
+    chunker = CHUNKERS.get(ext, CHUNKERS[".txt"])
+    return chunker(iter_text_from_file(filepath), chunk_tokens, overlap_tokens)
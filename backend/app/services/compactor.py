@@ -0,0 +1,92 @@
+# backend/app/services/compactor.py
+"""
+Background compaction of deleted chunks.
+
+Deletes only tombstone rows in the vector store and postings in the BM25
+index, so they take effect at once without rebuilding anything. A daemon
+thread checks both indexes every COMPACT_INTERVAL seconds and purges the
+tombstones of any index past COMPACT_TOMBSTONE_RATIO. Fragmentation and
+compaction progress are published as metrics gauges.
+"""
+import threading
+
+import app.config as config
+from app.services import metrics
+from app.services.vector_store import store, lexical_index
+from app.utils import log
+
+_INDEXES = {
+    "vector_store": store,
+    "lexical_index": lexical_index,
+}
+
+_stop = threading.Event()
+_thread = None
+
+
+def report():
+    """
+    Publish tombstone counts and ratios as gauges. Returns the stats per index.
+    """
+    stats = {}
+    for name, index in _INDEXES.items():
+        stats[name] = index.stats()
+        metrics.set_gauge(f"{name}.tombstones", stats[name]["tombstones"])
+        metrics.set_gauge(f"{name}.tombstone_ratio", round(stats[name]["tombstone_ratio"], 4))
+    if "segments" in stats["vector_store"]:
+        metrics.set_gauge("vector_store.segments", stats["vector_store"]["segments"])
+    return stats
+
+
+def _due(stats):
+    return (stats["tombstones"] >= config.COMPACT_MIN_TOMBSTONES
+            and stats["tombstone_ratio"] >= config.COMPACT_TOMBSTONE_RATIO)
+
+
+def compact(force=False):
+    """
+    Compact every index past the threshold (or with any tombstones when
+    `force`). Returns {index name: rows purged}.
+    """
+    purged = {}
+    for name, stats in report().items():
+        if not (_due(stats) or (force and stats["tombstones"])):
+            continue
+
+        def progress(stage, name=name):
+            metrics.set_gauge("compaction.stage", f"{name}:{stage}")
+
+        metrics.set_gauge("compaction.running", 1)
+        try:
+            with metrics.timer(f"compaction.{name}_ms"):
+                purged[name] = _INDEXES[name].compact(progress=progress)
+        finally:
+            metrics.set_gauge("compaction.running", 0)
+            metrics.set_gauge("compaction.stage", "idle")
+        metrics.incr("compaction.runs")
+        metrics.incr(f"compaction.{name}.purged", purged[name])
+        log(f"🧹 Compacted {name}: {purged[name]} tombstones purged")
+    if purged:
+        report()
+    return purged
+
+
+def _loop():
+    while not _stop.wait(config.COMPACT_INTERVAL):
+        try:
+            compact()
+        except Exception as e:
+            metrics.incr("compaction.failed")
+            log(f" Compaction failed: {e}")
+
+
+def start():
+    """
+    Start the compactor thread (once per process). Call once at startup.
+    """
+    global _thread
+    report()
+    if _thread is None and config.COMPACT_INTERVAL > 0:
+        _thread = threading.Thread(target=_loop, name="compactor", daemon=True)
+        _thread.start()
+    return _thread
@@ -0,0 +1,119 @@
+# backend/app/services/context.py
+"""
+Context packing: turns the retrieved chunks into the prompt context.
+
+Retrieved chunks often come from the same document and repeat each other's
+text (chunks overlap by CHUNK_OVERLAP characters, or by whole sentences with
+the token chunker). Chunks of one document are put back in source order and
+runs of adjacent chunks are merged into a single passage, keeping the
+repeated span only once. Documents keep the order of their best-ranked
+chunk, so trimming to the token budget drops the least relevant text first.
+"""
+import app.config as config
+from app.services.chunker import estimate_tokens, try_tokenizer
+
+PASSAGE_SEPARATOR = "\n\n"
+
+# A shorter suffix/prefix match between adjacent chunks is taken as coincidence
+MIN_OVERLAP_CHARS = 16
+
+# Don't bother sending a truncated passage shorter than this
+MIN_PASSAGE_TOKENS = 32
+
+
+def overlap_length(left, right, min_chars=MIN_OVERLAP_CHARS):
+    """
+    Length of the longest suffix of `left` that is also a prefix of
+    `right`, or 0 when shorter than `min_chars`.
+    """
+    probe = right[:min_chars]
+    if len(probe) < min_chars:
+        return 0
+    # Earliest match in the tail of `left` is the longest overlap
+    idx = left.find(probe, max(0, len(left) - len(right)))
+    while idx != -1:
+        if right.startswith(left[idx:]):
+            return len(left) - idx
+        idx = left.find(probe, idx + 1)
+    return 0
+
+
+def merge_chunks(documents, metadatas):
+    """
+    Passages built from retrieved chunks (given best first): exact
+    duplicates dropped, adjacent chunks of a document (consecutive
+    `position`) merged without their overlap. Chunks without doc_id or
+    position stay passages of their own.
+    """
+    groups = {}  # doc_id -> [(position, text)], in order of best rank
+    seen = set()
+    for rank, (text, meta) in enumerate(zip(documents, metadatas)):
+        if not text or text in seen:
+            continue
+        seen.add(text)
+        meta = meta or {}
+        doc_id, position = meta.get("doc_id"), meta.get("position")
+        if doc_id is None or position is None:
+            groups[("chunk", rank)] = [(0, text)]
+        else:
+            groups.setdefault(doc_id, []).append((position, text))
+
+    passages = []
+    for chunks in groups.values():
+        chunks.sort(key=lambda c: c[0])
+        last, text = chunks[0]
+        for position, chunk in chunks[1:]:
+            if position == last + 1:
+                overlap = overlap_length(text, chunk)
+                text += chunk[overlap:] if overlap else " " + chunk
+            else:
+                passages.append(text)
+                text = chunk
+            last = position
+        passages.append(text)
+    return passages
+
+
+def truncate_tokens(text, max_tokens):
+    """
+    Leading `max_tokens` tokens of `text` (~4 characters per token when the
+    tokenizer is unavailable).
+    """
+    enc = try_tokenizer()
+    if enc is None:
+        return text[:max_tokens * 4]
+    return enc.decode(enc.encode(text)[:max_tokens])
+
+
+def pack_context(documents, metadatas=None, max_tokens=None):
+    """
+    Pack retrieved chunks into one context string within `max_tokens`
+    (default CONTEXT_MAX_TOKENS, 0 = no limit).
+    Returns (context, stats) where stats holds chunks, passages, raw_tokens
+    (the chunks simply joined), tokens and truncated.
+    """
+    if max_tokens is None:
+        max_tokens = config.CONTEXT_MAX_TOKENS
+    passages = merge_chunks(documents, metadatas or [None] * len(documents))
+
+    kept, used, truncated = [], 0, False
+    for passage in passages:
+        tokens = estimate_tokens(passage)
+        if max_tokens and used + tokens > max_tokens:
+            truncated = True
+            remaining = max_tokens - used
+            if remaining >= MIN_PASSAGE_TOKENS:
+                kept.append(truncate_tokens(passage, remaining))
+            break
+        kept.append(passage)
+        used += tokens
+
+    context = PASSAGE_SEPARATOR.join(kept)
+    stats = {
+        "chunks": len(documents),
+        "passages": len(kept),
+        "raw_tokens": estimate_tokens(PASSAGE_SEPARATOR.join(documents)),
+        "tokens": estimate_tokens(context),
+        "truncated": truncated
+    }
+    return context, stats
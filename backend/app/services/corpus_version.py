@@ -0,0 +1,56 @@
+# backend/app/services/corpus_version.py
+"""
+Monotonic corpus version, bumped whenever the indexed content changes.
+
+Stored as a small file next to the vector index so every worker process
+sees the same number. Readers re-read the file on every check (a few bytes):
+an mtime-keyed cache misses bumps that land within one timestamp tick, and
+replaced files can reuse a freed inode number, so neither is a safe key.
+"""
+import fcntl
+import os
+
+import app.config as config
+
+VERSION_FILE = os.path.join(config.VECTOR_DB_DIR, "corpus_version")
+LOCK_FILE = VERSION_FILE + ".lock"
+
+
+def _read():
+    try:
+        with open(VERSION_FILE) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def get_version():
+    """
+    Current corpus version (0 before the first ingest).
+    """
+    return _read()
+
+
+def get_mtime():
+    """
+    Last time the corpus changed (seconds since epoch), or None.
+    """
+    try:
+        return os.stat(VERSION_FILE).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def bump():
+    """
+    Atomically increment the version (safe across processes). Returns the new version.
+    """
+    os.makedirs(config.VECTOR_DB_DIR, exist_ok=True)
+    with open(LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        version = _read() + 1
+        tmp = f"{VERSION_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(version))
+        os.replace(tmp, VERSION_FILE)
+    return version
@@ -0,0 +1,138 @@
+# backend/app/services/embedding_cache.py
+"""
+Bounded LRU + TTL cache for query embeddings, with an optional SQLite tier
+on disk so warm entries survive restarts.
+
+Keys are the normalized query text plus the embedding model name, so a
+model switch never serves vectors from the old embedding space.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from app.services import metrics
+
+
+def normalize_query(text):
+    """
+    Collapse whitespace and case so trivially different spellings share an entry.
+    """
+    return " ".join(text.split()).lower()
+
+
+def cache_key(text, model):
+    return hashlib.sha1(f"{model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe in-memory LRU with per-entry TTL, backed by an optional
+    SQLite file (`disk_path`) that is consulted on memory misses.
+    """
+
+    def __init__(self, max_size=2048, ttl=86400, disk_path=None, name="query_embedding_cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()  # key -> (expires_at, embedding)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    # --- Disk tier ---
+
+    def _open_disk(self, disk_path):
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        self._db = sqlite3.connect(disk_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("DELETE FROM embeddings WHERE expires_at < ?", (time.time(),))
+        self._db.commit()
+
+    def _disk_get(self, key, now):
+        row = self._db.execute(
+            "SELECT embedding, expires_at FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            self._db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return row[1], array("f", row[0]).tolist()
+
+    def _disk_put(self, key, embedding, expires_at):
+        self._db.execute(
+            "INSERT OR REPLACE INTO embeddings (key, embedding, expires_at) VALUES (?, ?, ?)",
+            (key, array("f", embedding).tobytes(), expires_at)
+        )
+        self._db.commit()
+
+    # --- Public API ---
+
+    def _count(self, stat):
+        self._stats[stat] += 1
+        metrics.incr(f"{self.name}.{stat}")
+
+    def get(self, text, model):
+        """
+        Return the cached embedding or None on a miss.
+        """
+        key = cache_key(text, model)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self._count("hits")
+                    return entry[1]
+                del self._entries[key]
+                self._count("expired")
+
+            if self._db is not None:
+                entry = self._disk_get(key, now)
+                if entry is not None:
+                    self._insert(key, entry)
+                    self._count("disk_hits")
+                    return entry[1]
+
+            self._count("misses")
+            return None
+
+    def put(self, text, model, embedding):
+        key = cache_key(text, model)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, (expires_at, embedding))
+            if self._db is not None:
+                self._disk_put(key, embedding, expires_at)
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._count("evictions")
+        metrics.set_gauge(f"{self.name}.size", len(self._entries))
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hit_rate = (self._stats["hits"] + self._stats["disk_hits"]) / lookups if lookups else 0.0
+            return dict(self._stats, size=len(self._entries), max_size=self.max_size, hit_rate=hit_rate)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
@@ -1,6 +1,14 @@
 # backend/app/services/embeddings.py
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import groq
 from groq import Groq
 import app.config as config
+from app.services import local_embeddings, metrics
+from app.services.chunker import estimate_tokens
+from app.utils import log
 
 # Absolute import from app package
 
@@ -8,35 +16,132 @@ import app.config as config
 # Initialize Groq client
 # -----------------------------
 try:
-    client = Groq(api_key=config.GROQ_API_KEY)
+    # Retries are handled per batch below (with jitter), not inside the SDK
+    client = Groq(api_key=config.GROQ_API_KEY, max_retries=0)
 except Exception as e:
     raise RuntimeError(f"Failed to initialize Groq client: {e}")
 
+# Shared by every caller in the process, so it bounds total in-flight requests
+_executor = ThreadPoolExecutor(max_workers=config.EMBED_CONCURRENCY, thread_name_prefix="embed")
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.InternalServerError
+)
+
+
+# -----------------------------
+# Batching
+# -----------------------------
+def make_batches(texts, max_items, max_tokens):
+    """
+    Greedily split texts into consecutive batches within the item and token
+    limits. A single text over the token limit gets a batch of its own.
+
+    Returns:
+        list of (start_index, list[str])
+    """
+    batches = []
+    start, batch, batch_tokens = 0, [], 0
+    for i, text in enumerate(texts):
+        n = estimate_tokens(text)
+        if batch and (len(batch) >= max_items or batch_tokens + n > max_tokens):
+            batches.append((start, batch))
+            start, batch, batch_tokens = i, [], 0
+        batch.append(text)
+        batch_tokens += n
+    if batch:
+        batches.append((start, batch))
+    return batches
+
+
+def _retry_delay(attempt, error):
+    """
+    Exponential backoff with full jitter, honouring Retry-After when the API sends one.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    cap = min(config.EMBED_BACKOFF_MAX, config.EMBED_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _embed_batch(texts, model):
+    for attempt in range(config.EMBED_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = client.embeddings.create(input=texts, model=model)
+        except RETRYABLE_ERRORS as e:
+            if attempt == config.EMBED_MAX_RETRIES:
+                raise
+            delay = _retry_delay(attempt, e)
+            metrics.incr("embeddings.retries")
+            log(f" Embedding batch of {len(texts)} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        elapsed = time.perf_counter() - start
+        metrics.observe("embeddings.batch_latency_ms", elapsed * 1000)
+        metrics.observe("embeddings.batch_items", len(texts))
+        # The API may return items out of order; `index` is authoritative
+        data = sorted(response.data, key=lambda item: item.index)
+        return [item.embedding for item in data]
+
 
 # -----------------------------
 # Generate embeddings
 # -----------------------------
-def create_embeddings(texts, model="nomic-embed-text-v1.5"):
+def create_embeddings(texts, model=config.EMBEDDING_MODEL):
     """
-    Generate embeddings for a list of text chunks using Groq API.
-    
+    Generate embeddings for a list of text chunks using Groq API, or the
+    local model when EMBEDDING_PROVIDER=local.
+
+    Inputs are split into batches within EMBED_BATCH_MAX_ITEMS and
+    EMBED_BATCH_MAX_TOKENS, sent with bounded concurrency, retried with
+    backoff on transient errors and reassembled in input order.
+
     Args:
         texts (list[str] or str): Text(s) to embed.
         model (str): Groq embedding model.
-    
+
     Returns:
         list[list[float]]: Embeddings for each text chunk.
     """
     if not isinstance(texts, list):
         texts = [texts]
+    if not texts:
+        return []
 
+    start = time.perf_counter()
     try:
-        response = client.embeddings.create(input=texts, model=model)
-        embeddings = [item.embedding for item in response.data]
-        return embeddings
+        if config.EMBEDDING_PROVIDER == "local":
+            embeddings = local_embeddings.embed(texts, prompt="document")
+            batches = len(local_embeddings.length_batches(texts, config.LOCAL_EMBED_BATCH_SIZE))
+        else:
+            batches = make_batches(texts, config.EMBED_BATCH_MAX_ITEMS, config.EMBED_BATCH_MAX_TOKENS)
+            futures = [(offset, _executor.submit(_embed_batch, batch, model)) for offset, batch in batches]
+            embeddings = [None] * len(texts)
+            for offset, future in futures:
+                for i, emb in enumerate(future.result()):
+                    embeddings[offset + i] = emb
+            batches = len(batches)
     except Exception as e:
         raise RuntimeError(f"Failed to create embeddings: {e}")
 
+    elapsed = time.perf_counter() - start
+    metrics.incr("embeddings.items", len(texts))
+    metrics.incr("embeddings.batches", batches)
+    if elapsed > 0:
+        metrics.set_gauge("embeddings.items_per_s", len(texts) / elapsed)
+    return embeddings
+
 
 # -----------------------------
 # Generate answer from LLM
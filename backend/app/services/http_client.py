@@ -0,0 +1,183 @@
+# backend/app/services/http_client.py
+"""
+Shared, pooled HTTP client for Groq REST calls (query embeddings and chat
+completions).
+
+One keep-alive connection pool per worker process avoids a fresh TCP + TLS
+handshake on every request. When httpx with HTTP/2 support (the `h2`
+package) is installed, requests are multiplexed over HTTP/2; otherwise a
+requests.Session with a sized HTTPAdapter is used.
+
+The async app (rag_backend.py) uses the coroutine variants at the bottom,
+backed by one httpx.AsyncClient per event loop.
+"""
+import asyncio
+import os
+import threading
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import app.config as config
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+GROQ_API_BASE = config.GROQ_API_BASE
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def _httpx_options(pool_size):
+    return {
+        "http2": HTTP2_AVAILABLE and config.HTTP_USE_HTTP2,
+        "limits": httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size
+        ),
+        "timeout": httpx.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+    }
+
+
+def _build_client():
+    if HTTP2_AVAILABLE and config.HTTP_USE_HTTP2:
+        return httpx.Client(**_httpx_options(config.HTTP_POOL_SIZE))
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_client():
+    """
+    Process-wide client. Rebuilt after a fork so workers never share sockets.
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = _build_client()
+            _client_pid = os.getpid()
+        return _client
+
+
+def post(url, json=None, headers=None):
+    """
+    POST through the shared pool with the configured connect/read timeouts.
+    The response exposes status_code, text, json() and raise_for_status().
+    """
+    client = get_client()
+    if isinstance(client, requests.Session):
+        return client.post(
+            url, json=json, headers=headers,
+            timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+        )
+    return client.post(url, json=json, headers=headers)
+
+
+def groq_headers():
+    return {
+        "Authorization": f"Bearer {config.GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+def groq_post(path, payload):
+    """
+    POST a JSON payload to a Groq OpenAI-compatible endpoint, e.g. "/embeddings".
+    """
+    return post(f"{GROQ_API_BASE}{path}", json=payload, headers=groq_headers())
+
+
+def stream_lines(url, json=None, headers=None):
+    """
+    POST and yield the response body line by line as it arrives (for SSE).
+    Raises on a non-2xx status before yielding anything.
+    """
+    client = get_client()
+    if isinstance(client, requests.Session):
+        with client.post(
+            url, json=json, headers=headers, stream=True,
+            timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"  # text/event-stream often has no charset
+            for line in response.iter_lines(decode_unicode=True):
+                yield line
+    else:
+        with client.stream("POST", url, json=json, headers=headers) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                yield line
+
+
+def groq_stream(path, payload):
+    """
+    Stream a Groq endpoint called with "stream": true, yielding raw SSE lines.
+    """
+    return stream_lines(f"{GROQ_API_BASE}{path}", json=payload, headers=groq_headers())
+
+
+# ---------------- Async (event loop) ----------------
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    httpx.AsyncClient for the running event loop. Connections belong to the
+    loop that opened them, so each loop (and each forked worker) gets its own.
+    """
+    if httpx is None:
+        raise RuntimeError("httpx is required for the async HTTP client (pip install httpx)")
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(**_httpx_options(config.ASYNC_HTTP_POOL_SIZE))
+        _async_clients[loop] = client
+    return client
+
+
+async def apost(url, json=None, headers=None):
+    """
+    Coroutine version of post(); the response has the same interface.
+    """
+    return await get_async_client().post(url, json=json, headers=headers)
+
+
+async def agroq_post(path, payload):
+    return await apost(f"{GROQ_API_BASE}{path}", json=payload, headers=groq_headers())
+
+
+async def astream_lines(url, json=None, headers=None):
+    """
+    Async generator version of stream_lines().
+    """
+    async with get_async_client().stream("POST", url, json=json, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            yield line
+
+
+def agroq_stream(path, payload):
+    return astream_lines(f"{GROQ_API_BASE}{path}", json=payload, headers=groq_headers())
+
+
+async def aclose():
+    """
+    Close the running loop's async client (call on app shutdown).
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -6,100 +6,278 @@ from werkzeug.utils import secure_filename
 # Absolute imports from your app package
 from app.utils import (
     allowed_file,
-    extract_text_from_file,
-    chunk_text,
-    generate_id,
+    content_hash,
+    stable_id,
     log
 )
+from app.services import corpus_version
+from app.services.chunker import chunk_file
 from app.services.embeddings import create_embeddings
-from app.services.vector_store import add_embeddings
-from app.models.db_models import insert_document_metadata, insert_chunk_metadata
+from app.services.vector_store import store, add_embeddings, delete_embeddings, get_embeddings_by_hash
+from app.models.db_models import (
+    get_document,
+    upsert_document_metadata,
+    delete_document_metadata,
+    insert_chunks_metadata,
+    get_document_chunks,
+    update_chunk_positions,
+    delete_chunks_metadata
+)
 import app.config as config
 
+# Keyword arguments for chunk_file (also used by the pipeline's extraction processes)
+CHUNK_OPTIONS = {
+    "strategy": config.CHUNK_STRATEGY,
+    "chunk_size": config.CHUNK_SIZE,
+    "overlap": config.CHUNK_OVERLAP,
+    "chunk_tokens": config.CHUNK_TOKENS,
+    "overlap_tokens": config.CHUNK_OVERLAP_TOKENS
+}
 
-def process_and_store_file(file_path):
-    """
-    Process an uploaded file:
-    1. Extract text
-    2. Chunk text
-    3. Generate embeddings
-    4. Store embeddings in Chroma/FAISS
-    5. Save document and chunk metadata in MongoDB
-    """
 
-    filename = os.path.basename(file_path)
-    filename = secure_filename(filename)
+def _no_progress(stage, done=None, total=None):
+    pass
 
-    # Check allowed file types
+
+# -----------------------------
+# Ingestion stages
+# (shared by process_and_store_file and the concurrent pipeline)
+# -----------------------------
+def validate_file(file_path, filename):
+    """
+    Return an error dict if the file cannot be ingested, else None.
+    """
     if not allowed_file(filename):
         log(f" File type not allowed: {filename}")
         return {"error": f"File type not allowed: {filename}"}
 
-    # Verify file exists
     if not os.path.exists(file_path):
         log(f" File does not exist: {file_path}")
         return {"error": f"File not found: {file_path}"}
+    return None
+
+
+def document_id(filename, doc_id=None):
+    """
+    Stable identity of a document: the caller-supplied id, else one derived
+    from the filename, so re-uploading a file updates the same document.
+    """
+    return doc_id or stable_id(filename)
+
+
+def build_chunk_records(chunks, doc_id):
+    """
+    Content-address chunks; identical chunks within a document collapse to one.
+    """
+    chunk_data = []
+    seen_hashes = set()
+    for position, chunk_text_data in enumerate(chunks):
+        chunk_hash = content_hash(chunk_text_data)
+        if chunk_hash in seen_hashes:
+            continue
+        seen_hashes.add(chunk_hash)
+        chunk_data.append({
+            "text": chunk_text_data,
+            "chunk_id": f"{doc_id}_{chunk_hash[:16]}",
+            "doc_id": doc_id,
+            "content_hash": chunk_hash,
+            "position": position,
+            "embedding_model": config.EMBEDDING_MODEL
+        })
+    return chunk_data
+
+
+def diff_chunk_records(doc_id, chunk_data):
+    """
+    Compare a document's new chunk records with the chunks stored for it, by
+    content hash.
+
+    Returns:
+        dict: "write" (new chunks plus unchanged text at a new position, to
+        upsert), "removed_ids" (stored chunk ids no longer in the document)
+        and the counts added / moved / unchanged / removed
+    """
+    stored = {c["content_hash"]: c for c in get_document_chunks(doc_id)}
+    added, moved = [], []
+    for c in chunk_data:
+        old = stored.pop(c["content_hash"], None)
+        if old is None:
+            added.append(c)
+        elif old.get("position") != c["position"]:
+            moved.append(c)
+    removed_ids = [c["chunk_id"] for c in stored.values()]
+    return {
+        "write": added + moved,
+        "added_chunks": added,
+        "moved_chunks": moved,
+        "removed_ids": removed_ids,
+        "added": len(added),
+        "moved": len(moved),
+        "unchanged": len(chunk_data) - len(added) - len(moved),
+        "removed": len(removed_ids)
+    }
+
+
+def diff_report(diff):
+    return {key: diff[key] for key in ("added", "moved", "unchanged", "removed")}
+
+
+def embed_chunk_records(chunk_data):
+    """
+    Embed only content that has no stored embedding yet.
+
+    Returns:
+        (embeddings aligned with chunk_data, number of newly created embeddings)
+    """
+    known = get_embeddings_by_hash({c["content_hash"] for c in chunk_data})
+    new_chunks = [c for c in chunk_data if c["content_hash"] not in known]
+    if new_chunks:
+        new_embeddings = create_embeddings([c["text"] for c in new_chunks])
+        known.update(zip((c["content_hash"] for c in new_chunks), new_embeddings))
+    return [known[c["content_hash"]] for c in chunk_data], len(new_chunks)
+
+
+def save_metadata(filename, file_path, file_size, doc_id, chunk_data, diff, insert_chunks=True):
+    """
+    Store document and chunk metadata in MongoDB, then drop the chunks that
+    left the document from the vector store and Mongo. Chunk text stays in
+    the vector store only; Mongo rows reference it by chunk_id.
+    With insert_chunks=False the caller has already inserted the added
+    chunks (the pipeline does so for a whole write batch).
+    """
+    upsert_document_metadata(filename, file_path, len(chunk_data), file_size, doc_id)
+    if insert_chunks:
+        insert_chunks_metadata(diff["added_chunks"])
+    update_chunk_positions(diff["moved_chunks"])
+    if diff["removed_ids"]:
+        delete_embeddings(diff["removed_ids"])
+        delete_chunks_metadata(diff["removed_ids"])
+
+
+def delete_document(doc_id):
+    """
+    Delete a document. Its vectors and BM25 postings are tombstoned, so they
+    drop out of query results at once and are purged later by the
+    compactor; its chunk and document rows are removed from MongoDB.
+
+    Returns:
+        number of chunks deleted, or None if the document does not exist
+    """
+    if get_document(doc_id) is None:
+        return None
+    chunk_ids = {c["chunk_id"] for c in get_document_chunks(doc_id)}
+    # Also catch vectors whose Mongo rows are missing (e.g. an interrupted ingest)
+    chunk_ids.update(store.get(where={"doc_id": doc_id}, include=())["ids"])
+    delete_embeddings(sorted(chunk_ids))
+    delete_chunks_metadata(chunk_ids)
+    delete_document_metadata(doc_id)
+
+    corpus_version.bump()
+    log(f"🗑️ Deleted document {doc_id} ({len(chunk_ids)} chunks)")
+    return len(chunk_ids)
+
+
+def process_and_store_file(file_path, filename=None, progress=None, doc_id=None):
+    """
+    Process an uploaded file:
+    1. Extract text
+    2. Chunk text and diff the chunks against the stored version of the document
+    3. Generate embeddings for added chunks
+    4. Store embeddings in Chroma/FAISS
+    5. Save document and chunk metadata in MongoDB and delete removed chunks
+
+    Args:
+        file_path: path of the saved upload
+        filename: original file name (defaults to the basename of file_path)
+        progress: optional callback(stage, done=None, total=None) reporting
+            the current stage and progress in chunks
+        doc_id: stable document identity (defaults to one derived from filename)
+    """
+    progress = progress or _no_progress
+
+    filename = filename or os.path.basename(file_path)
+    filename = secure_filename(filename)
+
+    error = validate_file(file_path, filename)
+    if error:
+        return error
 
     file_size = os.path.getsize(file_path)
 
-    # Generate a unique document ID
-    doc_id = generate_id("doc")
+    doc_id = document_id(filename, doc_id)
     log(f"📄 Processing document: {filename} (ID: {doc_id})")
 
-    # Step 1: Extract text from file
+    # Step 1 + 2: Extract and chunk the text, building records as chunks are
+    # produced (the diff needs every record, but not a second list of the chunks)
+    progress("extracting")
     try:
-        text = extract_text_from_file(file_path)
-        if not text.strip():
+        chunk_data = build_chunk_records(chunk_file(file_path, **CHUNK_OPTIONS), doc_id)
+        if not chunk_data:
             log(f"⚠️ No text extracted from {filename}")
             return {"error": f"No text could be extracted from {filename}"}
     except Exception as e:
         log(f" Text extraction failed for {filename}: {e}")
         return {"error": f"Text extraction failed for {filename}: {e}"}
 
-    # Step 2: Chunk the text
-    chunks = chunk_text(text, chunk_size=1000, overlap=100)
-    log(f" Generated {len(chunks)} chunks from {filename}")
+    log(f" Generated {len(chunk_data)} chunks from {filename}")
+    progress("chunking", 0, len(chunk_data))
+    try:
+        diff = diff_chunk_records(doc_id, chunk_data)
+    except Exception as e:
+        log(f" Failed to read stored chunks for {filename}: {e}")
+        return {"error": f"Failed to read stored chunks for {filename}: {e}"}
+    log(f" Chunk diff for {doc_id}: {diff_report(diff)}")
+    write = diff["write"]
 
-    #  Step 3: Generate embeddings for chunks
+    #  Step 3: Generate embeddings only for content not embedded before
+    progress("embedding", 0, len(write))
     try:
-        embeddings = create_embeddings(chunks)
-        log(f" Created embeddings for {filename}")
+        embeddings, embeddings_created = embed_chunk_records(write)
+        embeddings_saved = len(chunk_data) - embeddings_created
+        log(f" Created {embeddings_created} embeddings for {filename} ({embeddings_saved} reused)")
+        progress("embedding", len(write), len(write))
     except Exception as e:
         log(f" Embedding creation failed for {filename}: {e}")
         return {"error": f"Embedding creation failed for {filename}: {e}"}
 
     # Step 4: Store embeddings in vector store
-    chunk_data = []
-    for i, chunk_text_data in enumerate(chunks):
-        chunk_id = generate_id("chunk")
-        chunk_data.append({
-            "text": chunk_text_data,
-            "chunk_id": chunk_id,
-            "doc_id": doc_id
-        })
-
+    progress("storing", 0, len(write))
     try:
-        add_embeddings(chunk_data, embeddings)
-        log(f" Stored embeddings for {filename}")
+        store_report = add_embeddings(
+            write, embeddings,
+            progress=lambda done: progress("storing", done, len(write))
+        )
     except Exception as e:
         log(f" Failed to store embeddings for {filename}: {e}")
         return {"error": f"Failed to store embeddings for {filename}: {e}"}
 
+    if store_report["failed"]:
+        log(f" Failed to store {len(write) - store_report['added']} embeddings for {filename}")
+        return {
+            "error": f"Failed to store embeddings for {filename}",
+            "failed_batches": store_report["failed"]
+        }
+    log(f" Stored embeddings for {filename}")
+
     # Step 5: Store metadata in MongoDB
+    progress("saving_metadata", len(chunk_data), len(chunk_data))
     try:
-        insert_document_metadata(filename, file_path, len(chunks), file_size, doc_id)
-        for c in chunk_data:
-            insert_chunk_metadata(c["doc_id"], c["chunk_id"], c["text"])
+        save_metadata(filename, file_path, file_size, doc_id, chunk_data, diff)
         log(f" Stored metadata for {filename}")
     except Exception as e:
         log(f" Failed to store metadata for {filename}: {e}")
         return {"error": f"Failed to store metadata for {filename}: {e}"}
 
+    # New content invalidates cached answers
+    corpus_version.bump()
     log(f" Document {filename} successfully processed and stored.")
 
     return {
         "filename": filename,
         "doc_id": doc_id,
-        "chunks": len(chunks),
+        "chunks": len(chunk_data),
+        "embeddings_created": embeddings_created,
+        "embeddings_saved": embeddings_saved,
+        "diff": diff_report(diff),
         "status": "success"
     }
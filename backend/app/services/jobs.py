@@ -0,0 +1,152 @@
+# backend/app/services/jobs.py
+"""
+Background ingestion queue.
+
+Jobs are persisted in MongoDB (so they survive restarts) and executed by a
+bounded local thread pool that feeds the concurrent ingestion pipeline. A job is claimed atomically before it runs, so
+several processes can share one queue without running a file twice.
+
+A claimed job is leased to its process: a heartbeat thread renews the lease
+(updated_at) of every job the process is running, including jobs waiting in
+the pipeline queue or in one long stage, so recover() in another worker only
+re-queues jobs whose owner stopped renewing them.
+"""
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import app.config as config
+from app.models import db_models
+from app.services import metrics
+from app.services.ingest import process_and_store_file
+from app.services.pipeline import get_pipeline
+from app.utils import generate_id, log
+
+_executor = ThreadPoolExecutor(max_workers=config.INGEST_WORKERS, thread_name_prefix="ingest")
+
+_running = set()  # ids of jobs this process holds the lease of
+_running_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def _owner():
+    # Computed per call: forked workers must not share their parent's identity
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(config.JOB_HEARTBEAT_SECONDS)
+        with _running_lock:
+            job_ids = list(_running)
+        if not job_ids:
+            continue
+        try:
+            db_models.heartbeat_jobs(job_ids, _owner())
+        except Exception as e:
+            log(f" Job heartbeat failed: {e}")
+
+
+def _start_heartbeat():
+    global _heartbeat_thread
+    with _running_lock:
+        if _heartbeat_thread is None or not _heartbeat_thread.is_alive():
+            _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+            _heartbeat_thread.start()
+
+
+def enqueue(file_path, filename, doc_id=None):
+    """
+    Persist a job for a saved file and schedule it. Returns the job document.
+    """
+    job = db_models.create_job(generate_id("job"), filename, file_path, doc_id=doc_id)
+    schedule(job["job_id"])
+    return job
+
+
+def schedule(job_id):
+    """
+    Run an already persisted job on the local pool (the async app creates
+    jobs with its own Mongo client, then hands them over here).
+    """
+    metrics.incr("jobs.enqueued")
+    _executor.submit(_run, job_id)
+
+
+def _progress_callback(job_id):
+    def progress(stage, done=None, total=None):
+        fields = {"stage": stage}
+        if done is not None:
+            fields["chunks_done"] = done
+        if total is not None:
+            fields["chunks_total"] = total
+        db_models.update_job(job_id, **fields)
+    return progress
+
+
+def _run(job_id):
+    job = db_models.claim_job(job_id, owner=_owner())
+    if job is None:
+        return  # already taken by another worker
+
+    log(f"⚙️ Job {job_id} started for {job['filename']}")
+    with _running_lock:
+        _running.add(job_id)
+    _start_heartbeat()
+    try:
+        _execute(job_id, job)
+    finally:
+        with _running_lock:
+            _running.discard(job_id)
+
+
+def _execute(job_id, job):
+    progress = _progress_callback(job_id)
+    try:
+        with metrics.timer("jobs.duration_ms"):
+            if config.INGEST_PIPELINE:
+                future = get_pipeline().submit(
+                    job["filepath"], filename=job["filename"], progress=progress, doc_id=job.get("doc_id")
+                )
+                result = future.result()
+            else:
+                result = process_and_store_file(
+                    job["filepath"], filename=job["filename"], progress=progress, doc_id=job.get("doc_id")
+                )
+    except Exception as e:
+        result = {"error": str(e)}
+
+    if result.get("error"):
+        log(f" Job {job_id} failed: {result['error']}")
+        metrics.incr("jobs.failed")
+        db_models.update_job(job_id, status="failed", stage="failed", error=result["error"], result=result)
+    else:
+        log(f" Job {job_id} finished")
+        metrics.incr("jobs.succeeded")
+        db_models.update_job(job_id, status="succeeded", stage="done", result=result)
+
+
+def recover():
+    """
+    Re-queue orphaned jobs and schedule everything still queued. Call once at startup.
+    """
+    try:
+        stale_before = datetime.utcnow() - timedelta(seconds=config.JOB_STALE_SECONDS)
+        requeued = db_models.requeue_stale_jobs(stale_before)
+        queued = db_models.get_queued_job_ids()
+    except Exception as e:
+        log(f" Job recovery failed: {e}")
+        return 0
+
+    for job_id in queued:
+        _executor.submit(_run, job_id)
+    if queued:
+        log(f"♻️ Resumed {len(queued)} queued ingestion jobs ({requeued} orphaned)")
+    return len(queued)
+
+
+def get_status(job_id):
+    return db_models.get_job(job_id)
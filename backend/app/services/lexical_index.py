@@ -0,0 +1,335 @@
+# backend/app/services/lexical_index.py
+"""
+Incremental BM25 inverted index over chunk text.
+
+Dense retrieval misses exact identifiers, part numbers and rare terms; this
+index catches them. Each chunk gets a dense integer id in insertion order, so
+posting lists stay sorted by appending and are stored as compact arrays
+(uint32 chunk numbers + uint16 term frequencies) instead of Python lists.
+
+Additions and removals are appended to a JSONL log (term frequencies only,
+no text) and replayed at startup, so ingest never rewrites the whole index.
+Removed chunks keep their posting entries (tombstones) but are skipped when
+scoring, until compact() rewrites the postings and the log without them.
+
+The log is shared by every worker process. Each index remembers how far it
+has read; searches stat() the log and apply only the bytes other processes
+appended since, and reload it whole when compaction replaced the file.
+Appends and compaction hold an exclusive lock on `<path>.lock`, so a
+compaction never drops lines another process is appending.
+"""
+import fcntl
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+
+from app.utils import log
+
+# Words, numbers and identifiers such as "AB-1234", "v2.1" or "max_retries"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+_MAX_TF = 65535
+
+
+def tokenize(text):
+    """
+    Lowercased terms. Compound identifiers are indexed whole and by part, so
+    "AB-1234" matches queries for "ab-1234" as well as "1234".
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p)
+    return terms
+
+
+class LexicalIndex:
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._clear()
+        if path and os.path.exists(path):
+            with self._lock:
+                self._sync()
+            log(f"🔤 Loaded lexical index: {len(self)} chunks, {len(self._postings)} terms")
+
+    def _clear(self):
+        self._chunk_ids = []      # chunk number -> chunk_id
+        self._doc_ids = []        # chunk number -> doc_id
+        self._numbers = {}        # chunk_id -> chunk number (live chunks only)
+        self._removed = set()     # chunk numbers of removed chunks
+        self._lengths = array("I")
+        self._total_length = 0
+        self._postings = {}       # term -> (array of chunk numbers, array of tfs)
+        self._log_id = None       # (st_dev, st_ino) of the log file read so far
+        self._offset = 0          # bytes of the log applied
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._numbers
+
+    # --- Building ---
+
+    def _add(self, chunk_id, doc_id, tf):
+        number = len(self._chunk_ids)
+        self._numbers[chunk_id] = number
+        self._chunk_ids.append(chunk_id)
+        self._doc_ids.append(doc_id)
+        length = sum(tf.values())
+        self._lengths.append(length)
+        self._total_length += length
+        for term, count in tf.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = (array("I"), array("H"))
+            posting[0].append(number)
+            posting[1].append(min(count, _MAX_TF))
+
+    def _apply(self, lines):
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn line after a crash
+            if entry.get("del"):
+                self._remove(entry["id"])
+            elif entry["id"] not in self._numbers:
+                self._add(entry["id"], entry["doc"], entry["tf"])
+
+    @contextmanager
+    def _file_lock(self):
+        # Serializes log writers across processes; readers never take it
+        if not self.path:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _sync(self):
+        """
+        Apply log lines appended since the last read (by any process), or
+        reload from scratch if compaction replaced the file. Caller holds
+        self._lock.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if (st.st_dev, st.st_ino) != self._log_id or st.st_size < self._offset:
+                self._clear()
+                self._log_id = (st.st_dev, st.st_ino)
+            if st.st_size == self._offset:
+                return
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        # A writer may be mid-line; leave its partial line for the next sync
+        end = data.rfind(b"\n") + 1
+        self._apply(data[:end].decode("utf-8").splitlines())
+        self._offset += end
+
+    def refresh(self):
+        """
+        Pick up chunks other processes added or removed. Costs one stat()
+        when the log has not changed.
+        """
+        if not self.path:
+            return
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (st.st_dev, st.st_ino) == self._log_id and st.st_size == self._offset:
+            return
+        with self._lock:
+            self._sync()
+
+    def add(self, chunks):
+        """
+        Index chunk dicts ({"chunk_id", "doc_id", "text"}). Chunks already in
+        the index are skipped: chunk ids are content-addressed.
+
+        Returns:
+            number of newly indexed chunks
+        """
+        entries = []
+        with self._lock, self._file_lock():
+            if self.path:
+                self._sync()
+            for c in chunks:
+                if c["chunk_id"] in self._numbers:
+                    continue
+                tf = dict(Counter(tokenize(c["text"])))
+                self._add(c["chunk_id"], c["doc_id"], tf)
+                entries.append({"id": c["chunk_id"], "doc": c["doc_id"], "tf": tf})
+            self._append_log(entries)
+        return len(entries)
+
+    def _remove(self, chunk_id):
+        number = self._numbers.pop(chunk_id, None)
+        if number is None:
+            return False
+        self._removed.add(number)
+        self._total_length -= self._lengths[number]
+        return True
+
+    def remove(self, chunk_ids):
+        """
+        Drop chunks from search results. Returns the number removed.
+        """
+        with self._lock, self._file_lock():
+            if self.path:
+                self._sync()
+            entries = [{"id": i, "del": 1} for i in chunk_ids if self._remove(i)]
+            self._append_log(entries)
+        return len(entries)
+
+    def _append_log(self, entries):
+        # Caller holds both locks and has synced, so the log ends where our read did
+        if entries and self.path:
+            with open(self.path, "ab") as f:
+                f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode("utf-8"))
+                st = os.fstat(f.fileno())
+            self._log_id, self._offset = (st.st_dev, st.st_ino), st.st_size
+
+    def compact(self, progress=None):
+        """
+        Renumber live chunks, drop removed ones from every posting list and
+        rewrite the log with live chunks only.
+
+        Returns:
+            number of removed chunks purged
+        """
+        with self._lock, self._file_lock():
+            if self.path:
+                self._sync()
+            purged = len(self._removed)
+            if not purged:
+                return 0
+            if progress:
+                progress("postings")
+            renumber = {}
+            chunk_ids, doc_ids, lengths = [], [], array("I")
+            for old, chunk_id in enumerate(self._chunk_ids):
+                if old in self._removed:
+                    continue
+                renumber[old] = len(chunk_ids)
+                chunk_ids.append(chunk_id)
+                doc_ids.append(self._doc_ids[old])
+                lengths.append(self._lengths[old])
+
+            postings = {}
+            tfs_by_chunk = [{} for _ in chunk_ids] if self.path else None
+            for term, (numbers, tfs) in self._postings.items():
+                kept = array("I"), array("H")
+                for number, tf in zip(numbers, tfs):
+                    new = renumber.get(number)
+                    if new is None:
+                        continue
+                    kept[0].append(new)
+                    kept[1].append(tf)
+                    if tfs_by_chunk is not None:
+                        tfs_by_chunk[new][term] = tf
+                if kept[0]:
+                    postings[term] = kept
+
+            if self.path:
+                if progress:
+                    progress("writing")
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for chunk_id, doc_id, tf in zip(chunk_ids, doc_ids, tfs_by_chunk):
+                        f.write(json.dumps({"id": chunk_id, "doc": doc_id, "tf": tf}, separators=(",", ":")) + "\n")
+                os.replace(tmp, self.path)
+                st = os.stat(self.path)
+                self._log_id, self._offset = (st.st_dev, st.st_ino), st.st_size
+
+            self._chunk_ids, self._doc_ids, self._lengths = chunk_ids, doc_ids, lengths
+            self._numbers = {chunk_id: number for number, chunk_id in enumerate(chunk_ids)}
+            self._postings = postings
+            self._removed = set()
+        log(f"🔤 Compacted lexical index: purged {purged} removed chunks")
+        return purged
+
+    # --- Scoring ---
+
+    def search(self, query, top_k=5, doc_ids=None):
+        """
+        BM25 search, optionally restricted to chunks of the given documents.
+
+        Returns:
+            list of (chunk_id, doc_id, score), best first
+        """
+        self.refresh()
+        # compact() swaps these structures; score against one consistent set
+        with self._lock:
+            n = len(self._numbers)
+            chunk_ids, chunk_docs, lengths = self._chunk_ids, self._doc_ids, self._lengths
+            postings, removed, total_length = self._postings, self._removed, self._total_length
+        if not n:
+            return []
+        avg_length = total_length / n or 1.0
+        k1, b = self.k1, self.b
+
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            # Removed chunks keep their postings; df counts live chunks only, like n
+            live = [(number, tf) for number, tf in zip(*posting) if number not in removed]
+            if not live:
+                continue
+            df = len(live)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for number, tf in live:
+                if doc_ids is not None and chunk_docs[number] not in doc_ids:
+                    continue
+                norm = k1 * (1 - b + b * lengths[number] / avg_length)
+                scores[number] = scores.get(number, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(chunk_ids[i], chunk_docs[i], score) for i, score in best]
+
+    def stats(self):
+        self.refresh()
+        total = len(self._chunk_ids)
+        return {
+            "chunks": len(self._numbers),
+            "tombstones": len(self._removed),
+            "tombstone_ratio": len(self._removed) / total if total else 0.0,
+            "terms": len(self._postings),
+            "postings": sum(len(p[0]) for p in self._postings.values())
+        }
+
+
+# -----------------------------
+# Rank fusion
+# -----------------------------
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse ranked lists of ids: score(id) = sum over lists of 1 / (k + rank).
+
+    Returns:
+        list of (id, score), best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,141 @@
+# backend/app/services/local_embeddings.py
+"""
+Local CPU embeddings with sentence-transformers (EMBEDDING_PROVIDER=local).
+
+The model is loaded once per process, on first use, with one of three
+runtimes (LOCAL_EMBED_RUNTIME):
+    torch       - the model as published
+    torch-int8  - linear layers dynamically quantized to int8
+    onnx        - ONNX Runtime via optimum; LOCAL_EMBED_ONNX_FILE selects a
+                  quantized export such as onnx/model_quantized.onnx
+Texts are embedded in batches of similar length, so little compute is spent
+on padding, and one inference runs at a time: each already uses
+LOCAL_EMBED_THREADS cores.
+
+Models trained with task prefixes (PROMPTS) get the query or document
+prefix their caller asks for.
+"""
+import threading
+import time
+
+import app.config as config
+from app.services import metrics
+from app.utils import log
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+RUNTIMES = ("torch", "torch-int8", "onnx")
+
+# Task prefixes a model was trained with; its embeddings degrade without them
+PROMPTS = {
+    "nomic-ai/nomic-embed-text-v1": {"query": "search_query: ", "document": "search_document: "},
+    "nomic-ai/nomic-embed-text-v1.5": {"query": "search_query: ", "document": "search_document: "},
+}
+
+_model = None
+_load_lock = threading.Lock()
+_infer_lock = threading.Lock()
+
+
+# -----------------------------
+# Model loading
+# -----------------------------
+def load_model(name=None, runtime=None, threads=None, onnx_file=None):
+    """
+    Load a sentence-transformers model for CPU inference.
+    Arguments default to EMBEDDING_MODEL and the LOCAL_EMBED_* settings.
+    """
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        raise RuntimeError("EMBEDDING_PROVIDER=local requires the sentence-transformers package")
+    name = name or config.EMBEDDING_MODEL
+    runtime = runtime or config.LOCAL_EMBED_RUNTIME
+    threads = config.LOCAL_EMBED_THREADS if threads is None else threads
+    onnx_file = config.LOCAL_EMBED_ONNX_FILE if onnx_file is None else onnx_file
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown local embedding runtime: {runtime} (available: {', '.join(RUNTIMES)})")
+
+    start = time.perf_counter()
+    if runtime == "onnx":
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+        if onnx_file:
+            model_kwargs["file_name"] = onnx_file
+        model = SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=model_kwargs, trust_remote_code=True)
+    else:
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(name, device="cpu", trust_remote_code=True)
+        if runtime == "torch-int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+
+    log(f"🧠 Loaded local embedding model {name} ({runtime}) in {time.perf_counter() - start:.1f}s")
+    return model
+
+
+def get_model():
+    """
+    The process-wide model, loaded on first use.
+    """
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
+
+
+# -----------------------------
+# Inference
+# -----------------------------
+def length_batches(texts, batch_size):
+    """
+    Indices of `texts` grouped into batches of similar length, longest first.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def prompt_prefix(prompt, name=None):
+    """
+    Prefix for a "query" or "document" text under model `name`
+    (default EMBEDDING_MODEL); empty for models without task prefixes.
+    """
+    if prompt not in (None, "query", "document"):
+        raise ValueError(f"Unknown embedding prompt: {prompt}")
+    return PROMPTS.get(name or config.EMBEDDING_MODEL, {}).get(prompt, "")
+
+
+def embed(texts, model=None, batch_size=None, prompt=None):
+    """
+    Normalized embeddings of `texts`, in input order.
+    `prompt` ("query" or "document") selects the model's task prefix.
+    """
+    model = model or get_model()
+    batch_size = batch_size or config.LOCAL_EMBED_BATCH_SIZE
+    prefix = prompt_prefix(prompt)
+    if prefix:
+        texts = [prefix + text for text in texts]
+    embeddings = [None] * len(texts)
+    for batch in length_batches(texts, batch_size):
+        start = time.perf_counter()
+        with _infer_lock:
+            vectors = model.encode(
+                [texts[i] for i in batch], batch_size=len(batch),
+                normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+            )
+        metrics.observe("embeddings.batch_latency_ms", (time.perf_counter() - start) * 1000)
+        metrics.observe("embeddings.batch_items", len(batch))
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector.tolist()
+    return embeddings
@@ -0,0 +1,75 @@
+# backend/app/services/metrics.py
+"""
+Tiny in-process metrics registry (per worker process).
+
+Counters only go up, gauges hold the last value set, and timings keep
+count/sum/min/max/last of observed values (milliseconds by convention).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+
+def incr(name, value=1):
+    """
+    Increment a counter.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """
+    Set a gauge to its current value.
+    """
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """
+    Record one observation of a timing/size distribution.
+    """
+    with _lock:
+        stats = _timings.get(name)
+        if stats is None:
+            _timings[name] = {"count": 1, "sum": value, "min": value, "max": value, "last": value}
+            return
+        stats["count"] += 1
+        stats["sum"] += value
+        stats["min"] = min(stats["min"], value)
+        stats["max"] = max(stats["max"], value)
+        stats["last"] = value
+
+
+@contextmanager
+def timer(name):
+    """
+    Context manager that observes the elapsed wall time in milliseconds.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000)
+
+
+def snapshot():
+    """
+    Return a JSON-serialisable copy of all metrics.
+    """
+    with _lock:
+        timings = {
+            name: dict(stats, avg=stats["sum"] / stats["count"])
+            for name, stats in _timings.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings
+        }
@@ -0,0 +1,304 @@
+# backend/app/services/pipeline.py
+"""
+Concurrent ingestion pipeline.
+
+    submit() -> [extract: process pool] -> [embed: thread pool] -> [writer: 1 thread]
+
+CPU-bound parsing/chunking runs in worker processes, network-bound embedding
+calls overlap in threads, and a single writer batches vector upserts and
+Mongo chunk inserts across documents (document rows and removals are still
+written per document). Stages are connected by bounded queues, so a slow
+stage back-pressures the ones in front of it instead of buffering whole
+documents in memory.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import app.config as config
+from app.models.db_models import insert_chunks_metadata
+from app.services import corpus_version, metrics
+from app.services.chunker import chunk_file
+from app.services.ingest import (
+    CHUNK_OPTIONS,
+    validate_file,
+    document_id,
+    build_chunk_records,
+    diff_chunk_records,
+    diff_report,
+    embed_chunk_records,
+    save_metadata
+)
+from app.services.vector_store import add_embeddings
+from app.utils import log
+from werkzeug.utils import secure_filename
+
+_STOP = object()
+
+
+def _extract_chunks(file_path):
+    # Runs in an extraction process; a generator cannot be sent back, so the chunks are listed here
+    return list(chunk_file(file_path, **CHUNK_OPTIONS))
+
+
+def _no_progress(stage, done=None, total=None):
+    pass
+
+
+class IngestPipeline:
+    def __init__(self, extract_workers=None, embed_workers=None, queue_size=None, write_batch_size=None):
+        self.extract_workers = extract_workers or config.EXTRACT_PROCESSES
+        self.embed_workers = embed_workers or config.EMBED_THREADS
+        self.write_batch_size = write_batch_size or config.VECTOR_BATCH_SIZE
+        queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+
+        self._extract_pool = ProcessPoolExecutor(max_workers=self.extract_workers)
+        self._extract_q = queue.Queue(maxsize=queue_size)
+        self._embed_q = queue.Queue(maxsize=queue_size)
+        self._write_q = queue.Queue(maxsize=queue_size)
+
+        # One dispatcher thread per extraction process keeps each process busy
+        self._extract_threads = self._start(self._extract_stage, self.extract_workers, "extract")
+        self._embed_threads = self._start(self._embed_stage, self.embed_workers, "embed")
+        self._writer_threads = self._start(self._write_stage, 1, "writer")
+
+    def _start(self, target, count, name):
+        threads = []
+        for i in range(count):
+            t = threading.Thread(target=target, name=f"ingest-{name}-{i}", daemon=True)
+            t.start()
+            threads.append(t)
+        return threads
+
+    # --- Public API ---
+
+    def submit(self, file_path, filename=None, progress=None, doc_id=None):
+        """
+        Queue a file for ingestion. Blocks while the pipeline is full.
+        `doc_id` is the stable document identity (default: from the filename).
+
+        Returns:
+            concurrent.futures.Future resolving to the same result dict as
+            process_and_store_file.
+        """
+        filename = secure_filename(filename or os.path.basename(file_path))
+        item = {
+            "file_path": file_path,
+            "filename": filename,
+            "doc_id": document_id(filename, doc_id),
+            "progress": progress or _no_progress,
+            "future": Future()
+        }
+        self._extract_q.put(item)
+        metrics.set_gauge("pipeline.extract_queue", self._extract_q.qsize())
+        return item["future"]
+
+    def close(self):
+        """
+        Drain every stage in order and stop the worker threads/processes.
+        """
+        for stage_q, threads in (
+            (self._extract_q, self._extract_threads),
+            (self._embed_q, self._embed_threads),
+            (self._write_q, self._writer_threads)
+        ):
+            for _ in threads:
+                stage_q.put(_STOP)
+            for t in threads:
+                t.join()
+        self._extract_pool.shutdown()
+
+    # --- Stages ---
+
+    def _finish(self, item, result):
+        if item["future"].done():
+            return  # already failed by an earlier step
+        if result.get("error"):
+            metrics.incr("pipeline.failed")
+        else:
+            metrics.incr("pipeline.succeeded")
+        item["future"].set_result(result)
+
+    def _fail(self, item, stage, e):
+        log(f" Ingestion failed for {item['filename']} while {stage}: {e}")
+        self._finish(item, {"error": f"Ingestion failed for {item['filename']} while {stage}: {e}"})
+
+    def _progress(self, item, stage, done=None, total=None):
+        # Best-effort: a failed job update must not fail the document or kill the stage
+        try:
+            item["progress"](stage, done, total)
+        except Exception as e:
+            log(f" Progress update failed for {item['filename']}: {e}")
+
+    def _extract_stage(self):
+        while True:
+            item = self._extract_q.get()
+            if item is _STOP:
+                return
+            try:
+                self._extract(item)
+            except Exception as e:
+                self._fail(item, "extracting", e)
+
+    def _extract(self, item):
+        filename = item["filename"]
+        error = validate_file(item["file_path"], filename)
+        if error:
+            self._finish(item, error)
+            return
+
+        self._progress(item, "extracting")
+        try:
+            with metrics.timer("pipeline.extract_ms"):
+                chunks = self._extract_pool.submit(_extract_chunks, item["file_path"]).result()
+        except Exception as e:
+            log(f" Text extraction failed for {filename}: {e}")
+            self._finish(item, {"error": f"Text extraction failed for {filename}: {e}"})
+            return
+        if not chunks:
+            self._finish(item, {"error": f"No text could be extracted from {filename}"})
+            return
+
+        item["file_size"] = os.path.getsize(item["file_path"])
+        item["chunk_data"] = build_chunk_records(chunks, item["doc_id"])
+        item["chunks"] = len(item["chunk_data"])
+        try:
+            item["diff"] = diff_chunk_records(item["doc_id"], item["chunk_data"])
+        except Exception as e:
+            self._finish(item, {"error": f"Failed to read stored chunks for {filename}: {e}"})
+            return
+        self._progress(item, "chunking", 0, item["chunks"])
+        self._embed_q.put(item)
+        metrics.set_gauge("pipeline.embed_queue", self._embed_q.qsize())
+
+    def _embed_stage(self):
+        while True:
+            item = self._embed_q.get()
+            if item is _STOP:
+                return
+            try:
+                self._embed(item)
+            except Exception as e:
+                self._fail(item, "embedding", e)
+
+    def _embed(self, item):
+        total = len(item["diff"]["write"])
+        self._progress(item, "embedding", 0, total)
+        try:
+            with metrics.timer("pipeline.embed_ms"):
+                item["embeddings"], item["embeddings_created"] = embed_chunk_records(item["diff"]["write"])
+        except Exception as e:
+            log(f" Embedding creation failed for {item['filename']}: {e}")
+            self._finish(item, {"error": f"Embedding creation failed for {item['filename']}: {e}"})
+            return
+        self._progress(item, "embedding", total, total)
+        self._write_q.put(item)
+        metrics.set_gauge("pipeline.write_queue", self._write_q.qsize())
+
+    def _write_stage(self):
+        pending = []
+        rows = 0
+        while True:
+            try:
+                # Flush a partial batch as soon as the queue runs dry
+                item = self._write_q.get(timeout=0.05 if pending else None)
+            except queue.Empty:
+                self._flush(pending)
+                pending, rows = [], 0
+                continue
+            if item is _STOP:
+                self._flush(pending)
+                return
+            pending.append(item)
+            rows += len(item["diff"]["write"])
+            if rows >= self.write_batch_size:
+                self._flush(pending)
+                pending, rows = [], 0
+
+    def _flush(self, items):
+        try:
+            self._write(items)
+        except Exception as e:
+            # Items finished before the error keep their result
+            for item in items:
+                self._fail(item, "storing", e)
+
+    def _write(self, items):
+        """
+        Store a group of documents: one vector upsert and one Mongo chunk
+        insert for the whole group, then per-document metadata.
+        """
+        if not items:
+            return
+        # Only new and moved chunks are written; unchanged ones are already stored
+        chunk_data = [c for item in items for c in item["diff"]["write"]]
+        embeddings = [e for item in items for e in item["embeddings"]]
+        for item in items:
+            self._progress(item, "storing", 0, len(item["diff"]["write"]))
+
+        try:
+            with metrics.timer("pipeline.write_ms"):
+                report = add_embeddings(chunk_data, embeddings, batch_size=self.write_batch_size)
+        except Exception as e:
+            report = {"added": 0, "failed": [{"batch": 0, "start": 0, "end": len(chunk_data), "error": str(e)}]}
+
+        # Map failed batches back to the documents whose rows they covered
+        stored, start = [], 0
+        for item in items:
+            end = start + len(item["diff"]["write"])
+            failed = [f for f in report["failed"] if f["start"] < end and f["end"] > start]
+            start = end
+            if failed:
+                self._finish(item, {"error": f"Failed to store embeddings for {item['filename']}", "failed_batches": failed})
+            else:
+                stored.append(item)
+
+        try:
+            with metrics.timer("pipeline.metadata_ms"):
+                insert_chunks_metadata([c for item in stored for c in item["diff"]["added_chunks"]])
+        except Exception as e:
+            for item in stored:
+                self._fail(item, "storing chunk metadata", e)
+            return
+
+        for item in stored:
+            filename = item["filename"]
+            total = len(item["chunk_data"])
+            self._progress(item, "saving_metadata", total, total)
+            try:
+                save_metadata(
+                    filename, item["file_path"], item["file_size"], item["doc_id"], item["chunk_data"], item["diff"],
+                    insert_chunks=False
+                )
+            except Exception as e:
+                log(f" Failed to store metadata for {filename}: {e}")
+                self._finish(item, {"error": f"Failed to store metadata for {filename}: {e}"})
+                continue
+
+            corpus_version.bump()
+            log(f" Document {filename} successfully processed and stored.")
+            self._finish(item, {
+                "filename": filename,
+                "doc_id": item["doc_id"],
+                "chunks": item["chunks"],
+                "embeddings_created": item["embeddings_created"],
+                "embeddings_saved": item["chunks"] - item["embeddings_created"],
+                "diff": diff_report(item["diff"]),
+                "status": "success"
+            })
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """
+    Process-wide pipeline, started on first use.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = IngestPipeline()
+        return _pipeline
@@ -0,0 +1,53 @@
+# backend/app/services/rerank.py
+"""
+Maximal marginal relevance (MMR) over retrieved candidates.
+
+Plain top-k retrieval often returns several near-identical chunks (the same
+passage from overlapping windows or repeated pages). MMR picks the final set
+one chunk at a time, trading relevance to the question against similarity to
+the chunks already picked:
+
+    score(c) = lambda * sim(query, c) - (1 - lambda) * max(sim(c, s) for s picked)
+
+All similarities come from one matrix product; each pick is a vectorized
+argmax, so the only Python loop is over the top_k picks.
+"""
+import numpy as np
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr(query_embedding, embeddings, top_k, lambda_mult=0.5, min_score=None):
+    """
+    Pick up to `top_k` candidates by MMR. Candidates whose cosine similarity
+    to the query is below `min_score` are never picked.
+
+    Returns:
+        (list of candidate indices in pick order, their query similarities)
+    """
+    if not len(embeddings) or top_k <= 0:
+        return [], []
+    candidates = _normalize(np.asarray(embeddings, dtype=np.float32))
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    # -inf marks candidates that can no longer be picked
+    mask = np.zeros(len(candidates), dtype=np.float32)
+    if min_score is not None:
+        mask[relevance < min_score] = -np.inf
+    # Cosine is >= -1, so starting here leaves the first pick to relevance alone
+    redundancy = np.full(len(candidates), -1.0, dtype=np.float32)
+
+    picked = []
+    for _ in range(min(top_k, int(np.isfinite(mask).sum()))):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy + mask
+        i = int(np.argmax(scores))
+        picked.append(i)
+        mask[i] = -np.inf
+        redundancy = np.maximum(redundancy, similarity[i])
+    return picked, relevance[picked].tolist()
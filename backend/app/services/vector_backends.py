@@ -0,0 +1,1023 @@
+# backend/app/services/vector_backends.py
+"""
+Vector-store engines behind a common interface.
+
+Every backend speaks the Chroma result shape (lists of per-query lists of
+ids / documents / metadatas / distances) and Chroma-style `where` filters, so
+vector_store.py and its callers do not care which engine is active.
+
+    chroma  - persistent Chroma collection (default)
+    numpy   - exact search over one contiguous, pre-normalized matrix
+    faiss   - numpy row storage plus a FAISS ANN index (flat, IVF-Flat, IVF-PQ, HNSW)
+"""
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+import app.config as config
+from app.utils import log
+from app.services import metrics
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+# -----------------------------
+# Metadata filters
+# -----------------------------
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def match_where(meta, where):
+    """
+    Evaluate a Chroma-style `where` filter against one metadata dict.
+    """
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_where(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, arg in cond.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+def field_constraint(where, field):
+    """
+    Values a `where` filter restricts `field` to, or None if it does not
+    pin the field to an explicit set ($eq / $in / plain equality, possibly
+    inside $and).
+    """
+    if not where:
+        return None
+    allowed = None
+    cond = where.get(field)
+    if cond is not None:
+        if not isinstance(cond, dict):
+            allowed = {cond}
+        elif "$eq" in cond:
+            allowed = {cond["$eq"]}
+        elif "$in" in cond:
+            allowed = set(cond["$in"])
+    for clause in where.get("$and", ()):
+        values = field_constraint(clause, field)
+        if values is not None:
+            allowed = values if allowed is None else allowed & values
+    return allowed
+
+
+def _empty_results(n_queries=1):
+    return {
+        "ids": [[] for _ in range(n_queries)],
+        "documents": [[] for _ in range(n_queries)],
+        "metadatas": [[] for _ in range(n_queries)],
+        "distances": [[] for _ in range(n_queries)]
+    }
+
+
+class VectorStore:
+    """
+    Interface implemented by every backend.
+    """
+    name = "base"
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, top_k=5, where=None, **search_params):
+        """
+        Batched top-k search. Returns Chroma-shaped results with one inner
+        list per query embedding; distances are smaller-is-closer.
+        `search_params` are engine-specific knobs (e.g. nprobe) that other
+        engines ignore.
+        """
+        raise NotImplementedError
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        """
+        Remove the given ids; unknown ids are ignored.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Fragmentation figures: live vectors, deleted rows still held
+        (tombstones) and their share of all rows.
+        """
+        return {"vectors": self.count(), "tombstones": 0, "tombstone_ratio": 0.0}
+
+    def compact(self, progress=None):
+        """
+        Physically purge deleted rows. `progress(stage)` reports the current
+        step. Returns the number of rows purged.
+        """
+        return 0
+
+    def max_batch_size(self):
+        """
+        Largest upsert the engine accepts in one call (None if unbounded).
+        """
+        return None
+
+    def warm_up(self):
+        """
+        Load on-disk structures now rather than on the first user request.
+        """
+        sample = self.get(limit=1, include=("embeddings",))
+        if sample.get("embeddings") is not None and len(sample["embeddings"]):
+            self.query([list(sample["embeddings"][0])], top_k=1)
+
+
+# -----------------------------
+# Chroma
+# -----------------------------
+class ChromaStore(VectorStore):
+    name = "chroma"
+
+    def __init__(self, path=None, collection_name=None, client=None):
+        import chromadb
+        if client is None:
+            os.makedirs(path or config.VECTOR_DB_DIR, exist_ok=True)
+            client = chromadb.PersistentClient(path=path or config.VECTOR_DB_DIR)
+        self.client = client
+        self.collection = client.get_or_create_collection(name=collection_name or config.VECTOR_COLLECTION)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, top_k=5, where=None, **search_params):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=top_k, where=where or None)
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        return self.collection.get(
+            ids=ids, where=where or None, limit=limit, offset=offset or None, include=list(include)
+        )
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def count(self):
+        return self.collection.count()
+
+    def max_batch_size(self):
+        getter = getattr(self.client, "get_max_batch_size", None)
+        if callable(getter):
+            return getter()
+        return getattr(self.client, "max_batch_size", None)
+
+
+# -----------------------------
+# NumPy exact search
+# -----------------------------
+class NumpyStore(VectorStore):
+    """
+    Exact cosine search over a contiguous float32/float16 matrix whose rows are
+    normalized on insert, so top-k is one matrix product plus argpartition.
+
+    Persistence is append-only: every upsert writes one segment (a .npy matrix
+    plus a .jsonl of ids/documents/metadatas) under `path`. Deletes
+    are segments of id-only rows: a deleted row stays in the matrix as a
+    tombstone, masked out of every search, and its id gets a fresh row if it
+    is upserted again. compact() drops the tombstones and replaces every
+    segment so far with one snapshot (snapshot_N = segments before N).
+
+    At startup the latest snapshot's vectors are memory-mapped (copy-on-write,
+    so the file is never modified) rather than read; only its ids, documents
+    and metadata are parsed, and only the segments appended after it are
+    copied into the in-memory matrix, in order; later rows win. Rows
+    [0, _frozen_rows) are served from the mapping, later rows from _matrix.
+
+    Rows are also partitioned by the metadata fields in PARTITION_FIELDS, so a
+    filter such as {"doc_id": {"$in": [...]}} only scores the selected
+    documents' rows instead of the whole matrix.
+    """
+    name = "numpy"
+
+    PARTITION_FIELDS = ("doc_id", "content_hash")
+
+    # float16 rows are upcast in blocks of this many rows for the BLAS product
+    SCORE_BLOCK = 65536
+
+    def __init__(self, path=None, dtype=None, persist=True):
+        self.path = path or os.path.join(config.VECTOR_DB_DIR, "numpy_store")
+        self.dtype = np.dtype(dtype or config.VECTOR_DTYPE)
+        self.persist = persist
+        self._lock = threading.RLock()
+        self._matrix = None      # in-memory rows from _frozen_rows on
+        self._frozen = None      # memory-mapped snapshot rows
+        self._frozen_rows = 0
+        self._size = 0
+        self._ids = []
+        self._rows = {}          # id -> row
+        self._documents = []
+        self._metadatas = []
+        self._partitions = {field: {} for field in self.PARTITION_FIELDS}  # field -> value -> set of rows
+        self._deleted = set()    # rows of deleted ids
+        self._deleted_rows = None  # sorted array of _deleted, built on demand
+        self._segments = 0
+        self._base = 0           # segments before this one are covered by a snapshot
+        self._compacting = threading.Lock()
+        if persist and os.path.isdir(self.path):
+            self._load()
+
+    # --- Storage ---
+
+    @property
+    def _dim(self):
+        return self._matrix.shape[1] if self._matrix is not None else None
+
+    def _ensure_capacity(self, dim, extra):
+        if self._matrix is None:
+            self._matrix = np.zeros((max(1024, extra), dim), dtype=self.dtype)
+            return
+        if self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._matrix.shape[1]}")
+        used = self._size - self._frozen_rows
+        if used + extra > len(self._matrix):
+            grown = np.zeros((max(used + extra, 2 * len(self._matrix)), dim), dtype=self.dtype)
+            grown[:used] = self._matrix[:used]
+            self._matrix = grown
+
+    def _set_row(self, row, vector):
+        if row < self._frozen_rows:
+            self._frozen[row] = vector  # copy-on-write: only this page leaves the mapping
+        else:
+            self._matrix[row - self._frozen_rows] = vector
+
+    def _take(self, rows):
+        """
+        Stored vectors of `rows` (row numbers), from the mapping or the matrix.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        frozen = self._frozen_rows
+        if not frozen:
+            return self._matrix[rows]
+        out = np.empty((len(rows), self._dim), dtype=self.dtype)
+        mapped = rows < frozen
+        out[mapped] = self._frozen[rows[mapped]]
+        out[~mapped] = self._matrix[rows[~mapped] - frozen]
+        return out
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _partition(self, row, meta, add=True):
+        for field, values in self._partitions.items():
+            value = (meta or {}).get(field)
+            if value is None:
+                continue
+            if add:
+                values.setdefault(value, set()).add(row)
+                continue
+            rows = values.get(value)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del values[value]
+
+    def _apply(self, ids, vectors, documents, metadatas):
+        self._ensure_capacity(vectors.shape[1], len(ids))
+        for i, item_id in enumerate(ids):
+            row = self._rows.get(item_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._rows[item_id] = row
+                self._ids.append(item_id)
+                self._documents.append(None)
+                self._metadatas.append(None)
+            old_meta = self._metadatas[row]
+            self._set_row(row, vectors[i])
+            self._documents[row] = documents[i]
+            self._metadatas[row] = metadatas[i]
+            if old_meta != metadatas[i]:
+                if old_meta is not None:
+                    self._partition(row, old_meta, add=False)
+                self._partition(row, metadatas[i])
+
+    def _remove(self, ids):
+        removed = 0
+        for item_id in ids:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                continue
+            self._partition(row, self._metadatas[row], add=False)
+            self._documents[row] = None
+            self._metadatas[row] = None
+            self._deleted.add(row)
+            removed += 1
+        if removed:
+            self._deleted_rows = None
+        return removed
+
+    def _dead_rows(self):
+        if self._deleted_rows is None:
+            self._deleted_rows = np.fromiter(sorted(self._deleted), dtype=np.int64, count=len(self._deleted))
+        return self._deleted_rows
+
+    def _segment_path(self, number, ext):
+        return os.path.join(self.path, f"segment_{number:06d}.{ext}")
+
+    def _write_segment(self, ids, vectors, documents, metadatas, deleted=False):
+        os.makedirs(self.path, exist_ok=True)
+        number = self._segments
+        tmp = self._segment_path(number, "npy.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, vectors.astype(self.dtype))
+        rows_tmp = self._segment_path(number, "jsonl.tmp")
+        with open(rows_tmp, "w", encoding="utf-8") as f:
+            if deleted:
+                f.write("".join(json.dumps({"id": item_id, "deleted": True}) + "\n" for item_id in ids))
+            else:
+                for item_id, doc, meta in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": item_id, "document": doc, "metadata": meta}) + "\n")
+        # The .npy is published last: a segment only counts once both files exist
+        os.replace(rows_tmp, self._segment_path(number, "jsonl"))
+        os.replace(tmp, self._segment_path(number, "npy"))
+        self._segments += 1
+
+    def _snapshot_path(self, number, ext):
+        return os.path.join(self.path, f"snapshot_{number:06d}.{ext}")
+
+    def _latest_snapshot(self):
+        numbers = [
+            int(name[len("snapshot_"):-len(".npy")]) for name in os.listdir(self.path)
+            if name.startswith("snapshot_") and name.endswith(".npy")
+        ]
+        return max(numbers, default=None)
+
+    def _replay(self, npy_path, jsonl_path):
+        vectors = np.load(npy_path)
+        ids, documents, metadatas, deleted = [], [], [], []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if row.get("deleted"):
+                    deleted.append(row["id"])
+                    continue
+                ids.append(row["id"])
+                documents.append(row["document"])
+                metadatas.append(row["metadata"])
+        if ids:
+            self._apply(ids, vectors, documents, metadatas)
+        self._remove(deleted)
+
+    def _map_snapshot(self, number):
+        """
+        Serve a snapshot's vectors from a memory mapping. Snapshots hold one
+        live row per id, so rows map 1:1 and only their jsonl is parsed.
+        """
+        npy_path, jsonl_path = self._snapshot_path(number, "npy"), self._snapshot_path(number, "jsonl")
+        vectors = np.load(npy_path, mmap_mode="c")
+        if vectors.dtype != self.dtype or not len(vectors):
+            self._replay(npy_path, jsonl_path)  # VECTOR_DTYPE changed since it was written: convert
+            return
+        ids, documents, metadatas = [], [], []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                ids.append(row["id"])
+                documents.append(row["document"])
+                metadatas.append(row["metadata"])
+        self._reset(np.zeros((1024, vectors.shape[1]), dtype=self.dtype), ids, documents, metadatas)
+        self._frozen, self._frozen_rows = vectors, len(ids)
+
+    def _load(self):
+        start = time.perf_counter()
+        number = self._latest_snapshot()
+        if number is None:
+            number = 0
+        else:
+            self._map_snapshot(number)
+        self._base = number
+        while os.path.exists(self._segment_path(number, "npy")):
+            self._replay(self._segment_path(number, "npy"), self._segment_path(number, "jsonl"))
+            number += 1
+        self._segments = number
+        log(f"📦 Loaded {self._size} vectors ({self._frozen_rows} memory-mapped) from {number - self._base} "
+            f"NumPy segments in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # --- Interface ---
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = self._normalize(embeddings)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        with self._lock:
+            if self.persist:
+                self._write_segment(ids, vectors, documents, metadatas)
+            self._apply(ids, vectors, documents, metadatas)
+
+    def delete(self, ids):
+        with self._lock:
+            ids = [i for i in ids if i in self._rows]
+            if not ids:
+                return
+            if self.persist:
+                self._write_segment(ids, np.zeros((0, self._dim), dtype=np.float32), None, None, deleted=True)
+            self._remove(ids)
+
+    def _candidate_rows(self, where):
+        """
+        Rows that can match `where`, narrowed through the partitions when the
+        filter pins a partitioned field; None means every row.
+        """
+        candidates = None
+        for field, values in self._partitions.items():
+            allowed = field_constraint(where, field)
+            if allowed is None:
+                continue
+            rows = set()
+            for value in allowed:
+                rows.update(values.get(value, ()))
+            candidates = rows if candidates is None else candidates & rows
+        return candidates
+
+    def _filter_rows(self, where):
+        """
+        Sorted rows matching `where`; costs O(selected rows) for partitioned fields.
+        """
+        candidates = self._candidate_rows(where)
+        rows = self._live_rows() if candidates is None else sorted(candidates)
+        return np.fromiter((r for r in rows if match_where(self._metadatas[r], where)), dtype=np.int64)
+
+    def _live_rows(self):
+        if not self._deleted:
+            return range(self._size)
+        return [r for r in range(self._size) if r not in self._deleted]
+
+    def _results(self, labels, scores):
+        results = _empty_results(len(labels))
+        for q in range(len(labels)):
+            for row, score in zip(labels[q], scores[q]):
+                if row < 0:
+                    continue
+                results["ids"][q].append(self._ids[row])
+                results["documents"][q].append(self._documents[row])
+                results["metadatas"][q].append(self._metadatas[row])
+                results["distances"][q].append(float(1.0 - score))
+        return results
+
+    def _scores(self, queries, rows=None):
+        """
+        Cosine similarities, shape (n_queries, n_rows).
+        """
+        if rows is None and self._frozen_rows:
+            # Score the mapped rows in place rather than gathering them
+            tail = self._matrix[:self._size - self._frozen_rows]
+            return np.concatenate([self._block_scores(queries, self._frozen),
+                                   self._block_scores(queries, tail)], axis=1)
+        matrix = self._matrix[:self._size] if rows is None else self._take(rows)
+        return self._block_scores(queries, matrix)
+
+    def _block_scores(self, queries, matrix):
+        if matrix.dtype == np.float32:
+            return queries @ matrix.T
+        out = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), self.SCORE_BLOCK):
+            block = matrix[start:start + self.SCORE_BLOCK].astype(np.float32)
+            out[:, start:start + len(block)] = queries @ block.T
+        return out
+
+    def _exact_query(self, queries, top_k, rows=None):
+        """
+        Exact top-k over all rows, or only over `rows` (sorted row numbers).
+        """
+        n = self._size - len(self._deleted) if rows is None else len(rows)
+        if not n:
+            return _empty_results(len(queries))
+
+        scores = self._scores(queries, rows)
+        if rows is None and self._deleted:
+            # Deleted rows are masked rather than copied out of the matrix
+            scores[:, self._dead_rows()] = -np.inf
+        k = min(top_k, n)
+        columns = scores.shape[1]
+        if k < columns:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(columns), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if rows is not None:
+            top = rows[top]
+        return self._results(top, top_scores)
+
+    def query(self, query_embeddings, top_k=5, where=None, **search_params):
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            rows = self._filter_rows(where) if where else None
+            return self._exact_query(queries, top_k, rows)
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        with self._lock:
+            if ids is not None:
+                rows = [self._rows[i] for i in ids if i in self._rows]
+                if where:
+                    rows = [r for r in rows if match_where(self._metadatas[r], where)]
+            elif where:
+                rows = self._filter_rows(where).tolist()
+            else:
+                rows = self._live_rows()
+            rows = list(rows)[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+
+            result = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[r] for r in rows]
+            if "embeddings" in include:
+                result["embeddings"] = self._take(rows).astype(np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+            return result
+
+    def count(self):
+        return self._size - len(self._deleted)
+
+    # --- Compaction ---
+
+    def stats(self):
+        with self._lock:
+            deleted = len(self._deleted)
+            return {
+                "vectors": self._size - deleted,
+                "tombstones": deleted,
+                "tombstone_ratio": deleted / self._size if self._size else 0.0,
+                "segments": self._segments - self._base
+            }
+
+    def _reset(self, matrix, ids, documents, metadatas):
+        self._matrix = matrix
+        self._frozen, self._frozen_rows = None, 0
+        self._size = len(ids)
+        self._ids = ids
+        self._rows = {item_id: row for row, item_id in enumerate(ids)}
+        self._documents = documents
+        self._metadatas = metadatas
+        self._partitions = {field: {} for field in self.PARTITION_FIELDS}
+        for row, meta in enumerate(metadatas):
+            self._partition(row, meta)
+        self._deleted = set()
+        self._deleted_rows = None
+
+    def _after_compact(self):
+        """
+        Hook run under the lock once rows have been renumbered.
+        """
+
+    def _write_snapshot(self, number, matrix, ids, documents, metadatas):
+        os.makedirs(self.path, exist_ok=True)
+        rows_tmp = self._snapshot_path(number, "jsonl.tmp")
+        with open(rows_tmp, "w", encoding="utf-8") as f:
+            for item_id, doc, meta in zip(ids, documents, metadatas):
+                f.write(json.dumps({"id": item_id, "document": doc, "metadata": meta}) + "\n")
+        npy_tmp = self._snapshot_path(number, "npy.tmp")
+        with open(npy_tmp, "wb") as f:
+            np.save(f, matrix[:len(ids)])
+        os.replace(rows_tmp, self._snapshot_path(number, "jsonl"))
+        os.replace(npy_tmp, self._snapshot_path(number, "npy"))
+
+        # The snapshot covers every older segment and snapshot
+        for name in os.listdir(self.path):
+            prefix, _, rest = name.partition("_")
+            if prefix in ("segment", "snapshot") and rest[:6].isdigit():
+                if int(rest[:6]) < number or (prefix == "snapshot" and rest.endswith(".tmp")):
+                    os.remove(os.path.join(self.path, name))
+        with self._lock:
+            self._base = number
+
+    def compact(self, progress=None):
+        """
+        Drop tombstones: live rows are copied into a fresh matrix (the only
+        step holding the store lock) and, when persisted, written as one
+        snapshot replacing all earlier segments. Writes and deletes made
+        meanwhile land in new segments after the snapshot.
+        """
+        progress = progress or (lambda stage: None)
+        if not self._compacting.acquire(blocking=False):
+            return 0  # already running
+        try:
+            with self._lock:
+                purged = len(self._deleted)
+                if not purged:
+                    return 0
+                progress("copying")
+                live = np.asarray(self._live_rows(), dtype=np.int64)
+                matrix = np.zeros((max(1024, len(live)), self._dim), dtype=self.dtype)
+                matrix[:len(live)] = self._take(live)
+                ids = [self._ids[r] for r in live]
+                documents = [self._documents[r] for r in live]
+                metadatas = [self._metadatas[r] for r in live]
+                self._reset(matrix, ids, documents, metadatas)
+                number = self._segments
+                # The store keeps appending to its lists; the snapshot needs its own copies
+                snapshot = (number, matrix, list(ids), list(documents), list(metadatas))
+                self._after_compact()
+
+            if self.persist:
+                progress("writing")
+                self._write_snapshot(*snapshot)
+            log(f"🧹 Compacted NumPy store: purged {purged} deleted rows, {len(live)} kept")
+            return purged
+        finally:
+            self._compacting.release()
+
+
+# -----------------------------
+# FAISS approximate search
+# -----------------------------
+FAISS_INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+class FaissStore(NumpyStore):
+    """
+    NumpyStore rows (the source of truth for ids, documents, metadata and
+    exact embeddings) with a FAISS index over them for top-k search. The FAISS
+    id of a vector is its row number.
+
+    IVF indexes need training: until `min_train` vectors exist, queries fall
+    back to exact search, and the index is trained and filled automatically
+    once enough rows arrive. The index is saved to `faiss.index` next to the
+    row segments every `save_every` new rows and memory-mapped on load. Rows
+    added after the last save are re-indexed at startup.
+
+    Deleted rows stay in the index and are excluded from searches until
+    compact() renumbers the rows; the index is then rebuilt off the lock
+    while queries use exact search.
+    """
+    name = "faiss"
+
+    def __init__(self, path=None, dtype=None, persist=True, index_type=None,
+                 nlist=None, pq_m=None, pq_bits=None, hnsw_m=None,
+                 min_train=None, save_every=None):
+        if not FAISS_AVAILABLE:
+            raise RuntimeError("VECTOR_BACKEND=faiss requires the faiss-cpu package")
+        self.index_type = index_type or config.FAISS_INDEX_TYPE
+        if self.index_type not in FAISS_INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {self.index_type} (available: {', '.join(FAISS_INDEX_TYPES)})")
+        self.nlist = nlist or config.FAISS_NLIST
+        self.pq_m = pq_m or config.FAISS_PQ_M
+        self.pq_bits = pq_bits or config.FAISS_PQ_BITS
+        self.hnsw_m = hnsw_m or config.FAISS_HNSW_M
+        self.min_train = min_train or config.FAISS_MIN_TRAIN
+        self.save_every = save_every or config.FAISS_SAVE_EVERY
+
+        self._index = None
+        self._indexed = 0        # rows [0, _indexed) are in the index
+        self._saved_rows = 0
+        self._mmapped = False
+        self._stale_rows = None  # rows upserted while compact() rebuilds the index
+        self._trained = None
+        super().__init__(path=path or os.path.join(config.VECTOR_DB_DIR, "faiss_store"), dtype=dtype, persist=persist)
+        if persist:
+            self._load_index()
+        self._sync_index()
+
+    # --- Index lifecycle ---
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "faiss.index")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "faiss.json")
+
+    def _needs_training(self):
+        return self.index_type in ("ivf_flat", "ivf_pq")
+
+    def _pick_nlist(self, n):
+        if self.nlist:
+            return self.nlist
+        # ~4*sqrt(n) lists, with at least 39 training points per list
+        return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+    def _pick_pq_m(self, dim):
+        m = min(self.pq_m, dim)
+        while dim % m:
+            m -= 1
+        return m
+
+    def _new_index(self, dim, n):
+        metric = faiss.METRIC_INNER_PRODUCT
+        if self.index_type == "flat":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        if self.index_type == "hnsw":
+            # HNSW cannot add with ids; rows are added in order so ids == rows
+            return faiss.IndexHNSWFlat(dim, self.hnsw_m, metric)
+        quantizer = faiss.IndexFlatIP(dim)
+        nlist = self._pick_nlist(n)
+        if self.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, self._pick_pq_m(dim), self.pq_bits, metric)
+        return index
+
+    def _train_and_fill(self, vectors, trained=None):
+        """
+        New index over float32 `vectors`, where row i gets id i. An emptied
+        copy of `trained` (an IVF index) is reused instead of training again.
+        """
+        n, dim = vectors.shape
+        if trained is not None:
+            index = faiss.clone_index(trained)
+            index.reset()
+        else:
+            index = self._new_index(dim, n)
+        if not index.is_trained:
+            sample = np.random.default_rng(0).choice(n, size=min(n, 256 * index.nlist), replace=False)
+            index.train(vectors[np.sort(sample)])
+        if self.index_type == "hnsw":
+            index.add(vectors)
+        else:
+            index.add_with_ids(vectors, np.arange(n, dtype=np.int64))
+        return index
+
+    def _build(self):
+        """
+        Train (if needed) and fill a new index from all stored rows.
+        """
+        start = time.perf_counter()
+        n = self._size
+        self._index = self._train_and_fill(self._take(np.arange(n)).astype(np.float32))
+        self._indexed, self._mmapped = n, False
+        log(f"🧭 Built FAISS {self.index_type} index over {n} vectors in {(time.perf_counter() - start) * 1000:.1f} ms")
+        if self.persist:
+            self.save()
+
+    def _add_rows(self, rows):
+        if not len(rows):
+            return
+        vectors = self._take(rows).astype(np.float32)
+        if self.index_type == "hnsw":
+            self._index.add(vectors)
+        else:
+            self._index.add_with_ids(vectors, np.asarray(rows, dtype=np.int64))
+        self._indexed = max(self._indexed, int(rows[-1]) + 1)
+
+    def _ensure_writable(self):
+        # A memory-mapped index is read-only; reload it into memory before adding
+        if self._mmapped:
+            self._index = faiss.read_index(self._index_path)
+            self._mmapped = False
+
+    def _sync_index(self, replaced=()):
+        """
+        Bring the index up to date with the stored rows.
+        """
+        if self._stale_rows is not None:
+            self._stale_rows.update(replaced)
+            return  # compact() is rebuilding the index and catches up afterwards
+        if self._index is None:
+            if self._size and (not self._needs_training() or self._size >= self.min_train):
+                self._build()
+            return
+        if self._indexed == self._size and not replaced:
+            return
+        self._ensure_writable()
+        if replaced:
+            if self.index_type == "hnsw":
+                log(f" HNSW cannot remove vectors; {len(replaced)} replaced rows keep their old position until rebuild()")
+            else:
+                replaced = np.asarray(sorted(replaced), dtype=np.int64)
+                self._index.remove_ids(replaced)
+                self._add_rows(replaced)
+        self._add_rows(np.arange(self._indexed, self._size))
+        if self.persist and self._indexed - self._saved_rows >= self.save_every:
+            self.save()
+
+    def save(self):
+        """
+        Write the index atomically, recording how many rows it covers.
+        """
+        with self._lock:
+            if self._index is None:
+                return
+            self._ensure_writable()
+            os.makedirs(self.path, exist_ok=True)
+            faiss.write_index(self._index, self._index_path + ".tmp")
+            os.replace(self._index_path + ".tmp", self._index_path)
+            with open(self._meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"index_type": self.index_type, "rows": self._indexed, "base": self._base}, f)
+            os.replace(self._meta_path + ".tmp", self._meta_path)
+            self._saved_rows = self._indexed
+
+    def _load_index(self):
+        if not (os.path.exists(self._index_path) and os.path.exists(self._meta_path)):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta.get("index_type") != self.index_type or meta.get("rows", 0) > self._size
+                or meta.get("base", 0) != self._base):
+            log(f" Ignoring saved FAISS index ({meta.get('index_type')}, {meta.get('rows')} rows); rebuilding")
+            return
+        try:
+            self._index = faiss.read_index(self._index_path, faiss.IO_FLAG_MMAP if config.FAISS_MMAP else 0)
+            self._mmapped = bool(config.FAISS_MMAP)
+        except RuntimeError:
+            self._index = faiss.read_index(self._index_path)
+            self._mmapped = False
+        self._indexed = self._saved_rows = meta["rows"]
+
+    def rebuild(self):
+        """
+        Retrain and refill the index from scratch (e.g. after heavy drift).
+        """
+        with self._lock:
+            if self._size:
+                self._build()
+
+    def _after_compact(self):
+        # Row numbers changed: the old index is useless, queries go exact until compact() installs a new one.
+        # Its IVF training (the coarse quantizer and PQ codebooks) still fits the data and is reused.
+        self._trained = self._index if self._needs_training() else None
+        self._index, self._indexed, self._saved_rows, self._mmapped = None, 0, 0, False
+        self._stale_rows = set()
+
+    def compact(self, progress=None):
+        progress = progress or (lambda stage: None)
+        purged = super().compact(progress)
+        if not purged:
+            return 0
+
+        with self._lock:
+            n = self._size
+            if not n or (self._needs_training() and n < self.min_train):
+                self._stale_rows = None
+                self._sync_index()
+                return purged
+            vectors = self._take(np.arange(n)).astype(np.float32)
+            trained, self._trained = self._trained, None
+
+        progress("indexing")
+        start = time.perf_counter()
+        try:
+            index = self._train_and_fill(vectors, trained)
+        except Exception:
+            with self._lock:
+                self._stale_rows = None
+                self._sync_index()
+            raise
+        with self._lock:
+            replaced = {r for r in self._stale_rows if r < n}
+            self._index, self._indexed, self._mmapped = index, n, False
+            self._stale_rows = None
+            self._sync_index(replaced)
+            if self.persist:
+                self.save()
+        log(f"🧭 Rebuilt FAISS {self.index_type} index over {n} vectors in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return purged
+
+    # --- Interface ---
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self._lock:
+            replaced = [self._rows[i] for i in ids if i in self._rows and self._rows[i] < self._indexed]
+            if self._stale_rows is not None:
+                replaced = [self._rows[i] for i in ids if i in self._rows]
+            super().upsert(ids, embeddings, documents, metadatas)
+            self._sync_index(replaced)
+
+    def _search_params(self, nprobe=None, ef_search=None, selector=None):
+        if self._needs_training():
+            return faiss.SearchParametersIVF(nprobe=nprobe or config.FAISS_NPROBE, sel=selector)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=ef_search or config.FAISS_EF_SEARCH, sel=selector)
+        return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+    def _refine(self, queries, labels, top_k):
+        """
+        Re-score ANN candidates against the exact stored rows and keep the best top_k.
+        """
+        scores = np.full(labels.shape, -np.inf, dtype=np.float32)
+        for q in range(len(queries)):
+            valid = labels[q] >= 0
+            rows = labels[q][valid]
+            scores[q][valid] = self._take(rows).astype(np.float32) @ queries[q]
+        order = np.argsort(-scores, axis=1)[:, :top_k]
+        labels = np.take_along_axis(labels, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        return scores, labels
+
+    def query(self, query_embeddings, top_k=5, where=None, nprobe=None, ef_search=None, refine=None, **search_params):
+        """
+        ANN top-k. `nprobe` (IVF) and `ef_search` (HNSW) trade recall for
+        latency per query. IVF-PQ fetches `refine` x top_k candidates and
+        re-ranks them with the exact rows.
+
+        Filters are pushed down: small selections (up to FAISS_FILTER_EXACT_MAX
+        rows) are searched exactly, larger ones through the index with an id
+        selector. Untrained indexes use exact search.
+        """
+        queries = self._normalize(query_embeddings)
+        if refine is None:
+            refine = config.FAISS_REFINE if self.index_type == "ivf_pq" else 1
+        with self._lock:
+            rows = self._filter_rows(where) if where else None
+            if self._index is None or (rows is not None and len(rows) <= config.FAISS_FILTER_EXACT_MAX):
+                return self._exact_query(queries, top_k, rows)
+
+            if rows is not None:
+                selector = faiss.IDSelectorBatch(len(rows), faiss.swig_ptr(rows))
+                n = len(rows)
+            elif self._deleted:
+                # Deleted rows stay in the index until rebuild(); skip them during the search
+                dead = self._dead_rows()
+                excluded = faiss.IDSelectorBatch(len(dead), faiss.swig_ptr(dead))
+                selector = faiss.IDSelectorNot(excluded)
+                n = self._indexed - len(self._deleted)
+            else:
+                selector, n = None, self._indexed
+            if n <= 0:
+                return _empty_results(len(queries))
+            k = min(top_k * max(1, refine), n)
+            scores, labels = self._index.search(queries, k, params=self._search_params(nprobe, ef_search, selector))
+            if refine > 1:
+                scores, labels = self._refine(queries, labels, top_k)
+            return self._results(labels, scores)
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+BACKENDS = {
+    "chroma": ChromaStore,
+    "numpy": NumpyStore,
+    "faiss": FaissStore,
+}
+
+
+def register_backend(name, factory):
+    """
+    Plug in another engine (a VectorStore subclass or factory callable).
+    """
+    BACKENDS[name] = factory
+
+
+def open_store(name=None, **kwargs):
+    """
+    Open the configured backend and record its load time as `vector_store.load_ms`.
+    """
+    name = name or config.VECTOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend: {name} (available: {', '.join(BACKENDS)})")
+
+    start = time.perf_counter()
+    store = BACKENDS[name](**kwargs)
+    if config.VECTOR_WARMUP:
+        try:
+            store.warm_up()
+        except Exception as e:
+            log(f" Vector store warm-up failed: {e}")
+    load_ms = (time.perf_counter() - start) * 1000
+
+    count = store.count()
+    metrics.set_gauge("vector_store.load_ms", load_ms)
+    metrics.set_gauge("vector_store.vectors", count)
+    log(f"📦 Opened {name} vector store at {config.VECTOR_DB_DIR}: {count} vectors in {load_ms:.1f} ms")
+    return store
@@ -1,93 +1,554 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import asyncio
+
 import app.config as config
 from app.utils import log
-import requests
-import os
+from app.services import metrics, http_client, local_embeddings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embeddings import make_batches
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.services.rerank import mmr
+from app.services.vector_backends import open_store, field_constraint
+
+# --- Persistent index ---
 
-# Initialize Chroma client
-chroma_client = chromadb.Client()
+# Engine selected by VECTOR_BACKEND; every read and write below goes through it
+store = open_store()
 
-# Get or create a collection for storing document chunks
-collection = chroma_client.get_or_create_collection(name="rag_collection")
+
+def _open_lexical_index(page_size=5000):
+    """
+    Load the BM25 index, backfilling it from the vector store when it is
+    missing chunks that were stored before the index existed.
+    """
+    index = LexicalIndex(config.LEXICAL_INDEX_PATH)
+    total = store.count()
+    if len(index) < total:
+        log(f"🔤 Backfilling lexical index ({len(index)}/{total} chunks indexed)")
+        for offset in range(0, total, page_size):
+            page = store.get(limit=page_size, offset=offset, include=("documents", "metadatas"))
+            index.add(
+                {"chunk_id": chunk_id, "doc_id": meta.get("doc_id"), "text": text}
+                for chunk_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"])
+            )
+    metrics.set_gauge("lexical_index.chunks", len(index))
+    return index
+
+
+lexical_index = _open_lexical_index()
 
 # --- Embedding Helper ---
 
+# Repeated questions skip the embeddings API round-trip
+query_embedding_cache = EmbeddingCache(
+    max_size=config.QUERY_EMBED_CACHE_SIZE,
+    ttl=config.QUERY_EMBED_CACHE_TTL,
+    disk_path=config.QUERY_EMBED_CACHE_PATH or None
+)
+
+def _local():
+    return config.EMBEDDING_PROVIDER == "local"
+
 def get_text_embedding(text):
     """
-    Get text embedding using Groq API.
+    Get text embedding using Groq API (or the local model), served from the
+    query cache when possible.
     """
+    cached = query_embedding_cache.get(text, config.EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
+
+    try:
+        if _local():
+            embedding = local_embeddings.embed([text], prompt="query")[0]
+        else:
+            data = {
+                "input": text,
+                "model": config.EMBEDDING_MODEL
+            }
+
+            response = http_client.groq_post("/embeddings", data)
+            response.raise_for_status()
+            embedding = response.json()["data"][0]["embedding"]
+
+        query_embedding_cache.put(text, config.EMBEDDING_MODEL, embedding)
+        return embedding
+    except Exception as e:
+        log(f"Error generating embedding: {e}")
+        return None
+
+async def aget_text_embedding(text):
+    """
+    Coroutine version of get_text_embedding for the async app.
+    """
+    cached = query_embedding_cache.get(text, config.EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
+    if _local():
+        # CPU-bound inference stays off the event loop
+        return await asyncio.to_thread(get_text_embedding, text)
+
     try:
-        GROQ_API_KEY = os.getenv("GROQ_API_KEY", config.GROQ_API_KEY)
-        if not GROQ_API_KEY:
-            raise ValueError("Missing GROQ_API_KEY")
-
-        url = "https://api.groq.com/openai/v1/embeddings"
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
         data = {
             "input": text,
-            "model": "nomic-embed-text-v1.5"  # "text-embedding-ada-002" Replace with Groq-supported embedding model if different
+            "model": config.EMBEDDING_MODEL
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = await http_client.agroq_post("/embeddings", data)
         response.raise_for_status()
 
         embedding = response.json()["data"][0]["embedding"]
+        query_embedding_cache.put(text, config.EMBEDDING_MODEL, embedding)
         return embedding
     except Exception as e:
         log(f"Error generating embedding: {e}")
         return None
 
+def _embedding_batches(texts):
+    """
+    Cached embeddings for `texts` (None where missing), and the distinct
+    missing texts split into embeddings requests within the batch limits
+    (one batch for the local model, which batches by length itself).
+    """
+    cached = [query_embedding_cache.get(text, config.EMBEDDING_MODEL) for text in texts]
+    missing = list(dict.fromkeys(text for text, emb in zip(texts, cached) if emb is None))
+    if _local():
+        return cached, [missing] if missing else []
+    return cached, [batch for _, batch in make_batches(missing, config.EMBED_BATCH_MAX_ITEMS, config.EMBED_BATCH_MAX_TOKENS)]
+
+
+def _store_embeddings(batch, embeddings, fetched):
+    for text, embedding in zip(batch, embeddings):
+        fetched[text] = embedding
+        query_embedding_cache.put(text, config.EMBEDDING_MODEL, embedding)
+
+
+def _read_embeddings(batch, response, fetched):
+    response.raise_for_status()
+    # The API may return items out of order; `index` is authoritative
+    data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+    _store_embeddings(batch, [item["embedding"] for item in data], fetched)
+
+
+def get_text_embeddings(texts):
+    """
+    Embeddings of several query texts: cache hits first, the rest in one
+    embeddings request per batch (EMBED_BATCH_MAX_ITEMS / _TOKENS).
+    None for texts whose request failed.
+    """
+    cached, batches = _embedding_batches(texts)
+    fetched = {}
+    for batch in batches:
+        try:
+            if _local():
+                _store_embeddings(batch, local_embeddings.embed(batch, prompt="query"), fetched)
+                continue
+            response = http_client.groq_post("/embeddings", {"input": batch, "model": config.EMBEDDING_MODEL})
+            _read_embeddings(batch, response, fetched)
+        except Exception as e:
+            log(f"Error generating embeddings for {len(batch)} queries: {e}")
+    return [emb if emb is not None else fetched.get(text) for text, emb in zip(texts, cached)]
+
+async def aget_text_embeddings(texts):
+    """
+    Coroutine version of get_text_embeddings; batches are requested concurrently.
+    """
+    if _local():
+        return await asyncio.to_thread(get_text_embeddings, texts)
+    cached, batches = _embedding_batches(texts)
+    fetched = {}
+    payloads = [{"input": batch, "model": config.EMBEDDING_MODEL} for batch in batches]
+    responses = await asyncio.gather(
+        *(http_client.agroq_post("/embeddings", payload) for payload in payloads), return_exceptions=True
+    )
+    for batch, response in zip(batches, responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            _read_embeddings(batch, response, fetched)
+        except Exception as e:
+            log(f"Error generating embeddings for {len(batch)} queries: {e}")
+    return [emb if emb is not None else fetched.get(text) for text, emb in zip(texts, cached)]
+
 # --- Add embeddings to DB ---
 
-def add_embeddings(chunks, embeddings):
+def _chunk_metadata(chunk):
     """
-    Add document chunks and their embeddings to Chroma collection.
+    Metadata stored next to each vector. Optional fields are only written when present.
     """
-    try:
-        for chunk, emb in zip(chunks, embeddings):
-            collection.add(
-                documents=[chunk["text"]],
-                metadatas=[{"doc_id": chunk["doc_id"], "chunk_id": chunk["chunk_id"]}],
-                embeddings=[emb]
+    meta = {"doc_id": chunk["doc_id"], "chunk_id": chunk["chunk_id"]}
+    for key in ("content_hash", "position", "embedding_model"):
+        if chunk.get(key) is not None:
+            meta[key] = chunk[key]
+    return meta
+
+
+def add_embeddings(chunks, embeddings, batch_size=None, progress=None):
+    """
+    Bulk upsert document chunks and their embeddings into the vector store.
+
+    Chunks are written in column batches (ids, documents, metadatas, embeddings)
+    of `batch_size` rows instead of one round-trip per chunk. A failing batch
+    does not abort the remaining ones. `progress(done)` is called after each batch.
+
+    Returns:
+        dict: {"added": int, "failed": [{"batch", "start", "end", "error"}]}
+    """
+    if len(chunks) != len(embeddings):
+        raise ValueError(f"Got {len(chunks)} chunks but {len(embeddings)} embeddings")
+
+    batch_size = batch_size or config.VECTOR_BATCH_SIZE
+    max_size = store.max_batch_size()
+    if max_size:
+        batch_size = min(batch_size, max_size)
+
+    added = 0
+    failed = []
+    for batch_no, start in enumerate(range(0, len(chunks), batch_size)):
+        batch = chunks[start:start + batch_size]
+        try:
+            store.upsert(
+                ids=[c["chunk_id"] for c in batch],
+                documents=[c["text"] for c in batch],
+                metadatas=[_chunk_metadata(c) for c in batch],
+                embeddings=embeddings[start:start + batch_size]
             )
-        log(f" Added {len(chunks)} chunks to vector store.")
-    except Exception as e:
-        log(f" Error adding embeddings: {e}")
+            lexical_index.add(batch)
+            added += len(batch)
+        except Exception as e:
+            log(f" Error adding batch {batch_no} (chunks {start}-{start + len(batch) - 1}): {e}")
+            failed.append({
+                "batch": batch_no,
+                "start": start,
+                "end": start + len(batch),
+                "error": str(e)
+            })
+        if progress:
+            progress(start + len(batch))
+
+    log(f" Added {added}/{len(chunks)} chunks to vector store ({len(failed)} failed batches).")
+    return {"added": added, "failed": failed}
+
+# --- Delete embeddings from DB ---
+
+def delete_embeddings(chunk_ids, batch_size=None):
+    """
+    Remove chunks from the vector store and the lexical index, in batches.
+
+    Returns:
+        number of chunk ids submitted for deletion
+    """
+    chunk_ids = list(chunk_ids)
+    batch_size = batch_size or config.VECTOR_BATCH_SIZE
+    max_size = store.max_batch_size()
+    if max_size:
+        batch_size = min(batch_size, max_size)
+
+    for start in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[start:start + batch_size]
+        store.delete(batch)
+        lexical_index.remove(batch)
+    metrics.set_gauge("lexical_index.chunks", len(lexical_index))
+    log(f" Deleted {len(chunk_ids)} chunks from vector store.")
+    return len(chunk_ids)
+
+# --- Reuse stored embeddings by content hash ---
+
+def get_embeddings_by_hash(hashes, model=None, batch_size=500):
+    """
+    Look up already-stored embeddings for the given chunk content hashes.
+
+    Returns:
+        dict: content_hash -> embedding for every hash found under `model`.
+    """
+    model = model or config.EMBEDDING_MODEL
+    hashes = list(hashes)
+    found = {}
+    for start in range(0, len(hashes), batch_size):
+        batch = hashes[start:start + batch_size]
+        try:
+            res = store.get(
+                where={"$and": [
+                    {"content_hash": {"$in": batch}},
+                    {"embedding_model": model}
+                ]},
+                include=("embeddings", "metadatas")
+            )
+        except Exception as e:
+            log(f" Error looking up embeddings by hash: {e}")
+            continue
+        metadatas = res.get("metadatas")
+        embeddings = res.get("embeddings")
+        if metadatas is None or embeddings is None:
+            continue
+        # Chroma returns embeddings as a numpy array, so no truthiness checks here
+        for meta, emb in zip(metadatas, embeddings):
+            found.setdefault(meta["content_hash"], [float(x) for x in emb])
+    return found
 
 # --- Query embeddings from DB ---
 
-def query_vector_db(query_embedding, top_k=5):
+def build_where(doc_ids=None, filters=None):
+    """
+    Combine a document scope and Chroma-style metadata predicates into one
+    `where` filter (None when unfiltered).
+    """
+    clauses = []
+    if doc_ids:
+        clauses.append({"doc_id": {"$in": list(doc_ids)}})
+    if filters:
+        clauses.append(filters)
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def query_vector_db(query_embedding, top_k=5, search_params=None, where=None):
     """
-    Query Chroma DB with query embedding to retrieve top-k similar chunks.
+    Query the vector store with a query embedding to retrieve top-k similar chunks.
+    `where` is pushed down into the engine's search; `search_params` are
+    passed to the engine (e.g. {"nprobe": 32} for FAISS IVF).
     """
     try:
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
+        results = store.query([query_embedding], top_k=top_k, where=where, **(search_params or {}))
         log(f"🔍 Retrieved {len(results.get('documents', [[]])[0])} chunks from vector store.")
         return results
     except Exception as e:
         log(f" Error querying vector DB: {e}")
         return {"documents": [[]], "metadatas": [[]]}
 
+
+def query_vector_db_batch(query_embeddings, top_k=5, search_params=None, where=None):
+    """
+    Top-k search for several query embeddings in one call to the store.
+    """
+    try:
+        return store.query(list(query_embeddings), top_k=top_k, where=where, **(search_params or {}))
+    except Exception as e:
+        log(f" Error querying vector DB: {e}")
+        n = len(query_embeddings)
+        return {"documents": [[] for _ in range(n)], "metadatas": [[] for _ in range(n)]}
+
+# --- Lexical (BM25) search ---
+
+def _fetch_chunks(chunk_ids, where=None):
+    """
+    Chroma-shaped results for the given chunk ids (those matching `where`), in the given order.
+    """
+    if not chunk_ids:
+        return {"ids": [[]], "documents": [[]], "metadatas": [[]]}
+    res = store.get(ids=list(chunk_ids), where=where, include=("documents", "metadatas"))
+    by_id = {i: (doc, meta) for i, doc, meta in zip(res["ids"], res["documents"], res["metadatas"])}
+    found = [i for i in chunk_ids if i in by_id]
+    return {
+        "ids": [found],
+        "documents": [[by_id[i][0] for i in found]],
+        "metadatas": [[by_id[i][1] for i in found]]
+    }
+
+
+def _lexical_ids(query_text, top_k, where=None):
+    # The document scope is applied inside the index, other predicates by the store
+    hits = lexical_index.search(query_text, top_k=top_k, doc_ids=field_constraint(where, "doc_id"))
+    return [chunk_id for chunk_id, _, _ in hits]
+
+
+def query_lexical(query_text, top_k=5, where=None):
+    """
+    BM25 search over chunk text.
+    """
+    return _fetch_chunks(_lexical_ids(query_text, top_k, where), where=where)
+
+
+def query_hybrid(query_text, query_embedding, top_k=5, search_params=None, where=None):
+    """
+    Fuse dense and BM25 rankings with reciprocal rank fusion.
+    """
+    dense = None
+    if query_embedding is not None:
+        dense = query_vector_db(
+            query_embedding, top_k=top_k * config.HYBRID_CANDIDATES, search_params=search_params, where=where
+        )
+    return _fuse_hybrid(query_text, dense, top_k=top_k, where=where)
+
+
+def _fuse_hybrid(query_text, dense, top_k=5, where=None):
+    """
+    RRF of a dense result (top_k * HYBRID_CANDIDATES rows, or None) with the BM25 ranking.
+    """
+    lexical_ids = _lexical_ids(query_text, top_k * config.HYBRID_CANDIDATES, where)
+    rows = {}
+    if where and lexical_ids:
+        # Drop lexical hits failing the other predicates before they take a rank
+        lexical = _fetch_chunks(lexical_ids, where=where)
+        lexical_ids = lexical["ids"][0]
+        rows.update(zip(lexical_ids, zip(lexical["documents"][0], lexical["metadatas"][0])))
+
+    dense_ids = dense["ids"][0] if dense and dense.get("ids") else []
+
+    fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=config.RRF_K)[:top_k]
+    fused_ids = [chunk_id for chunk_id, _ in fused]
+
+    # Reuse dense rows and fetch only lexical-only hits from the store
+    if dense_ids:
+        rows.update(zip(dense_ids, zip(dense["documents"][0], dense["metadatas"][0])))
+    missing = [i for i in fused_ids if i not in rows]
+    if missing:
+        extra = _fetch_chunks(missing)
+        rows.update(zip(extra["ids"][0], zip(extra["documents"][0], extra["metadatas"][0])))
+    fused_ids = [i for i in fused_ids if i in rows]
+    return {
+        "ids": [fused_ids],
+        "documents": [[rows[i][0] for i in fused_ids]],
+        "metadatas": [[rows[i][1] for i in fused_ids]]
+    }
+
+# --- MMR rerank ---
+
+def _select_rows(results, rows):
+    """
+    Single-query result keeping only the given rows, in that order.
+    """
+    return {key: [[value[0][r] for r in rows]] for key, value in results.items()
+            if key in ("ids", "documents", "metadatas", "distances") and value}
+
+
+def _fetch_k(top_k, rerank):
+    # Candidates to retrieve so MMR has something to choose from
+    return top_k * rerank["candidates"] if rerank else top_k
+
+
+def rerank_mmr(results, query_embedding, top_k, rerank):
+    """
+    Keep `top_k` of the over-fetched `results` by maximal marginal relevance
+    over their stored embeddings. `rerank` holds "lambda" and "min_score"
+    (see rerank.mmr). Without a query embedding the results are just cut
+    to top_k.
+    """
+    ids = (results.get("ids") or [[]])[0]
+    if query_embedding is not None and ids:
+        try:
+            with metrics.timer("retrieval.mmr_ms"):
+                stored = store.get(ids=ids, include=("embeddings",))
+                by_id = dict(zip(stored["ids"], stored["embeddings"]))
+                rows = [n for n, chunk_id in enumerate(ids) if chunk_id in by_id]
+                picked, _ = mmr(
+                    query_embedding, [by_id[ids[n]] for n in rows], top_k,
+                    lambda_mult=rerank["lambda"], min_score=rerank["min_score"]
+                )
+            metrics.observe("retrieval.mmr_candidates", len(ids))
+            return _select_rows(results, [rows[p] for p in picked])
+        except Exception as e:
+            log(f" Error reranking with MMR: {e}")
+    return _select_rows(results, range(min(top_k, len((results.get("documents") or [[]])[0]))))
+
 # --- Search helper (used by /query route) ---
 
-def search_embeddings(query_text, top_k=5):
+def search_embeddings(query_text, top_k=5, query_embedding=None, mode=None, search_params=None, where=None,
+                      rerank=None):
     """
     High-level search function:
-    1. Generate embedding for user query.
-    2. Query vector database for top matches.
+    1. Generate embedding for user query (unless already computed by the caller).
+    2. Retrieve top matches with the configured mode: "dense" (vector DB),
+       "lexical" (BM25) or "hybrid" (both, fused by reciprocal rank).
+    3. With `rerank` options, retrieve top_k * rerank["candidates"] matches
+       and keep top_k of them by MMR (see rerank_mmr).
+
+    `where` (see build_where) restricts every mode to matching chunks.
     """
-    query_embedding = get_text_embedding(query_text)
+    mode = mode or config.RETRIEVAL_MODE
+    if query_embedding is None and mode != "lexical":
+        query_embedding = get_text_embedding(query_text)
+    results = _search(query_text, _fetch_k(top_k, rerank), query_embedding, mode, search_params, where)
+    if rerank:
+        return rerank_mmr(results, query_embedding, top_k, rerank)
+    return results
+
+
+def _search(query_text, top_k, query_embedding, mode, search_params=None, where=None):
+    if mode == "lexical":
+        with metrics.timer("retrieval.lexical_ms"):
+            return query_lexical(query_text, top_k=top_k, where=where)
+
     if query_embedding is None:
         log(" Failed to get query embedding.")
+        if mode == "hybrid":
+            # Exact-term matches are still better than nothing
+            return query_lexical(query_text, top_k=top_k, where=where)
         return {"documents": [[]], "metadatas": [[]]}
 
-    results = query_vector_db(query_embedding, top_k=top_k)
+    if mode == "hybrid":
+        with metrics.timer("retrieval.hybrid_ms"):
+            return query_hybrid(query_text, query_embedding, top_k=top_k, search_params=search_params, where=where)
+
+    with metrics.timer("retrieval.dense_ms"):
+        return query_vector_db(query_embedding, top_k=top_k, search_params=search_params, where=where)
+
+
+def _row(results, i):
+    """
+    Single-query slice of a multi-query store result.
+    """
+    return {key: [value[i]] for key, value in results.items() if key in ("ids", "documents", "metadatas", "distances") and value}
+
+
+def dense_search_batch(query_embeddings, top_k=5, mode=None, search_params=None, where=None, rerank=None):
+    """
+    First half of search_embeddings_batch: every query embedding goes to the
+    store in one multi-vector search. Returns each query's dense candidates
+    (None where the embedding is missing, or in lexical mode), for finish_search.
+    """
+    mode = mode or config.RETRIEVAL_MODE
+    dense = [None] * len(query_embeddings)
+    embedded = [i for i, emb in enumerate(query_embeddings) if emb is not None]
+    if mode == "lexical" or not embedded:
+        return dense
+    candidates = _fetch_k(top_k, rerank)
+    if mode == "hybrid":
+        candidates *= config.HYBRID_CANDIDATES
+    with metrics.timer("retrieval.dense_batch_ms"):
+        results = query_vector_db_batch(
+            [query_embeddings[i] for i in embedded], top_k=candidates, search_params=search_params, where=where
+        )
+    for n, i in enumerate(embedded):
+        dense[i] = _row(results, n)
+    return dense
+
+
+def finish_search(query_text, dense, top_k=5, mode=None, where=None, query_embedding=None, rerank=None):
+    """
+    Second half of search_embeddings_batch for one query: BM25 and fusion,
+    or the search_embeddings fallbacks when there are no dense candidates,
+    then MMR with `rerank` options.
+    """
+    results = _finish_search(query_text, dense, _fetch_k(top_k, rerank), mode or config.RETRIEVAL_MODE, where)
+    if rerank:
+        return rerank_mmr(results, query_embedding, top_k, rerank)
     return results
 
+
+def _finish_search(query_text, dense, top_k, mode, where=None):
+    if mode == "lexical":
+        return query_lexical(query_text, top_k=top_k, where=where)
+    if dense is None:
+        log(" Failed to get query embedding.")
+        if mode == "hybrid":
+            return query_lexical(query_text, top_k=top_k, where=where)
+        return {"documents": [[]], "metadatas": [[]]}
+    if mode == "hybrid":
+        return _fuse_hybrid(query_text, dense, top_k=top_k, where=where)
+    return dense
+
+
+def search_embeddings_batch(query_texts, query_embeddings, top_k=5, mode=None, search_params=None, where=None,
+                            rerank=None):
+    """
+    search_embeddings for many queries: one multi-vector dense search, then
+    BM25, fusion and MMR per query. Returns one Chroma-shaped result per query.
+    """
+    dense = dense_search_batch(
+        query_embeddings, top_k=top_k, mode=mode, search_params=search_params, where=where, rerank=rerank
+    )
+    return [
+        finish_search(text, d, top_k=top_k, mode=mode, where=where, query_embedding=emb, rerank=rerank)
+        for text, d, emb in zip(query_texts, dense, query_embeddings)
+    ]
@@ -1,6 +1,7 @@
 import os
 import uuid
 import re
+import hashlib
 from PyPDF2 import PdfReader
 from docx import Document
 
@@ -24,57 +25,97 @@ def generate_id(prefix="doc"):
     return f"{prefix}_{uuid.uuid4().hex[:8]}"
 
 
+def stable_id(key, prefix="doc"):
+    """
+    Deterministic ID for a stable key (e.g. a file name): re-uploading the
+    same key always maps to the same ID.
+    """
+    return f"{prefix}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+
 # -------------------------------
 # 3️⃣ Text Extraction from Documents
 # -------------------------------
-def extract_text_from_file(filepath):
+TXT_READ_BLOCK = 1024 * 1024  # characters read per block from .txt files
+
+
+def iter_text_from_file(filepath):
     """
-    Extract text content from PDF, DOCX, or TXT files.
+    Stream text content from PDF, DOCX, or TXT files piece by piece
+    (pages, paragraphs or fixed-size blocks) instead of building one string.
     """
     ext = os.path.splitext(filepath)[1].lower()
 
     if ext == ".pdf":
-        return extract_text_from_pdf(filepath)
+        return iter_text_from_pdf(filepath)
     elif ext == ".docx":
-        return extract_text_from_docx(filepath)
+        return iter_text_from_docx(filepath)
     elif ext == ".txt":
-        with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        return iter_text_from_txt(filepath)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
 
 
-def extract_text_from_pdf(filepath):
+def iter_text_from_pdf(filepath):
     """
-    Extracts text from a PDF file using PyPDF2.
+    Yields the text of each PDF page using PyPDF2.
     """
-    text = ""
     try:
         reader = PdfReader(filepath)
         for page in reader.pages:
-            text += page.extract_text() or ""
+            yield page.extract_text() or ""
     except Exception as e:
         print(f"[ERROR] Failed to read PDF {filepath}: {e}")
-    return text
 
 
-def extract_text_from_docx(filepath):
+def iter_text_from_docx(filepath):
     """
-    Extracts text from a DOCX file using python-docx.
+    Yields each DOCX paragraph (newline-terminated) using python-docx.
     """
-    text = ""
     try:
         doc = Document(filepath)
         for para in doc.paragraphs:
-            text += para.text + "\n"
+            yield para.text + "\n"
     except Exception as e:
         print(f"[ERROR] Failed to read DOCX {filepath}: {e}")
-    return text
+
+
+def iter_text_from_txt(filepath):
+    """
+    Yields a plain-text file in fixed-size blocks.
+    """
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        for block in iter(lambda: f.read(TXT_READ_BLOCK), ""):
+            yield block
+
+
+def extract_text_from_file(filepath):
+    """
+    Extract text content from PDF, DOCX, or TXT files.
+    """
+    return "".join(iter_text_from_file(filepath))
+
+
+def extract_text_from_pdf(filepath):
+    """
+    Extracts text from a PDF file using PyPDF2.
+    """
+    return "".join(iter_text_from_pdf(filepath))
+
+
+def extract_text_from_docx(filepath):
+    """
+    Extracts text from a DOCX file using python-docx.
+    """
+    return "".join(iter_text_from_docx(filepath))
 
 
 # -------------------------------
 # 4️⃣ Text Cleaning
 # -------------------------------
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
 def clean_text(text):
     """
     Removes unnecessary spaces, symbols, and newlines.
@@ -84,9 +125,67 @@ def clean_text(text):
     return text
 
 
+def iter_clean_text(pieces):
+    """
+    Streaming clean_text: collapses whitespace runs (including runs spanning
+    piece boundaries) and strips both ends, so
+    "".join(iter_clean_text(pieces)) == clean_text("".join(pieces)).
+    """
+    started = False
+    pending_space = False
+    for piece in pieces:
+        out = []
+        for i, word in enumerate(_WHITESPACE_RE.split(piece)):
+            if i > 0:
+                pending_space = True  # a whitespace run preceded this word
+            if word:
+                if pending_space and started:
+                    out.append(" ")
+                out.append(word)
+                started = True
+                pending_space = False
+        if out:
+            yield "".join(out)
+
+
+def content_hash(text):
+    """
+    Content address of a chunk: SHA-256 of its cleaned text.
+    """
+    return hashlib.sha256(clean_text(text).encode("utf-8")).hexdigest()
+
+
 # -------------------------------
 # 5️⃣ Text Chunking
 # -------------------------------
+def iter_chunks(segments, chunk_size=1000, overlap=100):
+    """
+    Streaming chunker over cleaned text segments.
+
+    Produces exactly the chunks of the character chunker (fixed windows of
+    `chunk_size` starting every `chunk_size - overlap` characters) while
+    holding at most one window plus the current segment in memory.
+    """
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    buf = ""
+    for segment in segments:
+        buf += segment
+        pos = 0
+        while len(buf) - pos >= chunk_size:
+            yield buf[pos:pos + chunk_size]
+            pos += step
+        buf = buf[pos:]
+
+    # Tail: the remaining (shorter) windows, as the original while-loop emitted them
+    pos = 0
+    while pos < len(buf):
+        yield buf[pos:pos + chunk_size]
+        pos += step
+
+
 def chunk_text(text, chunk_size=1000, overlap=100):
     """
     Split large text into chunks for embedding and retrieval.
@@ -98,15 +197,17 @@ def chunk_text(text, chunk_size=1000, overlap=100):
     Returns:
         list of text chunks
     """
-    text = clean_text(text)
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
+    return list(iter_chunks(iter_clean_text([text]), chunk_size, overlap))
+
+
+def extract_chunks(filepath, chunk_size=1000, overlap=100):
+    """
+    Extract and chunk a file in one streaming pass, yielding chunks as they
+    are produced.
+
+    Only depends on this module, so it is cheap to run in a worker process.
+    """
+    return iter_chunks(iter_clean_text(iter_text_from_file(filepath)), chunk_size, overlap)
 
 
 # -------------------------------
@@ -0,0 +1,263 @@
+# backend/benchmarks/bench_async_serving.py
+"""
+Concurrent /query throughput of one Flask process versus one process of the
+async app (rag_backend.py).
+
+A stub Groq server answers embeddings and chat completions after a simulated
+latency (the dominant cost of a real query). Each app runs in its own
+process against a shared numpy vector store: Flask on a WSGI server with a
+fixed pool of worker threads (like gunicorn --threads), the async app under
+uvicorn. A client then keeps N queries in flight against each and reports
+queries/s and latency. Metadata routes are not exercised, so Mongo is
+replaced by mongomock.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_serving --concurrency 1 8 32 128
+    python -m benchmarks.bench_async_serving --flask-threads 16 --llm-ms 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# config.py refuses to load without a key; Groq is replaced by the stub below.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import httpx
+
+
+# ---------------- Stub Groq ----------------
+class StubGroq(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    embed_ms = 0
+    llm_ms = 0
+    embedding = []
+    completion_body = json.dumps({"choices": [{"message": {"content": "stub answer"}}]}).encode()
+    calls = {"embeddings": 0, "embedded_texts": 0, "completions": 0}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.path.endswith("/embeddings"):
+            texts = request["input"] if isinstance(request["input"], list) else [request["input"]]
+            self._count(embeddings=1, embedded_texts=len(texts))
+            time.sleep(self.embed_ms / 1000)
+            body = json.dumps({"data": [{"index": i, "embedding": self.embedding} for i in range(len(texts))]}).encode()
+        else:
+            self._count(completions=1)
+            time.sleep(self.llm_ms / 1000)
+            body = self.completion_body
+        self._send(body)
+
+    def do_GET(self):
+        # Upstream call counts, for benchmarks comparing request patterns
+        with self.lock:
+            self._send(json.dumps(self.calls).encode())
+
+    def _count(self, **fields):
+        with self.lock:
+            for name, n in fields.items():
+                self.calls[name] += n
+
+    def _send(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve_stub(args):
+    StubGroq.embed_ms, StubGroq.llm_ms = args.embed_ms, args.llm_ms
+    # One fixed vector; query texts are unique, so no cache can serve it
+    rng = random.Random(0)
+    StubGroq.embedding = [rng.random() for _ in range(args.dim)]
+    StubServer(("127.0.0.1", args.port), StubGroq).serve_forever()
+
+
+# ---------------- App servers ----------------
+def _use_mongomock():
+    import mongomock
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def serve_flask(args):
+    from werkzeug.serving import BaseWSGIServer
+
+    _use_mongomock()
+    from app.main import app
+
+    class PooledWSGIServer(BaseWSGIServer):
+        # A fixed number of worker threads, like gunicorn's gthread worker
+        request_queue_size = 1024
+        pool = ThreadPoolExecutor(max_workers=args.flask_threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer("127.0.0.1", args.port, app).serve_forever()
+
+
+def serve_asgi(args):
+    import uvicorn
+
+    _use_mongomock()
+    from rag_backend import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False, backlog=1024)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn(mode, port, args, env):
+    cmd = [sys.executable, "-m", "benchmarks.bench_async_serving", "--serve", mode, "--port", str(port),
+           "--embed-ms", str(args.embed_ms), "--llm-ms", str(args.llm_ms), "--dim", str(args.dim),
+           "--flask-threads", str(args.flask_threads)]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def build_store(env, args):
+    """
+    Fill the numpy store the apps will load, in a child so this process
+    never imports the app.
+    """
+    script = (
+        "import numpy as np\n"
+        "from app.services.vector_store import add_embeddings\n"
+        f"n, dim = {args.chunks}, {args.dim}\n"
+        "chunks = [{'chunk_id': f'c{i}', 'doc_id': f'd{i // 20}', 'text': f'chunk {i} about topic {i % 97}', 'position': i % 20} for i in range(n)]\n"
+        "add_embeddings(chunks, np.random.default_rng(0).random((n, dim), dtype=np.float32).tolist())\n"
+    )
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+# ---------------- Load generator ----------------
+async def load(url, concurrency, total):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                t0 = time.perf_counter()
+                res = await client.post(url, json={"query": f"question {i} {random.random()}"})
+                if res.status_code != 200 or "answer" not in res.json():
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, latencies, errors
+
+
+def start_stack(args):
+    """
+    Build the vector store and start the stub Groq server. Returns
+    (env for app servers, stub base URL, stub process).
+    """
+    tmp = tempfile.mkdtemp(prefix="bench_async_serving_")
+    stub_port = free_port()
+    env = dict(
+        os.environ,
+        GROQ_API_BASE=f"http://127.0.0.1:{stub_port}",
+        VECTOR_BACKEND="numpy",
+        VECTOR_DB_DIR=tmp,
+        RETRIEVAL_MODE=args.mode,
+        ANSWER_CACHE_ENABLED="0",  # every query must reach the "LLM"
+        COMPACT_INTERVAL="0",
+        INGEST_PIPELINE="0"
+    )
+    build_store(env, args)
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_async_serving", "--serve", "stub", "--port", str(stub_port),
+         "--embed-ms", str(args.embed_ms), "--llm-ms", str(args.llm_ms), "--dim", str(args.dim)],
+        env=env
+    )
+    return env, env["GROQ_API_BASE"], stub
+
+
+def run(args):
+    env, _, stub = start_stack(args)
+    print(f"{args.chunks} chunks x {args.dim} dims, {args.mode} retrieval; "
+          f"stub Groq: embeddings {args.embed_ms:.0f} ms, chat {args.llm_ms:.0f} ms; "
+          f"Flask: {args.flask_threads} threads")
+
+    procs = [stub]
+    try:
+        for mode, label in (("flask", "flask (WSGI)"), ("asgi", "rag_backend (ASGI)")):
+            port = free_port()
+            procs.append(spawn(mode, port, args, env))
+            url = f"http://127.0.0.1:{port}/query/"
+            asyncio.run(load(url, 1, 3))  # warm-up
+            for concurrency in args.concurrency:
+                total = max(args.requests, concurrency * 2)
+                qps, latencies, errors = asyncio.run(load(url, concurrency, total))
+                latencies.sort()
+                print(f"{label:>20} | c={concurrency:4d} | {qps:8.1f} q/s | p50 {statistics.median(latencies):8.1f} ms | "
+                      f"p95 {latencies[int(len(latencies) * 0.95) - 1]:8.1f} ms | errors {errors}")
+    finally:
+        for proc in procs:
+            proc.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=200, help="queries per concurrency level (at least 2x concurrency)")
+    parser.add_argument("--flask-threads", type=int, default=8, help="worker threads of the Flask process")
+    parser.add_argument("--embed-ms", type=float, default=30, help="stub embeddings latency")
+    parser.add_argument("--llm-ms", type=float, default=300, help="stub chat completion latency")
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--mode", default="hybrid", choices=["hybrid", "dense", "lexical"])
+    parser.add_argument("--serve", choices=["stub", "flask", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        {"stub": serve_stub, "flask": serve_flask, "asgi": serve_asgi}[args.serve](args)
+    else:
+        run(args)
@@ -0,0 +1,54 @@
+# backend/benchmarks/bench_chunking.py
+"""
+Chunks/sec and per-chunk token-count spread of the token-aware sentence
+chunker versus the fixed character chunker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking path/to/document.pdf [--chunk-tokens 256]
+"""
+import argparse
+import statistics
+import time
+
+from app.services.chunker import chunk_file, get_tokenizer
+
+
+def measure(path, repeat, **options):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = list(chunk_file(path, **options))
+    elapsed = (time.perf_counter() - start) / repeat
+
+    enc = get_tokenizer()
+    counts = [len(enc.encode(c)) for c in chunks]
+    return {
+        "chunks": len(chunks),
+        "chunks_per_s": len(chunks) / elapsed if elapsed else float("inf"),
+        "mean_tokens": statistics.mean(counts) if counts else 0,
+        "stdev_tokens": statistics.pstdev(counts) if counts else 0,
+        "max_tokens": max(counts, default=0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--chunk-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    get_tokenizer()  # load the encoding outside the timed region
+    runs = {
+        "chars": measure(args.path, args.repeat, strategy="chars",
+                         chunk_size=args.chunk_size, overlap=args.overlap),
+        "tokens": measure(args.path, args.repeat, strategy="tokens",
+                          chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens),
+    }
+    for name, r in runs.items():
+        print(
+            f"{name:<7} {r['chunks']:>6} chunks | {r['chunks_per_s']:10.1f} chunks/s | "
+            f"tokens mean {r['mean_tokens']:7.1f} stdev {r['stdev_tokens']:6.1f} max {r['max_tokens']}"
+        )
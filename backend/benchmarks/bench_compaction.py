@@ -0,0 +1,106 @@
+# backend/benchmarks/bench_compaction.py
+"""
+Query latency around document deletion and background compaction.
+
+Builds a store, deletes a share of its vectors (tombstones), then compacts
+in a background thread while a query loop keeps running. Reports delete
+time and query p50/p95/max before the delete, with tombstones, during
+compaction and after it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compaction --backend numpy --n 100000 --delete 0.3
+    python -m benchmarks.bench_compaction --backend faiss --index-type ivf_flat
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from app.services.vector_backends import FaissStore, NumpyStore
+from benchmarks.bench_vector_search import make_vectors
+
+
+def latencies(store, queries, k, stop=None, **params):
+    """
+    Query until `stop` is set (or once over `queries`). Returns latencies in ms.
+    """
+    out = []
+    i = 0
+    while True:
+        t0 = time.perf_counter()
+        store.query([queries[i % len(queries)]], top_k=k, **params)
+        out.append((time.perf_counter() - t0) * 1000)
+        i += 1
+        if stop is None and i >= len(queries):
+            return out
+        if stop is not None and stop.is_set():
+            return out
+
+
+def summary(label, values):
+    values = sorted(values)
+    p95 = values[max(0, int(len(values) * 0.95) - 1)]
+    print(f"{label:>18} | {len(values):6d} queries | p50 {statistics.median(values):7.3f} ms | "
+          f"p95 {p95:7.3f} ms | max {values[-1]:8.3f} ms")
+
+
+def run(args):
+    path = tempfile.mkdtemp(prefix="bench_compaction_")
+    if args.backend == "faiss":
+        store = FaissStore(path=path, index_type=args.index_type, min_train=min(args.n, 10_000))
+        params = {"nprobe": 16}
+    else:
+        store = NumpyStore(path=path)
+        params = {}
+
+    vectors = make_vectors(args.n, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=1)
+    ids = [f"v{i}" for i in range(args.n)]
+    for start in range(0, args.n, args.batch_size):
+        end = start + args.batch_size
+        store.upsert(ids[start:end], vectors[start:end], None, [{"doc_id": f"d{i // 100}"} for i in range(start, end)])
+    print(f"{args.backend}: {args.n} vectors x {args.dim} dims, deleting {args.delete:.0%}")
+
+    summary("before delete", latencies(store, queries, args.k, **params))
+
+    doomed = ids[:int(args.n * args.delete)]
+    t0 = time.perf_counter()
+    for start in range(0, len(doomed), args.batch_size):
+        store.delete(doomed[start:start + args.batch_size])
+    print(f"delete {len(doomed)} ids: {(time.perf_counter() - t0) * 1000:.1f} ms, stats {store.stats()}")
+    summary("with tombstones", latencies(store, queries, args.k, **params))
+
+    stop = threading.Event()
+    result = {}
+
+    def compact():
+        t0 = time.perf_counter()
+        result["purged"] = store.compact()
+        result["ms"] = (time.perf_counter() - t0) * 1000
+        stop.set()
+
+    worker = threading.Thread(target=compact)
+    worker.start()
+    during = latencies(store, queries, args.k, stop=stop, **params)
+    worker.join()
+    print(f"compaction: purged {result['purged']} rows in {result['ms']:.1f} ms")
+    summary("during compaction", during)
+    summary("after compaction", latencies(store, queries, args.k, **params))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["numpy", "faiss"], default="numpy")
+    parser.add_argument("--index-type", default="ivf_flat", help="FAISS index type")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--delete", type=float, default=0.3, help="share of vectors to delete")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    run(parser.parse_args())
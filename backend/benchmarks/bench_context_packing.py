@@ -0,0 +1,134 @@
+# backend/benchmarks/bench_context_packing.py
+"""
+Prompt context size with and without context packing.
+
+The corpus is synthetic: documents made of sections, each section a few
+thousand characters about one subject, so the chunks a question retrieves
+tend to be neighbours. Documents are chunked with the chars strategy
+(CHUNK_SIZE / CHUNK_OVERLAP) and searched with BM25. For every question the
+top-k chunks are turned into a context twice: joined as-is (CONTEXT_PACKING=0)
+and packed (merged neighbours, overlap dropped, trimmed to --max-tokens).
+Reports context tokens, passages and packing time.
+
+With --live the two prompts of the first --live-queries questions are also
+sent to Groq (needs a real GROQ_API_KEY), reporting completion latency and
+the prompt_tokens Groq bills. Without it LLM latency is not measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_context_packing --docs 200 --queries 500 --k 8
+    python -m benchmarks.bench_context_packing --k 10 --max-tokens 2000 --live
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+# config.py refuses to load without a key; only --live calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import app.config as config
+from app.services.chunker import estimate_tokens
+from app.services.context import PASSAGE_SEPARATOR, pack_context
+from app.services.lexical_index import LexicalIndex
+from app.utils import chunk_text
+
+WORDS = [
+    "pump", "valve", "sensor", "bearing", "gasket", "filter", "motor", "relay",
+    "coupling", "bracket", "hose", "nozzle", "impeller", "thermostat", "switch",
+    "actuator", "regulator", "manifold", "flange", "seal", "pressure", "torque"
+]
+
+
+def build_corpus(args, rng):
+    """
+    Chunk dicts for --docs documents and one question per section.
+    """
+    chunks, questions = [], []
+    for d in range(args.docs):
+        sections = []
+        for s in range(args.sections):
+            subject = f"subject{d}x{s}"
+            words = rng.sample(WORDS, 3)
+            questions.append(f"{subject} {' '.join(words)}")
+            sentences = [
+                f"The {rng.choice(words)} of {subject} is checked {rng.randint(1, 99)} times "
+                f"before the {rng.choice(WORDS)} is fitted."
+                for _ in range(args.section_chars // 70)
+            ]
+            sections.append(" ".join(sentences))
+        for position, text in enumerate(chunk_text(" ".join(sections), config.CHUNK_SIZE, config.CHUNK_OVERLAP)):
+            chunks.append({"chunk_id": f"d{d}c{position}", "doc_id": f"d{d}", "position": position, "text": text})
+    return chunks, questions
+
+
+def live_compare(args, prompts):
+    from app.routes import query as query_routes
+    from app.services import http_client
+
+    for label, idx in (("raw", 0), ("packed", 1)):
+        latencies, prompt_tokens = [], []
+        for question, contexts in prompts:
+            payload = query_routes._build_payload(question, contexts[idx], "llama3-8b")
+            t0 = time.perf_counter()
+            response = http_client.groq_post(query_routes.GROQ_CHAT_PATH, payload)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if response.status_code == 200:
+                prompt_tokens.append(response.json().get("usage", {}).get("prompt_tokens", 0))
+        tokens = f"{statistics.mean(prompt_tokens):7.0f}" if prompt_tokens else "    n/a"
+        print(f"  LLM {label:>6} | prompt_tokens {tokens} | latency p50 {statistics.median(latencies):7.0f} ms | "
+              f"ok {len(prompt_tokens)}/{len(latencies)}")
+
+
+def run(args):
+    rng = random.Random(0)
+    chunks, questions = build_corpus(args, rng)
+    index = LexicalIndex()
+    index.add(chunks)
+    by_id = {c["chunk_id"]: c for c in chunks}
+    print(f"{len(chunks)} chunks ({config.CHUNK_SIZE} chars, {config.CHUNK_OVERLAP} overlap) in {args.docs} documents; "
+          f"top-{args.k}, budget {args.max_tokens} tokens")
+
+    raw_tokens, packed_tokens, passages, pack_ms, truncated = [], [], [], [], 0
+    prompts = []
+    for question in rng.sample(questions, min(args.queries, len(questions))):
+        hits = [by_id[chunk_id] for chunk_id, _, _ in index.search(question, top_k=args.k)]
+        documents = [c["text"] for c in hits]
+        metadatas = [{"doc_id": c["doc_id"], "position": c["position"]} for c in hits]
+
+        raw = PASSAGE_SEPARATOR.join(documents)
+        t0 = time.perf_counter()
+        packed, stats = pack_context(documents, metadatas, max_tokens=args.max_tokens)
+        pack_ms.append((time.perf_counter() - t0) * 1000)
+
+        raw_tokens.append(estimate_tokens(raw))
+        packed_tokens.append(stats["tokens"])
+        passages.append(stats["passages"])
+        truncated += stats["truncated"]
+        if len(prompts) < args.live_queries:
+            prompts.append((question, (raw, packed)))
+
+    pack_ms.sort()
+    saved = 1 - sum(packed_tokens) / sum(raw_tokens)
+    print(f"  context tokens | raw {statistics.mean(raw_tokens):7.0f} | packed {statistics.mean(packed_tokens):7.0f} "
+          f"| saved {saved:6.1%} | truncated {truncated}/{len(pack_ms)}")
+    print(f"  passages       | {statistics.mean(passages):5.1f} per prompt from {args.k} chunks")
+    print(f"  packing        | p50 {statistics.median(pack_ms):6.3f} ms | p95 {pack_ms[int(len(pack_ms) * 0.95) - 1]:6.3f} ms")
+
+    if args.live:
+        live_compare(args, prompts)
+    else:
+        print("  LLM latency    | not measured (pass --live with a real GROQ_API_KEY)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=8, help="subjects per document")
+    parser.add_argument("--section-chars", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8, help="retrieved chunks per question")
+    parser.add_argument("--max-tokens", type=int, default=config.CONTEXT_MAX_TOKENS)
+    parser.add_argument("--live", action="store_true", help="also send both prompts to Groq")
+    parser.add_argument("--live-queries", type=int, default=20)
+    run(parser.parse_args())
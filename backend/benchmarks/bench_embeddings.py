@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_embeddings.py
+"""
+Embeddings/sec of the local CPU provider (EMBEDDING_PROVIDER=local) per
+runtime, next to the remote Groq embeddings API.
+
+Texts are synthetic chunks of mixed length (--min-chars to --max-chars).
+For every runtime (torch, torch-int8, onnx) the model is loaded once, then
+the texts are embedded twice: in length-sorted batches (what the provider
+does) and in arrival-order batches, to show what padding costs. Vectors
+are compared with the first runtime's (mean cosine), since quantization
+trades some accuracy for speed.
+
+With --remote the same texts go through embeddings.create_embeddings
+against Groq (needs a real GROQ_API_KEY); otherwise the remote backend is
+not measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embeddings --texts 2000 --threads 4
+    python -m benchmarks.bench_embeddings --runtimes torch onnx --onnx-file onnx/model_quantized.onnx --remote
+"""
+import argparse
+import os
+import random
+import time
+
+# config.py refuses to load without a key; only --remote calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import numpy as np
+
+import app.config as config
+from app.services import local_embeddings
+
+WORDS = (
+    "the pump valve sensor pressure reading was checked before the motor relay "
+    "switched and the filter gasket seal held under thermal load during testing"
+).split()
+
+
+def make_texts(args):
+    rng = random.Random(0)
+    texts = []
+    for _ in range(args.texts):
+        n = rng.randint(args.min_chars, args.max_chars)
+        words = []
+        while sum(len(w) + 1 for w in words) < n:
+            words.append(rng.choice(WORDS))
+        texts.append(" ".join(words))
+    return texts
+
+
+def arrival_order(model, texts, batch_size):
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(model.encode(texts[start:start + batch_size], batch_size=batch_size,
+                                    normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False))
+    return vectors
+
+
+def report(label, n, elapsed, extra=""):
+    print(f"{label:>28} | {n / elapsed:8.1f} emb/s | {elapsed:7.2f} s{extra}")
+
+
+def run(args):
+    texts = make_texts(args)
+    print(f"{len(texts)} texts of {args.min_chars}-{args.max_chars} chars; model {args.model}; "
+          f"batch {args.batch_size}; threads {args.threads or 'default'}")
+
+    reference = None
+    for runtime in args.runtimes:
+        t0 = time.perf_counter()
+        try:
+            model = local_embeddings.load_model(args.model, runtime, args.threads, args.onnx_file)
+        except Exception as e:
+            print(f"{runtime:>28} | unavailable: {e}")
+            continue
+        load_s = time.perf_counter() - t0
+        local_embeddings.embed(texts[:args.batch_size], model=model, batch_size=args.batch_size)  # warm-up
+
+        t0 = time.perf_counter()
+        vectors = np.array(local_embeddings.embed(texts, model=model, batch_size=args.batch_size))
+        sorted_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        arrival_order(model, texts, args.batch_size)
+        arrival_s = time.perf_counter() - t0
+
+        agreement = ""
+        if reference is None:
+            reference = vectors
+        elif reference.shape == vectors.shape:
+            agreement = f" | cosine vs {args.runtimes[0]} {float(np.mean(np.sum(reference * vectors, axis=1))):.4f}"
+        report(f"{runtime} (length-sorted)", len(texts), sorted_s, f" | load {load_s:5.1f} s{agreement}")
+        report(f"{runtime} (arrival order)", len(texts), arrival_s)
+
+    if args.remote:
+        from app.services.embeddings import create_embeddings
+
+        config.EMBEDDING_PROVIDER = "groq"
+        t0 = time.perf_counter()
+        create_embeddings(texts, model=args.remote_model)
+        report(f"groq {args.remote_model}", len(texts), time.perf_counter() - t0,
+               f" | {config.EMBED_CONCURRENCY} requests in flight")
+    else:
+        print(f"{'groq':>28} | not measured (pass --remote with a real GROQ_API_KEY)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--min-chars", type=int, default=100)
+    parser.add_argument("--max-chars", type=int, default=1000)
+    parser.add_argument("--model", default="nomic-ai/nomic-embed-text-v1.5")
+    parser.add_argument("--runtimes", nargs="+", default=list(local_embeddings.RUNTIMES), choices=local_embeddings.RUNTIMES)
+    parser.add_argument("--onnx-file", default=config.LOCAL_EMBED_ONNX_FILE, help="ONNX file in the model repo")
+    parser.add_argument("--threads", type=int, default=config.LOCAL_EMBED_THREADS, help="CPU threads per inference")
+    parser.add_argument("--batch-size", type=int, default=config.LOCAL_EMBED_BATCH_SIZE)
+    parser.add_argument("--remote", action="store_true", help="also measure the Groq embeddings API")
+    parser.add_argument("--remote-model", default="nomic-embed-text-v1.5")
+    run(parser.parse_args())
@@ -0,0 +1,107 @@
+# backend/benchmarks/bench_faiss.py
+"""
+Recall vs latency for the FAISS backend's index types.
+
+For each index type the store is built once, then queried while sweeping the
+search knob (nprobe for IVF, efSearch for HNSW). Recall@k is measured against
+exact search over the same vectors. Isotropic random vectors are the worst
+case for ANN indexes; --clusters generates clustered data closer to real
+embeddings.
+
+Usage (from backend/):
+    python -m benchmarks.bench_faiss --n 200000 --dim 384 --clusters 1000
+    python -m benchmarks.bench_faiss --types ivf_pq --nprobe 4 16 64 --pq-m 48
+"""
+import argparse
+import os
+import statistics
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import faiss
+import numpy as np
+
+from app.services.vector_backends import FaissStore
+from benchmarks.bench_vector_search import exact_top_k, make_vectors
+
+
+def clustered_vectors(n, dim, clusters, seed=0, spread=0.5):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + spread * rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(index_type, vectors, batch_size, **kwargs):
+    store = FaissStore(index_type=index_type, persist=False, min_train=len(vectors), **kwargs)
+    ids = [f"v{i}" for i in range(len(vectors))]
+    t0 = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        end = start + batch_size
+        store.upsert(ids[start:end], vectors[start:end], None, [{} for _ in ids[start:end]])
+    return store, time.perf_counter() - t0
+
+
+def measure(store, queries, truth, k, **search_params):
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        res = store.query([q], top_k=k, **search_params)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += len({int(i[1:]) for i in res["ids"][0]} & set(expected.tolist()))
+    latencies.sort()
+    return hits / (len(queries) * k), statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def run(args):
+    if args.clusters:
+        # Queries come from the same mixture as the corpus
+        both = clustered_vectors(args.n + args.queries, args.dim, args.clusters)
+        vectors, queries = both[:args.n], both[args.n:]
+    else:
+        vectors = make_vectors(args.n, args.dim)
+        queries = make_vectors(args.queries, args.dim, seed=1)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"{args.n} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+
+    for index_type in args.types:
+        store, build_s = build(
+            index_type, vectors, args.batch_size,
+            nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m
+        )
+        size_mb = faiss.serialize_index(store._index).nbytes / 1e6
+        print(f"--- {index_type}: build {build_s:.1f}s, index {size_mb:.1f} MB ---")
+
+        if index_type in ("ivf_flat", "ivf_pq"):
+            sweep = [("nprobe", v) for v in args.nprobe]
+        elif index_type == "hnsw":
+            sweep = [("ef_search", v) for v in args.ef_search]
+        else:
+            sweep = [(None, None)]
+        for knob, value in sweep:
+            params = {knob: value} if knob else {}
+            if index_type == "ivf_pq" and args.refine is not None:
+                params["refine"] = args.refine
+            recall, p50, p95 = measure(store, queries, truth, args.k, **params)
+            label = f"{knob}={value}" if knob else "exact"
+            print(f"  {label:>14} | recall {recall:.3f} | p50 {p50:7.3f} ms | p95 {p95:7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=0, help="clustered data with this many centers (0 = isotropic)")
+    parser.add_argument("--types", nargs="+", default=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = auto)")
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--refine", type=int, default=None, help="IVF-PQ re-rank factor (default FAISS_REFINE)")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    run(parser.parse_args())
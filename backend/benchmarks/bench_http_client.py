@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_http_client.py
+"""
+Per-query latency of bare requests.post versus the shared pooled client,
+against a local keep-alive stub server. Each simulated /query makes the same
+two calls as the real route: one embeddings request and one chat completion.
+
+A plain-HTTP stub only shows the saved TCP handshake; against the real
+HTTPS endpoint the saved TLS handshake makes the difference larger.
+
+Usage (from backend/):
+    python -m benchmarks.bench_http_client --queries 200
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import requests
+from app.services import http_client
+
+EMBEDDING = {"data": [{"index": 0, "embedding": [0.0] * 768}]}
+COMPLETION = {"choices": [{"message": {"content": "stub answer"}}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(EMBEDDING if self.path.endswith("/embeddings") else COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def one_query(post, base):
+    start = time.perf_counter()
+    post(f"{base}/embeddings", json={"input": "q", "model": "m"}).json()
+    post(f"{base}/chat/completions", json={"model": "m", "messages": []}).json()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(queries):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    for name, post in (("bare requests.post", requests.post), ("pooled http_client", http_client.post)):
+        one_query(post, base)  # warm-up
+        samples = [one_query(post, base) for _ in range(queries)]
+        print(
+            f"{name:<20} p50 {statistics.median(samples):7.2f} ms | "
+            f"mean {statistics.mean(samples):7.2f} ms | p95 {sorted(samples)[int(len(samples) * 0.95)]:7.2f} ms"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    run(parser.parse_args().queries)
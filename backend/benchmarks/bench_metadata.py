@@ -0,0 +1,130 @@
+# backend/benchmarks/bench_metadata.py
+"""
+Chunk-metadata ingest time and storage: one insert_one per chunk with the
+chunk text copied into Mongo (before) vs unordered insert_many batches that
+keep only a chunk_id reference to the text stored in the vector store (after).
+
+Runs against mongomock by default; pass --mongo-uri for a real mongod, where
+storage is read from collStats instead of summing BSON sizes. mongomock has no
+network, so --rtt-ms adds a simulated round trip to every write call; and its
+unique-index check scans the collection on each insert, so under mongomock
+the indexes are built after the timed load rather than before it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metadata --docs 20 --chunks 1000 --rtt-ms 0.5
+    python -m benchmarks.bench_metadata --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import hashlib
+import os
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import bson
+
+from app.models import db_models
+
+
+def make_chunks(docs, per_doc, text_bytes):
+    chunks = []
+    for d in range(docs):
+        doc_id = f"doc_{d:06d}"
+        for p in range(per_doc):
+            text = (f"chunk {d}-{p} " * (text_bytes // 10 + 1))[:text_bytes]
+            digest = hashlib.sha256(text.encode()).hexdigest()
+            chunks.append({
+                "chunk_id": f"{doc_id}_{digest[:16]}",
+                "doc_id": doc_id,
+                "content_hash": digest,
+                "position": p,
+                "text": text
+            })
+    return chunks
+
+
+class RoundTrip:
+    """
+    Collection proxy that sleeps `rtt` seconds per write call.
+    """
+    def __init__(self, collection, rtt):
+        self._collection = collection
+        self._rtt = rtt
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in ("insert_one", "insert_many") or not self._rtt:
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self._rtt)
+            return attr(*args, **kwargs)
+        return call
+
+
+def storage_bytes(db, name, real):
+    if real:
+        stats = db.command("collStats", name)
+        return stats["size"], stats["totalIndexSize"]
+    return sum(len(bson.encode(doc)) for doc in db[name].find()), 0
+
+
+def run(args):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        db = MongoClient(args.mongo_uri)[args.db]
+    else:
+        import mongomock
+        db = mongomock.MongoClient()[args.db]
+
+    chunks = make_chunks(args.docs, args.chunks, args.text_bytes)
+    print(f"{len(chunks)} chunks ({args.docs} docs x {args.chunks}), {args.text_bytes} bytes of text each")
+
+    # Before: one round-trip per chunk, text duplicated in Mongo
+    rtt = 0 if args.mongo_uri else args.rtt_ms / 1000
+    db.drop_collection("chunks_before")
+    db_models.chunks_collection = RoundTrip(db["chunks_before"], rtt)
+    t0 = time.perf_counter()
+    for c in chunks:
+        db_models.insert_chunk_metadata(c["doc_id"], c["chunk_id"], c["text"])
+    before_s = time.perf_counter() - t0
+    before_size, before_index = storage_bytes(db, "chunks_before", bool(args.mongo_uri))
+
+    # After: indexed collection, bulk unordered writes, reference only
+    db.drop_collection("chunks_after")
+    db_models.chunks_collection = RoundTrip(db["chunks_after"], rtt)
+    db_models.documents_collection = db["documents_after"]
+    db_models.jobs_collection = db["jobs_after"]
+    if args.mongo_uri:
+        db_models.ensure_indexes()
+    t0 = time.perf_counter()
+    db_models.insert_chunks_metadata(chunks)
+    after_s = time.perf_counter() - t0
+    if not args.mongo_uri:
+        db_models.ensure_indexes()
+    after_size, after_index = storage_bytes(db, "chunks_after", bool(args.mongo_uri))
+
+    for label, seconds, size, index in (
+        ("insert_one + text", before_s, before_size, before_index),
+        ("insert_many + ref", after_s, after_size, after_index),
+    ):
+        print(
+            f"{label:>18} | {seconds:7.2f}s | {len(chunks) / seconds:10.0f} chunks/s | "
+            f"data {size / 1e6:8.2f} MB | indexes {index / 1e6:6.2f} MB"
+        )
+    print(f"speedup x{before_s / after_s:.1f}, data size x{before_size / max(after_size, 1):.1f} smaller")
+
+    for name in ("chunks_before", "chunks_after", "documents_after", "jobs_after"):
+        db.drop_collection(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=1000, help="chunks per document")
+    parser.add_argument("--text-bytes", type=int, default=1000)
+    parser.add_argument("--mongo-uri", default=None, help="real mongod (default: mongomock)")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated round trip per write (mongomock only)")
+    parser.add_argument("--db", default="rag_bench")
+    run(parser.parse_args())
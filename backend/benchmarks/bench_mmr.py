@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_mmr.py
+"""
+MMR reranking: latency of the vectorized implementation (rerank.mmr) versus
+a plain Python loop, and how much it diversifies the final chunks.
+
+The candidates are synthetic: clusters of near-duplicate vectors (the same
+passage seen through overlapping windows or repeated pages) around topics
+of varying relevance to the query. For each setting the benchmark reports
+the per-query rerank latency and, for plain top-k and for MMR, the number
+of distinct clusters in the final set and their mean pairwise cosine.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mmr --top-k 3 5 10 --candidates 4 --dim 768
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.services.rerank import mmr
+
+
+def make_candidates(rng, n, dim, cluster_size):
+    """
+    Query, candidate matrix (best first by cosine) and each candidate's cluster.
+    """
+    query = rng.normal(size=dim)
+    query /= np.linalg.norm(query)
+    n_clusters = -(-n // cluster_size)
+    centers = rng.normal(size=(n_clusters, dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    # Pull each topic towards the query by a different amount
+    centers += np.linspace(1.5, 0.2, n_clusters)[:, None] * query
+    clusters = np.repeat(np.arange(n_clusters), cluster_size)[:n]
+    vectors = centers[clusters] + rng.normal(scale=0.02, size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    order = np.argsort(-(vectors @ query))
+    return query, vectors[order], clusters[order]
+
+
+def mmr_loop(query, candidates, top_k, lambda_mult):
+    # Reference implementation with per-pair Python loops
+    relevance = [float(c @ query) for c in candidates]
+    picked, remaining = [], list(range(len(candidates)))
+    for _ in range(min(top_k, len(candidates))):
+        def score(i):
+            redundancy = max((float(candidates[i] @ candidates[j]) for j in picked), default=0.0)
+            return lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+        best = max(remaining, key=score)
+        picked.append(best)
+        remaining.remove(best)
+    return picked
+
+
+def diversity(vectors, clusters, rows):
+    rows = list(rows)
+    sims = vectors[rows] @ vectors[rows].T
+    pairs = sims[np.triu_indices(len(rows), k=1)]
+    return len(set(clusters[rows].tolist())), float(pairs.mean()) if len(pairs) else 1.0
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def run(args):
+    rng = np.random.default_rng(0)
+    print(f"dim {args.dim}; near-duplicate clusters of {args.cluster_size}; lambda {args.lambda_mult}; "
+          f"{args.queries} queries per row")
+    for top_k in args.top_k:
+        n = top_k * args.candidates
+        vec_ms, loop_ms, plain, diverse = [], [], [], []
+        for _ in range(args.queries):
+            query, vectors, clusters = make_candidates(rng, n, args.dim, args.cluster_size)
+            vec_ms.append(timed(lambda: mmr(query, vectors, top_k, args.lambda_mult), 5))
+            loop_ms.append(timed(lambda: mmr_loop(query, vectors, top_k, args.lambda_mult), 1))
+            plain.append(diversity(vectors, clusters, range(top_k)))
+            diverse.append(diversity(vectors, clusters, mmr(query, vectors, top_k, args.lambda_mult)[0]))
+        print(f"top_k {top_k:3d} from {n:4d} | mmr {statistics.median(vec_ms):7.3f} ms | "
+              f"loop {statistics.median(loop_ms):8.3f} ms | "
+              f"clusters top-k {statistics.mean(c for c, _ in plain):4.1f} -> mmr {statistics.mean(c for c, _ in diverse):4.1f} | "
+              f"pairwise cos {statistics.mean(s for _, s in plain):.3f} -> {statistics.mean(s for _, s in diverse):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 5, 10, 20])
+    parser.add_argument("--candidates", type=int, default=4, help="MMR_CANDIDATES: retrieved chunks per result")
+    parser.add_argument("--cluster-size", type=int, default=3, help="near-duplicates per passage")
+    parser.add_argument("--lambda-mult", type=float, default=0.7)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    run(parser.parse_args())
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_pipeline.py
+"""
+Files/sec of the concurrent ingestion pipeline as extraction processes scale,
+next to the serial process_and_store_file loop.
+
+Embedding calls are simulated with a fixed per-request latency and the
+vector/Mongo writes are replaced by no-ops, so the numbers isolate how well
+CPU-bound extraction and network-bound embedding overlap.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --files 32 --size-mb 2 --embed-latency 0.2
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("VECTOR_DB_DIR", tempfile.mkdtemp(prefix="bench_vector_db_"))
+
+from app.services import ingest, pipeline
+
+
+def make_files(directory, count, size_mb, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(5000)]
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc_{i}.txt")
+        with open(path, "w") as f:
+            written = 0
+            while written < size_mb * 1024 * 1024:
+                line = " ".join(rng.choices(words, k=200)) + "\n\n"
+                f.write(line)
+                written += len(line)
+        paths.append(path)
+    return paths
+
+
+def install_stubs(latency, dim=768):
+    def fake_embed(chunk_data):
+        time.sleep(latency)
+        return [[0.0] * dim for _ in chunk_data], len(chunk_data)
+
+    def fake_add(chunks, embeddings, batch_size=None, progress=None):
+        return {"added": len(chunks), "failed": []}
+
+    def fake_save(*args, **kwargs):
+        pass
+
+    for module in (ingest, pipeline):
+        module.embed_chunk_records = fake_embed
+        module.add_embeddings = fake_add
+        module.save_metadata = fake_save
+    pipeline.insert_chunks_metadata = lambda chunks, batch_size=None: len(chunks)
+    # Every document is new: nothing stored to diff against
+    ingest.get_document_chunks = lambda doc_id: []
+
+
+def run_serial(paths):
+    start = time.perf_counter()
+    for path in paths:
+        ingest.process_and_store_file(path)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def run_pipeline(paths, workers):
+    pipe = pipeline.IngestPipeline(extract_workers=workers, embed_workers=max(4, workers))
+    start = time.perf_counter()
+    futures = [pipe.submit(path) for path in paths]
+    results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    pipe.close()
+    assert all(r.get("status") == "success" for r in results), results
+    return len(paths) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--size-mb", type=float, default=2)
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="seconds per embedding request")
+    args = parser.parse_args()
+
+    install_stubs(args.embed_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_files(tmp, args.files, args.size_mb)
+        print(f"serial loop          : {run_serial(paths):7.2f} files/s")
+        cores = os.cpu_count() or 1
+        workers = 1
+        while workers <= cores:
+            print(f"pipeline {workers:>3} procs   : {run_pipeline(paths, workers):7.2f} files/s")
+            workers *= 2
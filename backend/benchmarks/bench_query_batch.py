@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_query_batch.py
+"""
+One /query/batch request versus the same number of individual /query calls.
+
+Uses the stub Groq server and app processes of bench_async_serving (numpy
+store, simulated embeddings and chat latency, mongomock). For N unique
+questions it times:
+  - N sequential /query calls
+  - N /query calls kept QUERY_BATCH_CONCURRENCY at a time
+  - one /query/batch call (time to first NDJSON line and to the last)
+and reports queries/s plus the upstream embeddings/completion requests
+each pattern made.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_batch --queries 200
+    python -m benchmarks.bench_query_batch --app asgi --llm-ms 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+# config.py refuses to load without a key; Groq is replaced by the stub.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import httpx
+
+from benchmarks.bench_async_serving import free_port, spawn, start_stack
+
+
+def questions(n):
+    tag = uuid.uuid4().hex[:8]  # unique per pattern, so no cache helps
+    return [f"question {i} about topic {i % 97} ({tag})" for i in range(n)]
+
+
+async def individual(base, queries, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    pending = iter(queries)
+    errors = 0
+    async with httpx.AsyncClient(limits=limits, timeout=600) as client:
+        async def worker():
+            nonlocal errors
+            for q in pending:
+                res = await client.post(f"{base}/query/", json={"query": q})
+                errors += res.status_code != 200
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return errors, None
+
+
+async def batched(base, queries):
+    errors, first = 0, None
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        async with client.stream("POST", f"{base}/query/batch", json={"queries": queries}) as res:
+            expected = 0
+            async for line in res.aiter_lines():
+                if not line:
+                    continue
+                if first is None:
+                    first = (time.perf_counter() - start) * 1000
+                row = json.loads(line)
+                errors += row["status"] != 200 or row["index"] != expected
+                expected += 1
+    return errors + (len(queries) - expected), first
+
+
+def upstream(stub):
+    return httpx.get(stub).json()
+
+
+def run(args):
+    env, stub, stub_proc = start_stack(args)
+    env["QUERY_BATCH_CONCURRENCY"] = str(args.concurrency)
+    procs = [stub_proc]
+    try:
+        port = free_port()
+        procs.append(spawn(args.app, port, args, env))
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(individual(base, questions(2), 1))  # warm-up
+        print(f"{args.app}: {args.queries} questions, {args.mode} retrieval over {args.chunks} chunks; "
+              f"stub embeddings {args.embed_ms:.0f} ms, chat {args.llm_ms:.0f} ms; concurrency {args.concurrency}")
+
+        patterns = [
+            ("/query sequential", lambda qs: individual(base, qs, 1)),
+            (f"/query x{args.concurrency} parallel", lambda qs: individual(base, qs, args.concurrency)),
+            ("/query/batch", lambda qs: batched(base, qs)),
+        ]
+        for label, call in patterns:
+            before = upstream(stub)
+            t0 = time.perf_counter()
+            errors, first = asyncio.run(call(questions(args.queries)))
+            elapsed = time.perf_counter() - t0
+            after = upstream(stub)
+            calls = {k: after[k] - before[k] for k in after}
+            first_line = f" | first {first:7.0f} ms" if first is not None else ""
+            print(f"{label:>22} | {elapsed:7.2f} s | {args.queries / elapsed:7.1f} q/s{first_line} | "
+                  f"embeddings requests {calls['embeddings']:4d} | completions {calls['completions']:4d} | errors {errors}")
+    finally:
+        for proc in procs:
+            proc.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--app", choices=["flask", "asgi"], default="flask")
+    parser.add_argument("--concurrency", type=int, default=8, help="QUERY_BATCH_CONCURRENCY, and parallel /query clients")
+    parser.add_argument("--flask-threads", type=int, default=8, help="worker threads of the Flask process")
+    parser.add_argument("--embed-ms", type=float, default=30, help="stub embeddings latency")
+    parser.add_argument("--llm-ms", type=float, default=300, help="stub chat completion latency")
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--mode", default="hybrid", choices=["hybrid", "dense", "lexical"])
+    run(parser.parse_args())
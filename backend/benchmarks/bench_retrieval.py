@@ -0,0 +1,122 @@
+# backend/benchmarks/bench_retrieval.py
+"""
+Retrieval latency and recall@k for lexical-only, dense-only and hybrid search.
+
+The corpus is synthetic: each chunk describes a part with a unique identifier
+(e.g. "QX-48213") and a few topic words. Half of the queries ask for an exact
+identifier, half paraphrase the topic words. Dense vectors come from a hashed
+bag-of-words over alphabetic words only, standing in for an embedding model
+that captures topics but not rare identifiers, so no Groq calls are made.
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval --chunks 20000 --queries 500 --k 5
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import chromadb
+import numpy as np
+
+from app.services import vector_store
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_backends import ChromaStore
+
+TOPICS = [
+    "pump", "valve", "sensor", "bearing", "gasket", "filter", "motor", "relay",
+    "coupling", "bracket", "hose", "nozzle", "impeller", "thermostat", "switch",
+    "actuator", "regulator", "manifold", "flange", "seal"
+]
+ADJECTIVES = [
+    "hydraulic", "pneumatic", "stainless", "thermal", "rotary", "compact",
+    "industrial", "corrosion", "pressure", "flow", "vibration", "low", "high"
+]
+
+
+def hashed_embedding(text, dim):
+    vec = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        if word.isalpha():
+            h = int(hashlib.md5(word.encode()).hexdigest(), 16)
+            vec[h % dim] += 1.0 if (h >> 64) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return (vec / norm if norm else vec).tolist()
+
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    chunks, part_numbers = [], []
+    for i in range(n):
+        part = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{rng.randrange(10**5):05d}"
+        words = rng.sample(ADJECTIVES, 3) + rng.sample(TOPICS, 2)
+        text = (
+            f"Part {part} is a {words[0]} {words[3]} rated for {words[1]} service. "
+            f"Pair it with a {words[2]} {words[4]} for best results."
+        )
+        chunks.append({"text": text, "chunk_id": f"chunk_{i}", "doc_id": f"doc_{i // 50}", "words": words})
+        part_numbers.append(part)
+    return chunks, part_numbers
+
+
+def make_queries(chunks, part_numbers, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for q in range(count):
+        i = rng.randrange(len(chunks))
+        if q % 2 == 0:
+            queries.append((f"What is part {part_numbers[i]}?", chunks[i]["chunk_id"], "identifier"))
+        else:
+            w = chunks[i]["words"]
+            queries.append((f"{w[0]} {w[3]} for {w[1]} service with {w[2]} {w[4]}", chunks[i]["chunk_id"], "topic"))
+    return queries
+
+
+def run(n, query_count, k, dim):
+    chunks, part_numbers = make_corpus(n)
+    embeddings = [hashed_embedding(c["text"], dim) for c in chunks]
+
+    client = chromadb.Client()
+    vector_store.store = ChromaStore(client=client, collection_name="bench_retrieval")
+    vector_store.lexical_index = LexicalIndex(path=None)
+    t0 = time.perf_counter()
+    vector_store.add_embeddings([{k_: v for k_, v in c.items() if k_ != "words"} for c in chunks], embeddings)
+    print(f"Indexed {n} chunks in {time.perf_counter() - t0:.1f}s; lexical index {vector_store.lexical_index.stats()}")
+
+    queries = make_queries(chunks, part_numbers, query_count)
+    query_embeddings = [hashed_embedding(text, dim) for text, _, _ in queries]
+
+    print(f"{'mode':>8} | {'recall@' + str(k):>9} | {'identifier':>10} | {'topic':>6} | {'p50 ms':>7} | {'p95 ms':>7}")
+    for mode in ("lexical", "dense", "hybrid"):
+        hits = {"identifier": 0, "topic": 0}
+        latencies = []
+        for (text, expected, kind), emb in zip(queries, query_embeddings):
+            t0 = time.perf_counter()
+            res = vector_store.search_embeddings(text, top_k=k, query_embedding=emb, mode=mode)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            ids = [m["chunk_id"] for m in res["metadatas"][0]]
+            if expected in ids:
+                hits[kind] += 1
+        per_kind = max(1, query_count // 2)
+        latencies.sort()
+        print(
+            f"{mode:>8} | {sum(hits.values()) / query_count:9.3f} | "
+            f"{hits['identifier'] / per_kind:10.3f} | {hits['topic'] / per_kind:6.3f} | "
+            f"{statistics.median(latencies):7.2f} | {latencies[int(len(latencies) * 0.95) - 1]:7.2f}"
+        )
+    client.delete_collection("bench_retrieval")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+    run(args.chunks, args.queries, args.k, args.dim)
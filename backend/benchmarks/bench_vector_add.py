@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_vector_add.py
+"""
+Compare vector-store ingest throughput: per-chunk collection.add loop vs the
+batched add_embeddings upsert path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_add --sizes 10000 100000 --dim 768
+"""
+import argparse
+import os
+import random
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import chromadb
+from app.services import vector_store
+from app.services.vector_backends import ChromaStore
+
+
+def make_chunks(n, dim, seed=0):
+    rng = random.Random(seed)
+    chunks = [
+        {"text": f"synthetic chunk {i} " * 20, "chunk_id": f"chunk_{i}", "doc_id": f"doc_{i // 500}"}
+        for i in range(n)
+    ]
+    embeddings = [[rng.random() for _ in range(dim)] for _ in range(n)]
+    return chunks, embeddings
+
+
+def per_chunk_loop(collection, chunks, embeddings):
+    # Baseline: the original one-call-per-chunk implementation
+    for chunk, emb in zip(chunks, embeddings):
+        collection.add(
+            ids=[chunk["chunk_id"]],
+            documents=[chunk["text"]],
+            metadatas=[{"doc_id": chunk["doc_id"], "chunk_id": chunk["chunk_id"]}],
+            embeddings=[emb]
+        )
+
+
+def run(sizes, dim, batch_size):
+    client = chromadb.Client()
+    for n in sizes:
+        chunks, embeddings = make_chunks(n, dim)
+
+        name = f"bench_loop_{n}"
+        collection = client.get_or_create_collection(name=name)
+        t0 = time.perf_counter()
+        per_chunk_loop(collection, chunks, embeddings)
+        loop_s = time.perf_counter() - t0
+        client.delete_collection(name)
+
+        name = f"bench_batch_{n}"
+        vector_store.store = ChromaStore(client=client, collection_name=name)
+        t0 = time.perf_counter()
+        report = vector_store.add_embeddings(chunks, embeddings, batch_size=batch_size)
+        batch_s = time.perf_counter() - t0
+        client.delete_collection(name)
+
+        print(
+            f"{n:>8} chunks | loop {n / loop_s:10.1f} chunks/s ({loop_s:8.2f}s) | "
+            f"batched {n / batch_s:10.1f} chunks/s ({batch_s:8.2f}s) | "
+            f"speedup x{loop_s / batch_s:.1f} | failed batches {len(report['failed'])}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    run(args.sizes, args.dim, args.batch_size)
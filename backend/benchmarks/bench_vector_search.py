@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_vector_search.py
+"""
+Compare vector-store backends on build time, single and batched query
+latency, recall@k against exact search, and the latency of queries scoped
+to a single document (100 vectors) with a doc_id filter.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_search --sizes 10000 100000 1000000 --dim 384
+    python -m benchmarks.bench_vector_search --backends numpy --dtype float16
+"""
+import argparse
+import os
+import statistics
+import time
+
+# config.py refuses to load without a key; the benchmark never calls Groq.
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+import numpy as np
+
+from app.services.vector_backends import ChromaStore, NumpyStore
+
+
+def make_vectors(n, dim, seed=0):
+    # Unit rows, so L2 (Chroma's default space) and cosine rankings agree
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors, queries, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = q @ unit.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def make_store(backend, n, dtype):
+    if backend == "numpy":
+        return NumpyStore(dtype=dtype, persist=False)
+    import chromadb
+    return ChromaStore(client=chromadb.Client(), collection_name=f"bench_search_{n}")
+
+
+def build(store, vectors, batch_size):
+    ids = [f"v{i}" for i in range(len(vectors))]
+    batch_size = min(batch_size, store.max_batch_size() or batch_size)
+    for start in range(0, len(vectors), batch_size):
+        end = start + batch_size
+        store.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end].tolist(),
+            documents=None,
+            metadatas=[{"doc_id": f"doc_{i // 100}"} for i in range(start, min(end, len(vectors)))]
+        )
+
+
+def run(sizes, dim, k, query_count, batch, backends, dtype, batch_size):
+    for n in sizes:
+        vectors = make_vectors(n, dim)
+        queries = make_vectors(query_count, dim, seed=1)
+        truth = exact_top_k(vectors, queries, k)
+        print(f"--- {n} vectors x {dim} dims ---")
+
+        for backend in backends:
+            store = make_store(backend, n, dtype)
+            t0 = time.perf_counter()
+            build(store, vectors, batch_size)
+            build_s = time.perf_counter() - t0
+
+            latencies, hits = [], 0
+            for q, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                res = store.query([q.tolist()], top_k=k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                found = {int(i[1:]) for i in res["ids"][0]}
+                hits += len(found & set(expected.tolist()))
+
+            t0 = time.perf_counter()
+            for start in range(0, query_count, batch):
+                store.query(queries[start:start + batch].tolist(), top_k=k)
+            batched_ms = (time.perf_counter() - t0) * 1000 / query_count
+
+            filtered = []
+            for i, q in enumerate(queries):
+                where = {"doc_id": f"doc_{(i * 7919) % max(1, n // 100)}"}
+                t0 = time.perf_counter()
+                store.query([q.tolist()], top_k=k, where=where)
+                filtered.append((time.perf_counter() - t0) * 1000)
+
+            latencies.sort()
+            print(
+                f"{backend:>7} | build {build_s:7.1f}s | p50 {statistics.median(latencies):7.2f} ms | "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.2f} ms | "
+                f"batched({batch}) {batched_ms:6.2f} ms/query | recall@{k} {hits / (query_count * k):.3f} | "
+                f"1-doc filter p50 {statistics.median(filtered):6.2f} ms"
+            )
+            if backend == "chroma":
+                store.client.delete_collection(store.collection.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32, help="queries per batched call")
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"])
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="vectors per upsert")
+    args = parser.parse_args()
+    run(args.sizes, args.dim, args.k, args.queries, args.batch, args.backends, args.dtype, args.batch_size)
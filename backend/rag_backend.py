@@ -1,8 +1,69 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
+# backend/rag_backend.py
+"""
+Async (ASGI) version of the backend, with the same routes as the Flask app
+in app/main.py.
+
+A Flask worker thread is tied up for the whole of a /query request, most of
+it waiting on the embedding and chat completion calls. Here those calls go
+through httpx.AsyncClient and Mongo through PyMongo's async client, so one
+process serves many queries concurrently. Vector/BM25 search and document
+deletes are blocking, so they run on a bounded thread pool.
+
+Run (from backend/):
+    uvicorn rag_backend:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import functools
+import json
 import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from werkzeug.utils import secure_filename
+
+import app.config as config
+from app.models import async_db, db_models
+from app.routes import metadata as metadata_routes
+from app.routes import query as query_routes
+from app.routes.upload import DOC_ID_RE, UPLOAD_DIR
+from app.services import compactor, http_client, ingest, jobs, metrics
+from app.services.vector_store import (
+    aget_text_embedding, aget_text_embeddings, dense_search_batch, finish_search, search_embeddings
+)
+from app.utils import generate_id, log
+
+# Blocking searches and deletes run here, not on the event loop
+_executor = ThreadPoolExecutor(max_workers=config.ASYNC_SEARCH_THREADS, thread_name_prefix="search")
+
+
+async def _offload(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Same startup as app/main.py: indexes, orphaned jobs, compaction
+    db_models.ensure_indexes()
+    jobs.recover()
+    compactor.start()
+    yield
+    await http_client.aclose()
+    await async_db.close()
+
+
+# Routes answer with and without a trailing slash, like the Flask blueprints
+app = FastAPI(lifespan=lifespan)
 
 # ✅ Allow frontend access
 app.add_middleware(
@@ -13,16 +74,417 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+def _error(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
 
 @app.get("/")
-def read_root():
-    return {"message": "RAG backend running"}
+async def home():
+    return {
+        "message": "✅ Backend is running.",
+        "routes": ["/upload (POST)", "/upload/jobs/<job_id> (GET)", "/metadata (GET)", "/metadata/export (GET)", "/metadata/<doc_id> (DELETE)", "/query (POST)", "/query/stream (POST)", "/query/batch (POST)", "/metrics (GET)"]
+    }
+
+
+# ---------------- Upload ----------------
+def _save_upload(f, file_path):
+    with open(file_path, "wb") as out:
+        shutil.copyfileobj(f.file, out)
+
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    return {"status": "success", "filename": file.filename}
+@app.post("/upload/", include_in_schema=False)
+async def upload(files: Optional[List[UploadFile]] = File(None), doc_id: Optional[List[str]] = Form(None)):
+    try:
+        if not files:
+            return _error("No files uploaded", 400)
+
+        if len(files) > 20:
+            return _error("Maximum 20 files allowed", 400)
+
+        # Optional stable ids, one per file (see app/routes/upload.py)
+        doc_ids = doc_id or []
+        if doc_ids and len(doc_ids) != len(files):
+            return _error("Pass one doc_id per file", 400)
+        bad = [d for d in doc_ids if not DOC_ID_RE.match(d)]
+        if bad:
+            return _error(f"Invalid doc_id: {bad[0]} (use letters, digits, '_', '-', '.')", 400)
+
+        results = []
+
+        for i, f in enumerate(files):
+            filename = secure_filename(f.filename)
+            file_path = os.path.join(UPLOAD_DIR, f"{generate_id('upload')}_{filename}")
+            await run_in_threadpool(_save_upload, f, file_path)
+
+            # Queue ingestion; progress is polled via /upload/jobs/<job_id>
+            try:
+                job = await async_db.create_job(
+                    generate_id("job"), filename, file_path, doc_id=doc_ids[i] if doc_ids else None
+                )
+                jobs.schedule(job["job_id"])
+                results.append({"file": f.filename, "status": "queued", "job_id": job["job_id"]})
+            except Exception as e:
+                log(f" Error queueing {f.filename}: {e}")
+                results.append({"file": f.filename, "status": "failed", "error": str(e)})
+
+        # 202 if anything was queued; if every enqueue failed, nothing will run
+        queued = any(r["status"] == "queued" for r in results)
+        return JSONResponse({"uploaded": results}, status_code=202 if queued else 500)
+
+    except Exception as e:
+        log(f" Upload route error: {e}")
+        return _error(str(e), 500)
+
+
+@app.get("/upload/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await async_db.get_job(job_id)
+    if job is None:
+        return _error(f"Job not found: {job_id}", 404)
+    return JSONResponse(jsonable_encoder(job))
+
+
+# ---------------- Metadata ----------------
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    since = request.headers.get("if-modified-since")
+    if not (since and last_modified):
+        return False
+    try:
+        return last_modified <= parsedate_to_datetime(since).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return False
+
+
+def _validator_headers(etag, last_modified):
+    # Clients may keep pages but must revalidate them
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+@app.get("/metadata")
+@app.get("/metadata/", include_in_schema=False)
+async def metadata(request: Request):
+    """
+    One page of document metadata, newest first (see app/routes/metadata.py).
+    """
+    etag, last_modified = metadata_routes._validators()
+    headers = _validator_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        query, fields = metadata_routes._parse_query(request.query_params)
+        after, limit = metadata_routes._parse_page(request.query_params)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    # One extra row tells whether another page exists
+    docs = await async_db.find_documents(query, fields, after=after, limit=limit + 1).to_list()
+    next_cursor = metadata_routes._encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return JSONResponse({
+        "documents": [metadata_routes._serialize(d, fields) for d in docs[:limit]],
+        "next_cursor": next_cursor,
+        "limit": limit
+    }, headers=headers)
+
+
+@app.get("/metadata/export")
+async def export(request: Request):
+    """
+    Stream every matching document as NDJSON.
+    """
+    etag, last_modified = metadata_routes._validators()
+    headers = _validator_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        query, fields = metadata_routes._parse_query(request.query_params)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    async def generate():
+        async for doc in async_db.find_documents(query, fields, limit=0).batch_size(1000):
+            yield json.dumps(metadata_routes._serialize(doc, fields)) + "\n"
+
+    headers["Content-Disposition"] = "attachment; filename=documents.ndjson"
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers=headers)
+
+
+@app.delete("/metadata/{doc_id}")
+async def delete(doc_id: str):
+    """
+    Delete a document, its chunks and its vectors (tombstoned, then purged
+    by the background compactor).
+    """
+    try:
+        deleted = await _offload(ingest.delete_document, doc_id)
+    except Exception as e:
+        return _error(str(e), 500)
+    if deleted is None:
+        return _error(f"Document not found: {doc_id}", 404)
+
+    compactor.report()
+    return {"doc_id": doc_id, "chunks_deleted": deleted, "status": "deleted"}
+
+
+# ---------------- Query ----------------
+async def _json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _answer(user_query, relevant_docs, model_choice, query_embedding, scope, version):
+    """
+    Async version of query._answer. Returns (body, status).
+    """
+    payload = query_routes._answer_payload(user_query, relevant_docs, model_choice)
+    if payload is None:
+        return {"answer": query_routes.NO_CONTEXT_ANSWER}, 200
+
+    log(f"\n🚀 Sending request to Groq model: {payload['model']}")
+    with metrics.timer("llm.latency_ms"):
+        response = await http_client.agroq_post(query_routes.GROQ_CHAT_PATH, payload)
+    log(f"📩 Groq Status: {response.status_code}")
+    return query_routes._answer_body(response, relevant_docs, payload, query_embedding, scope, version)
+
+
+@app.post("/query")
+@app.post("/query/", include_in_schema=False)
+async def query(request: Request):
+    try:
+        data = await _json_body(request)
+        if data.get("stream"):
+            return _stream(data)
+
+        user_query = (data.get("query") or "").strip()
+        model_choice = data.get("model", "llama3-8b")
+
+        if not user_query:
+            return _error("No query provided", 400)
+        try:
+            where, top_k = query_routes._retrieval_options(data)
+            rerank = query_routes._rerank_options(data)
+        except ValueError as e:
+            return _error(str(e), 400)
+        scope = query_routes._cache_scope(model_choice, where, top_k, rerank)
+
+        # ✅ Serve paraphrases of recent questions from the answer cache
+        query_embedding = await aget_text_embedding(user_query)
+        cached, version = query_routes._cache_lookup(query_embedding, scope)
+        if cached:
+            return query_routes._cached_body(cached)
+
+        relevant_docs = await _offload(
+            search_embeddings, user_query, top_k=top_k, query_embedding=query_embedding, where=where, rerank=rerank
+        )
+        body, status = await _answer(user_query, relevant_docs, model_choice, query_embedding, scope, version)
+        return JSONResponse(body, status_code=status)
+
+    except Exception as e:
+        log(f"❌ Query error: {e}")
+        return JSONResponse({"answer": f"A critical backend error occurred: {str(e)}"}, status_code=500)
+
+
+async def _aiter_groq_deltas(payload):
+    """
+    Async version of query._iter_groq_deltas: content deltas, then usage (dict).
+    """
+    async for line in http_client.agroq_stream(query_routes.GROQ_CHAT_PATH, payload):
+        items = query_routes._parse_stream_line(line)
+        if items is None:
+            return
+        for item in items:
+            yield item
+
+
+def _stream(data):
+    """
+    SSE response for a query; same events as the Flask /query/stream.
+    """
+    started = time.perf_counter()
+    sse = query_routes._sse
+    user_query = (data.get("query") or "").strip()
+    model_choice = data.get("model", "llama3-8b")
+
+    if not user_query:
+        return _error("No query provided", 400)
+    try:
+        where, top_k = query_routes._retrieval_options(data)
+        rerank = query_routes._rerank_options(data)
+    except ValueError as e:
+        return _error(str(e), 400)
+    scope = query_routes._cache_scope(model_choice, where, top_k, rerank)
+
+    async def generate():
+        try:
+            query_embedding = await aget_text_embedding(user_query)
+            cached, version = query_routes._cache_lookup(query_embedding, scope)
+            if cached:
+                yield sse("metadata", {
+                    "chunk_ids": cached["chunk_ids"],
+                    "doc_ids": cached["doc_ids"],
+                    "model_used": cached["model_used"],
+                    "cached": True
+                })
+                yield sse("token", {"delta": cached["answer"]})
+                yield sse("done", {
+                    "context_used": cached["context_used"],
+                    "model_used": cached["model_used"],
+                    "answer_chars": len(cached["answer"]),
+                    "total_ms": (time.perf_counter() - started) * 1000,
+                    "cached": True,
+                    "cache_similarity": cached["cache_similarity"]
+                })
+                return
+
+            relevant_docs = await _offload(
+                search_embeddings, user_query, top_k=top_k, query_embedding=query_embedding, where=where, rerank=rerank
+            )
+            context = query_routes._get_context(relevant_docs)
+            chunk_ids, doc_ids = query_routes._retrieved_ids(relevant_docs)
+            payload = query_routes._build_payload(user_query, context, model_choice, stream=True)
+
+            yield sse("metadata", {
+                "chunk_ids": chunk_ids,
+                "doc_ids": doc_ids,
+                "model_used": payload["model"]
+            })
+
+            if not context:
+                yield sse("token", {"delta": query_routes.NO_CONTEXT_ANSWER})
+                yield sse("done", {"context_used": 0, "model_used": payload["model"]})
+                return
+
+            log(f"\n🚀 Streaming request to Groq model: {payload['model']}")
+            first_token_ms = None
+            answer_parts = []
+            usage = None
+            async for delta in _aiter_groq_deltas(payload):
+                if isinstance(delta, dict):
+                    usage = delta
+                    query_routes._observe_usage(usage)
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("query.ttft_ms", first_token_ms)
+                answer_parts.append(delta)
+                yield sse("token", {"delta": delta})
+
+            total_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("query.stream_total_ms", total_ms)
+            answer = "".join(answer_parts)
+            query_routes._cache_store(query_embedding, scope, version, {
+                "answer": answer,
+                "context_used": len(chunk_ids),
+                "model_used": payload["model"],
+                "chunk_ids": chunk_ids,
+                "doc_ids": doc_ids
+            })
+            yield sse("done", {
+                "context_used": len(chunk_ids),
+                "model_used": payload["model"],
+                "answer_chars": len(answer),
+                "ttft_ms": first_token_ms,
+                "total_ms": total_ms,
+                "usage": usage
+            })
+        except Exception as e:
+            log(f"❌ Streaming query error: {e}")
+            yield sse("error", {"answer": f"A critical backend error occurred: {str(e)}"})
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/query/stream")
+@app.post("/query/stream/", include_in_schema=False)
+async def query_stream(request: Request):
+    """
+    Same as /query, but relays the answer over SSE as Groq generates it.
+    """
+    return _stream(await _json_body(request))
+
+
+# ---------------- Batch (NDJSON) ----------------
+# Chat completions in flight across all batch requests of this process
+_completion_slots = asyncio.Semaphore(config.QUERY_BATCH_CONCURRENCY)
+
+
+@app.post("/query/batch")
+@app.post("/query/batch/", include_in_schema=False)
+async def query_batch(request: Request):
+    """
+    Answer many questions in one request; NDJSON lines in request order
+    (see query.query_batch).
+    """
+    started = time.perf_counter()
+    data = await _json_body(request)
+    model_choice = data.get("model", "llama3-8b")
+    try:
+        queries, where, top_k, rerank = query_routes._batch_options(data)
+    except ValueError as e:
+        return _error(str(e), 400)
+    scope = query_routes._cache_scope(model_choice, where, top_k, rerank)
+    metrics.observe("query.batch_size", len(queries))
+
+    try:
+        embeddings = await aget_text_embeddings(queries)
+        cached_bodies, versions = query_routes._batch_lookup(queries, embeddings, scope)
+        misses, same_as = query_routes._batch_misses(queries, cached_bodies)
+        dense = await _offload(
+            dense_search_batch, [embeddings[i] for i in misses], top_k=top_k, where=where, rerank=rerank
+        )
+    except Exception as e:
+        body, status = query_routes._batch_error(e)
+        return JSONResponse(body, status_code=status)
+
+    async def answer(i, dense_candidates):
+        async with _completion_slots:
+            relevant_docs = await _offload(
+                finish_search, queries[i], dense_candidates, top_k=top_k, where=where,
+                query_embedding=embeddings[i], rerank=rerank
+            )
+            return await _answer(queries[i], relevant_docs, model_choice, embeddings[i], scope, versions[i])
+
+    tasks = {i: asyncio.ensure_future(answer(i, d)) for i, d in zip(misses, dense)}
+
+    async def generate():
+        try:
+            for i, user_query in enumerate(queries):
+                if i in cached_bodies:
+                    body, status = cached_bodies[i], 200
+                else:
+                    try:
+                        body, status = await tasks[same_as.get(i, i)]
+                    except Exception as e:
+                        body, status = query_routes._batch_error(e)
+                yield query_routes._batch_line(i, user_query, body, status)
+        finally:
+            # Client gone or done: cancel completions still pending
+            for task in tasks.values():
+                task.cancel()
+            metrics.observe("query.batch_ms", (time.perf_counter() - started) * 1000)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+# ---------------- Metrics ----------------
+@app.get("/metrics")
+@app.get("/metrics/", include_in_schema=False)
+async def get_metrics():
+    return metrics.snapshot()
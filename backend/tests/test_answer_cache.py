@@ -0,0 +1,40 @@
+import pytest
+from app.services.answer_cache import SemanticAnswerCache
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(max_size=2, threshold=0.95)
+
+def test_paraphrase_hit(cache):
+    cache.put([1.0, 0.0, 0.0], "llama3-8b", 1, {"answer": "A"})
+    answer, similarity = cache.get([0.99, 0.05, 0.0], "llama3-8b", 1)
+    assert answer == {"answer": "A"} and similarity >= 0.95
+    assert cache.get([0.0, 1.0, 0.0], "llama3-8b", 1) is None
+
+def test_model_is_part_of_key(cache):
+    cache.put([1.0, 0.0], "llama3-8b", 1, {"answer": "A"})
+    assert cache.get([1.0, 0.0], "mixtral", 1) is None
+
+def test_corpus_version_invalidates(cache):
+    cache.put([1.0, 0.0], "llama3-8b", 1, {"answer": "A"})
+    assert cache.get([1.0, 0.0], "llama3-8b", 2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.get([1.0, 0.0], "llama3-8b", 1) is None
+
+def test_lru_eviction(cache):
+    cache.put([1.0, 0.0, 0.0], "m", 1, "A")
+    cache.put([0.0, 1.0, 0.0], "m", 1, "B")
+    cache.get([1.0, 0.0, 0.0], "m", 1)
+    cache.put([0.0, 0.0, 1.0], "m", 1, "C")
+    assert cache.get([0.0, 1.0, 0.0], "m", 1) is None
+    assert cache.get([1.0, 0.0, 0.0], "m", 1)[0] == "A"
+    assert cache.stats()["evictions"] == 1
+
+def test_models_are_forgotten_with_their_last_answer(cache):
+    # Scopes are per request shape; one that falls out of the cache must not leak
+    for i in range(50):
+        cache.put([1.0, 0.0], f"scope-{i}", 1, i)
+    assert set(cache._model_ids) == {"scope-48", "scope-49"}
+    assert cache.get([1.0, 0.0], "scope-49", 1)[0] == 49
+    cache.get([1.0, 0.0], "scope-49", 2)  # new corpus version clears everything
+    assert cache._model_ids == {}
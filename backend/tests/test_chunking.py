@@ -0,0 +1,99 @@
+import random
+import pytest
+from app.utils import clean_text, chunk_text, iter_clean_text, iter_chunks
+
+def reference_chunks(text, chunk_size, overlap):
+    # The original whole-string character chunker
+    text = clean_text(text)
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+@pytest.fixture
+def sample_text():
+    return "Artificial  intelligence is\n\ntransforming industries.  " * 40
+
+def test_chunk_text_matches_reference(sample_text):
+    assert chunk_text(sample_text, 100, 10) == reference_chunks(sample_text, 100, 10)
+
+def test_streaming_matches_whole_string():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice("ab \n\t.") for _ in range(rng.randint(0, 300)))
+        size = rng.randint(2, 40)
+        overlap = rng.randint(0, size - 1)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 8)))
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert "".join(iter_clean_text(pieces)) == clean_text(text)
+        assert list(iter_chunks(iter_clean_text(pieces), size, overlap)) == reference_chunks(text, size, overlap)
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        list(iter_chunks(["abc"], chunk_size=10, overlap=10))
+
+def test_sentence_split_is_independent_of_piece_boundaries():
+    from app.services.chunker import iter_sentences
+    text = "First sentence here. Second one! Third?\n\nNew para starts. And it continues.\n"
+    expected = [
+        ("First sentence here.", False),
+        ("Second one!", False),
+        ("Third?", True),
+        ("New para starts.", False),
+        ("And it continues.", True),
+    ]
+    assert list(iter_sentences([text])) == expected
+    assert list(iter_sentences([text[i:i + 5] for i in range(0, len(text), 5)])) == expected
+
+def test_text_without_boundaries_is_force_split():
+    from app.services.chunker import iter_sentences
+    text = "no punctuation here just words " * 500
+    pieces = (text[i:i + 64] for i in range(0, len(text), 64))
+    sentences = list(iter_sentences(pieces, max_chars=200))
+    assert len(sentences) > 1
+    assert all(len(s) <= 200 for s, _ in sentences)
+    assert " ".join(s for s, _ in sentences) == text.strip()
+
+class WordEncoding:
+    # Stub tiktoken encoding: one token per space-separated word
+    def encode(self, text):
+        return text.split(" ")
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    from app.services import chunker
+    monkeypatch.setattr(chunker, "try_tokenizer", lambda encoding_name="cl100k_base": WordEncoding())
+    return chunker
+
+def test_token_chunks_respect_budget_and_carry_overlap(word_tokens):
+    text = "a1 a2 a3. b1 b2 b3. c1 c2 c3. d1 d2 d3. e1 e2 e3."
+    chunks = list(word_tokens.iter_token_chunks([text], chunk_tokens=7, overlap_tokens=3))
+    assert chunks == ["a1 a2 a3. b1 b2 b3.", "b1 b2 b3. c1 c2 c3.", "c1 c2 c3. d1 d2 d3.", "d1 d2 d3. e1 e2 e3."]
+    assert all(len(c.split(" ")) <= 7 for c in chunks)
+
+def test_long_sentence_is_split_on_token_boundaries(word_tokens):
+    tokens = [f"w{i}" for i in range(24)] + ["w24."]
+    chunks = list(word_tokens.iter_token_chunks(["Short one. " + " ".join(tokens)], chunk_tokens=10, overlap_tokens=2))
+    # The pending chunk is flushed first, then windows of 10 tokens advancing by 8
+    assert chunks == ["Short one."] + [" ".join(tokens[start:start + 10]) for start in (0, 8, 16)]
+
+def test_paragraph_end_closes_chunk_without_overlap(word_tokens):
+    text = "a1 a2 a3 a4. b1 b2.\n\nc1 c2. d1 d2."
+    chunks = list(word_tokens.iter_token_chunks([text], chunk_tokens=10, overlap_tokens=3))
+    assert chunks == ["a1 a2 a3 a4. b1 b2.", "c1 c2. d1 d2."]
+
+def test_token_chunking_without_tokenizer(monkeypatch, tmp_path):
+    from app.services import chunker
+    monkeypatch.setattr(chunker, "try_tokenizer", lambda encoding_name="cl100k_base": None)
+    path = tmp_path / "doc.txt"
+    path.write_text("This sentence is about pumps. " * 200)
+    chunks = chunker.chunk_file(str(path), strategy="tokens", chunk_tokens=64, overlap_tokens=8)
+    assert iter(chunks) is chunks  # produced lazily, not as a list
+    chunks = list(chunks)
+    assert len(chunks) > 1
+    assert all(chunker.estimate_tokens(c) <= 65 for c in chunks)
+    assert all(c.startswith("This sentence") and c.endswith("pumps.") for c in chunks)
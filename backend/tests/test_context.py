@@ -0,0 +1,43 @@
+import os
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services.chunker import estimate_tokens
+from app.services.context import overlap_length, merge_chunks, pack_context
+from app.utils import chunk_text
+
+TEXT = " ".join(f"Sentence {i} talks about subject {i % 7} in some detail." for i in range(60))
+
+def _meta(doc_id, position):
+    return {"doc_id": doc_id, "position": position}
+
+def test_overlap_length():
+    assert overlap_length("the quick brown fox jumps over", "fox jumps over the lazy dog", 8) == len("fox jumps over")
+    assert overlap_length("abcdefgh", "xyz", 2) == 0
+    assert overlap_length("short", "short") == 0  # below the minimum
+
+def test_adjacent_chunks_merge_without_overlap():
+    chunks = chunk_text(TEXT, 200, 40)
+    # Retrieved out of order: positions 3, 1, 2 of one document
+    docs = [chunks[3], chunks[1], chunks[2]]
+    metas = [_meta("d", 3), _meta("d", 1), _meta("d", 2)]
+    assert merge_chunks(docs, metas) == [TEXT[160:200 + 3 * 160]]
+
+def test_gaps_documents_order_and_duplicates():
+    chunks = chunk_text(TEXT, 200, 40)
+    docs = [chunks[5], "other document", chunks[1], chunks[5], "loose chunk"]
+    metas = [_meta("a", 5), _meta("b", 0), _meta("a", 1), _meta("a", 5), None]
+    # Document "a" first (best rank), its chunks in source order; the duplicate is dropped
+    assert merge_chunks(docs, metas) == [chunks[1], chunks[5], "other document", "loose chunk"]
+
+def test_pack_context_budget():
+    chunks = chunk_text(TEXT, 200, 40)
+    docs, metas = chunks[:6], [_meta("d", i) for i in range(6)]
+    context, stats = pack_context(docs, metas, max_tokens=0)
+    assert stats["tokens"] < stats["raw_tokens"] and not stats["truncated"]
+    assert stats["passages"] == 1 and stats["chunks"] == 6
+
+    context, stats = pack_context(docs, metas, max_tokens=100)
+    assert stats["truncated"] and estimate_tokens(context) <= 101
+    assert TEXT.startswith(context)
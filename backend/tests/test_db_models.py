@@ -0,0 +1,48 @@
+import os
+import pytest
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.models import db_models
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["ragdb_test"]
+    monkeypatch.setattr(db_models, "documents_collection", db.documents)
+    monkeypatch.setattr(db_models, "chunks_collection", db.chunks)
+    monkeypatch.setattr(db_models, "jobs_collection", db.jobs)
+    db_models.ensure_indexes()
+    return db
+
+def _chunks(n, doc_id="doc_1"):
+    return [
+        {"chunk_id": f"{doc_id}_{i}", "doc_id": doc_id, "content_hash": f"h{i}", "position": i, "text": "x" * 100}
+        for i in range(n)
+    ]
+
+def test_bulk_insert_stores_reference_only(mongo):
+    assert db_models.insert_chunks_metadata(_chunks(5), batch_size=2) == 5
+    row = mongo.chunks.find_one({"chunk_id": "doc_1_3"})
+    assert row["position"] == 3 and row["content_hash"] == "h3"
+    assert "text" not in row
+
+def test_bulk_insert_skips_existing_chunks(mongo):
+    db_models.insert_chunks_metadata(_chunks(3))
+    assert db_models.insert_chunks_metadata(_chunks(5)) == 2
+    assert mongo.chunks.count_documents({}) == 5
+
+def test_document_upsert_keeps_created_at(mongo):
+    assert not db_models.upsert_document_metadata("a.txt", "p1", 3, 10, "doc_a")
+    created = mongo.documents.find_one({"doc_id": "doc_a"})["created_at"]
+    assert db_models.upsert_document_metadata("a.txt", "p2", 5, 12, "doc_a")
+    row = mongo.documents.find_one({"doc_id": "doc_a"})
+    assert mongo.documents.count_documents({}) == 1
+    assert row["created_at"] == created and row["num_chunks"] == 5 and row["filepath"] == "p2"
+
+def test_bulk_delete_chunks(mongo):
+    db_models.insert_chunks_metadata(_chunks(5))
+    assert db_models.delete_chunks_metadata(["doc_1_0", "doc_1_1", "nope"], batch_size=2) == 2
+    stored = {c["chunk_id"]: c["position"] for c in db_models.get_document_chunks("doc_1")}
+    assert stored == {"doc_1_2": 2, "doc_1_3": 3, "doc_1_4": 4}
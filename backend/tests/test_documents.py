@@ -0,0 +1,142 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Flask
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import app.config as config
+from app.models import db_models
+from app.routes.metadata import metadata_bp
+from app.services import compactor, corpus_version, ingest, vector_store
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_backends import NumpyStore
+from app.utils import content_hash
+
+def _embed(texts):
+    # Deterministic vectors per text; the tests never call the embeddings API
+    return [np.random.default_rng(int(content_hash(t)[:8], 16)).standard_normal(8).tolist() for t in texts]
+
+@pytest.fixture
+def corpus(monkeypatch, tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["ragdb_test"]
+    for name in ("documents", "chunks", "jobs"):
+        monkeypatch.setattr(db_models, f"{name}_collection", db[name])
+
+    # mongomock cannot replay UpdateOne ops from newer pymongo (they carry a sort field)
+    def bulk_write(ops, ordered=True):
+        for op in ops:
+            db_models.chunks_collection.update_one(op._filter, op._doc)
+
+    monkeypatch.setattr(db_models.chunks_collection, "bulk_write", bulk_write)
+    store, index = NumpyStore(persist=False), LexicalIndex()
+    monkeypatch.setattr(vector_store, "store", store)
+    monkeypatch.setattr(ingest, "store", store)
+    monkeypatch.setattr(vector_store, "lexical_index", index)
+    monkeypatch.setitem(compactor._INDEXES, "vector_store", store)
+    monkeypatch.setitem(compactor._INDEXES, "lexical_index", index)
+    monkeypatch.setattr(ingest, "create_embeddings", _embed)
+    # One chunk per paragraph, so each test controls exactly which chunks a document has
+    monkeypatch.setattr(ingest, "chunk_file", lambda path, **options: open(path).read().split("\n\n"))
+    monkeypatch.setattr(corpus_version, "VERSION_FILE", str(tmp_path / "corpus_version"))
+    monkeypatch.setattr(corpus_version, "LOCK_FILE", str(tmp_path / "corpus_version.lock"))
+    return SimpleNamespace(db=db, store=store, index=index, tmp_path=tmp_path)
+
+def _ingest(corpus, doc_id, paragraphs):
+    path = corpus.tmp_path / f"{doc_id}.txt"
+    path.write_text("\n\n".join(paragraphs))
+    result = ingest.process_and_store_file(str(path), doc_id=doc_id)
+    assert result["status"] == "success", result
+    return result
+
+@pytest.fixture
+def client(corpus):
+    app = Flask(__name__)
+    app.register_blueprint(metadata_bp, url_prefix="/metadata", strict_slashes=False)
+    return app.test_client()
+
+def test_delete_route_tombstones_document(corpus, client):
+    _ingest(corpus, "manual", ["pump seal QX-100", "valve gasket", "relay wiring"])
+    _ingest(corpus, "notes", ["pump maintenance log"])
+    version = corpus_version.get_version()
+
+    res = client.delete("/metadata/manual")
+    assert res.status_code == 200
+    assert res.get_json() == {"doc_id": "manual", "chunks_deleted": 3, "status": "deleted"}
+
+    # Gone from every index at once, but only tombstoned until compaction
+    assert corpus.store.count() == 1 and corpus.store.stats()["tombstones"] == 3
+    assert corpus.index.stats()["tombstones"] == 3
+    assert [h[1] for h in corpus.index.search("pump")] == ["notes"]
+    assert corpus.store.get(where={"doc_id": "manual"})["ids"] == []
+    assert corpus.db.chunks.count_documents({"doc_id": "manual"}) == 0
+    assert corpus.db.documents.count_documents({"doc_id": "manual"}) == 0
+    assert corpus_version.get_version() == version + 1
+
+def test_delete_unknown_document_is_404(corpus, client):
+    version = corpus_version.get_version()
+    res = client.delete("/metadata/missing")
+    assert res.status_code == 404
+    assert "missing" in res.get_json()["error"]
+    assert corpus_version.get_version() == version
+
+def test_delete_catches_vectors_without_mongo_rows(corpus):
+    _ingest(corpus, "manual", ["pump seal", "valve gasket"])
+    corpus.db.chunks.delete_many({"doc_id": "manual"})  # e.g. an interrupted ingest
+    assert ingest.delete_document("manual") == 2
+    assert corpus.store.count() == 0
+
+def test_compaction_threshold(monkeypatch):
+    monkeypatch.setattr(config, "COMPACT_MIN_TOMBSTONES", 10)
+    monkeypatch.setattr(config, "COMPACT_TOMBSTONE_RATIO", 0.2)
+    assert compactor._due({"tombstones": 10, "tombstone_ratio": 0.2})
+    assert not compactor._due({"tombstones": 9, "tombstone_ratio": 0.9})   # too few to bother
+    assert not compactor._due({"tombstones": 500, "tombstone_ratio": 0.1})  # too small a share
+
+def test_compactor_purges_indexes_past_threshold(corpus, monkeypatch):
+    _ingest(corpus, "manual", [f"part {i} spec" for i in range(8)])
+    _ingest(corpus, "notes", ["pump maintenance log", "filter change"])
+    ingest.delete_document("notes")
+    monkeypatch.setattr(config, "COMPACT_MIN_TOMBSTONES", 1)
+    monkeypatch.setattr(config, "COMPACT_TOMBSTONE_RATIO", 0.5)
+    assert compactor.compact() == {}  # 2 of 10 rows deleted: below the ratio
+    assert compactor.compact(force=True) == {"vector_store": 2, "lexical_index": 2}
+
+    stats = compactor.report()
+    assert stats["vector_store"]["tombstones"] == stats["lexical_index"]["tombstones"] == 0
+    assert corpus.store.count() == 8 and len(corpus.index) == 8
+    assert compactor.compact(force=True) == {}
+
+def test_diff_counts_added_moved_unchanged_removed(corpus):
+    _ingest(corpus, "manual", ["alpha", "bravo", "charlie", "echo"])
+    records = ingest.build_chunk_records(["alpha", "xray", "bravo", "echo"], "manual")
+    diff = ingest.diff_chunk_records("manual", records)
+    assert ingest.diff_report(diff) == {"added": 1, "moved": 1, "unchanged": 2, "removed": 1}
+    assert [c["text"] for c in diff["write"]] == ["xray", "bravo"]
+    assert diff["removed_ids"] == [f"manual_{content_hash('charlie')[:16]}"]
+
+def test_reingest_updates_document_in_place(corpus):
+    _ingest(corpus, "manual", ["alpha", "bravo", "charlie", "echo"])
+    result = _ingest(corpus, "manual", ["alpha", "xray", "bravo", "echo"])
+    assert result["diff"] == {"added": 1, "moved": 1, "unchanged": 2, "removed": 1}
+    assert result["embeddings_created"] == 1  # only the new paragraph is embedded
+
+    removed = f"manual_{content_hash('charlie')[:16]}"
+    assert corpus.store.count() == 4
+    assert corpus.store.get(ids=[removed])["ids"] == []
+    assert removed not in corpus.index and corpus.index.search("charlie") == []
+    rows = {c["chunk_id"]: c["position"] for c in corpus.db.chunks.find({"doc_id": "manual"})}
+    assert removed not in rows and len(rows) == 4
+    assert rows[f"manual_{content_hash('bravo')[:16]}"] == 2
+    assert corpus.db.documents.find_one({"doc_id": "manual"})["num_chunks"] == 4
+
+def test_reingest_of_unchanged_document_writes_nothing(corpus):
+    _ingest(corpus, "manual", ["alpha", "bravo"])
+    result = _ingest(corpus, "manual", ["alpha", "bravo"])
+    assert result["diff"] == {"added": 0, "moved": 0, "unchanged": 2, "removed": 0}
+    assert result["embeddings_created"] == 0
+    assert corpus.store.stats()["tombstones"] == 0
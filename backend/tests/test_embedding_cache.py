@@ -0,0 +1,37 @@
+import pytest
+from app.services.embedding_cache import EmbeddingCache
+
+MODEL = "nomic-embed-text-v1.5"
+
+@pytest.fixture
+def cache():
+    return EmbeddingCache(max_size=2, ttl=60)
+
+def test_normalized_hit(cache):
+    cache.put("What is  AI?", MODEL, [0.1, 0.2])
+    assert cache.get("what is ai?", MODEL) == [0.1, 0.2]
+    assert cache.get("what is ai?", "other-model") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_lru_eviction(cache):
+    cache.put("a", MODEL, [1.0])
+    cache.put("b", MODEL, [2.0])
+    cache.get("a", MODEL)
+    cache.put("c", MODEL, [3.0])
+    assert cache.get("b", MODEL) is None
+    assert cache.get("a", MODEL) == [1.0]
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry():
+    cache = EmbeddingCache(max_size=4, ttl=-1)
+    cache.put("a", MODEL, [1.0])
+    assert cache.get("a", MODEL) is None
+    assert cache.stats()["expired"] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(disk_path=path).put("a", MODEL, [0.5, 0.25])
+    fresh = EmbeddingCache(disk_path=path)
+    assert fresh.get("a", MODEL) == [0.5, 0.25]
+    assert fresh.stats()["disk_hits"] == 1
@@ -0,0 +1,105 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import groq
+
+import app.config as config
+from app.services import embeddings
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    # One token per word keeps the token limits easy to reason about
+    monkeypatch.setattr(embeddings, "estimate_tokens", lambda text: len(text.split()))
+
+def _rate_limited(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.groq.test/embeddings"))
+    return groq.RateLimitError("rate limited", response=response, body=None)
+
+def _embedding_response(texts, reverse=False):
+    data = [SimpleNamespace(index=i, embedding=[float(t.split()[-1])]) for i, t in enumerate(texts)]
+    return SimpleNamespace(data=data[::-1] if reverse else data)
+
+class StubClient:
+    """
+    Stands in for the Groq client: fails the first `failures` calls, then
+    answers after `delay(texts)` seconds with items in reverse order.
+    """
+    def __init__(self, failures=(), delay=lambda texts: 0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = []
+        self.embeddings = self
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        if self.failures:
+            raise self.failures.pop(0)
+        delay = self.delay(input)
+        if delay:
+            time.sleep(delay)
+        return _embedding_response(input, reverse=True)
+
+def test_batches_respect_item_limit(word_tokens):
+    batches = embeddings.make_batches([f"t {i}" for i in range(5)], max_items=2, max_tokens=100)
+    assert [(start, len(batch)) for start, batch in batches] == [(0, 2), (2, 2), (4, 1)]
+
+def test_batches_respect_token_limit(word_tokens):
+    texts = ["a b c", "d e", "f g h i", "j"]
+    batches = embeddings.make_batches(texts, max_items=10, max_tokens=5)
+    assert batches == [(0, ["a b c", "d e"]), (2, ["f g h i", "j"])]
+
+def test_oversized_text_gets_its_own_batch(word_tokens):
+    texts = ["a", "b " * 50, "c"]
+    batches = embeddings.make_batches(texts, max_items=10, max_tokens=5)
+    assert batches == [(0, ["a"]), (1, ["b " * 50]), (2, ["c"])]
+
+def test_retry_after_header_is_honoured():
+    assert embeddings._retry_delay(0, _rate_limited("3")) == 3.0
+
+def test_backoff_jitter_stays_within_cap(monkeypatch):
+    monkeypatch.setattr(config, "EMBED_BACKOFF_BASE", 0.5)
+    monkeypatch.setattr(config, "EMBED_BACKOFF_MAX", 4.0)
+    for attempt, cap in ((0, 0.5), (2, 2.0), (10, 4.0)):
+        delays = [embeddings._retry_delay(attempt, _rate_limited()) for _ in range(200)]
+        assert all(0 <= d <= cap for d in delays)
+        assert max(delays) > cap / 2  # full jitter spreads over the whole range
+    # A malformed Retry-After falls back to jittered backoff
+    assert 0 <= embeddings._retry_delay(0, _rate_limited("soon")) <= 0.5
+
+def test_embed_batch_retries_transient_errors(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(embeddings.time, "sleep", sleeps.append)
+    stub = StubClient(failures=[_rate_limited("0.25"), _rate_limited("0.5")])
+    monkeypatch.setattr(embeddings, "client", stub)
+    # Items come back reversed; `index` puts them in input order
+    assert embeddings._embed_batch(["t 1", "t 2"], "m") == [[1.0], [2.0]]
+    assert sleeps == [0.25, 0.5] and len(stub.calls) == 3
+
+def test_embed_batch_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(config, "EMBED_MAX_RETRIES", 2)
+    monkeypatch.setattr(embeddings.time, "sleep", lambda seconds: None)
+    stub = StubClient(failures=[_rate_limited("0")] * 5)
+    monkeypatch.setattr(embeddings, "client", stub)
+    with pytest.raises(groq.RateLimitError):
+        embeddings._embed_batch(["t 1"], "m")
+    assert len(stub.calls) == 3
+
+def test_batches_reassembled_in_input_order(monkeypatch, word_tokens):
+    monkeypatch.setattr(config, "EMBEDDING_PROVIDER", "groq")
+    monkeypatch.setattr(config, "EMBED_BATCH_MAX_ITEMS", 2)
+    # Earlier batches answer later, so batches complete in reverse order
+    delays = {"t 0": 0.3, "t 2": 0.2, "t 4": 0.1}
+    stub = StubClient(delay=lambda texts: delays.get(texts[0], 0.0))
+    monkeypatch.setattr(embeddings, "client", stub)
+    texts = [f"t {i}" for i in range(8)]
+    assert embeddings.create_embeddings(texts, model="m") == [[float(i)] for i in range(8)]
+    assert len(stub.calls) == 4
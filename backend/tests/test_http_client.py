@@ -0,0 +1,47 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services import http_client
+
+def _handler(request):
+    if request.url.path.endswith("/embeddings"):
+        return httpx.Response(200, json={"data": [{"embedding": [0.5, 0.5]}], "input": json.loads(request.content)["input"]})
+    body = 'data: {"choices": [{"delta": {"content": "Hi"}}]}\n\ndata: [DONE]\n\n'
+    return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+def _mock_client():
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+    http_client._async_clients[asyncio.get_running_loop()] = client
+    return client
+
+def test_async_post_and_stream():
+    async def main():
+        _mock_client()
+        res = await http_client.agroq_post("/embeddings", {"input": "q", "model": "m"})
+        lines = [line async for line in http_client.agroq_stream("/chat/completions", {"stream": True})]
+        await http_client.aclose()
+        return res, lines
+
+    res, lines = asyncio.run(main())
+    assert res.status_code == 200 and res.json()["input"] == "q"
+    assert [line for line in lines if line] == ['data: {"choices": [{"delta": {"content": "Hi"}}]}', "data: [DONE]"]
+
+def test_async_client_is_per_event_loop():
+    async def clients():
+        first, second = http_client.get_async_client(), http_client.get_async_client()
+        await http_client.aclose()
+        return first, second
+
+    a1, a2 = asyncio.run(clients())
+    b1, _ = asyncio.run(clients())
+    assert a1 is a2
+    assert a1 is not b1
+    assert a1.is_closed and b1.is_closed
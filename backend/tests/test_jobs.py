@@ -0,0 +1,105 @@
+import io
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import app.config as config
+from app.models import db_models
+from app.routes import upload
+from app.services import jobs
+
+@pytest.fixture
+def mongo(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["ragdb_test"]
+    monkeypatch.setattr(db_models, "documents_collection", db.documents)
+    monkeypatch.setattr(db_models, "chunks_collection", db.chunks)
+    monkeypatch.setattr(db_models, "jobs_collection", db.jobs)
+    db_models.ensure_indexes()
+    return db
+
+def _age(mongo, job_id, seconds):
+    mongo.jobs.update_one({"job_id": job_id}, {"$set": {"updated_at": datetime.utcnow() - timedelta(seconds=seconds)}})
+
+def test_claim_is_atomic_and_records_owner(mongo):
+    db_models.create_job("job_1", "a.txt", "/tmp/a.txt")
+    job = db_models.claim_job("job_1", owner="host:1")
+    assert job["status"] == "running" and job["owner"] == "host:1"
+    assert db_models.claim_job("job_1", owner="host:2") is None
+
+def test_only_jobs_without_a_live_lease_are_requeued(mongo):
+    for job_id in ("job_alive", "job_orphan"):
+        db_models.create_job(job_id, f"{job_id}.txt", "/tmp/x")
+        db_models.claim_job(job_id, owner="host:1")
+        _age(mongo, job_id, 3600)
+    # The owner renews its live job; a lease held by someone else is not renewed
+    assert db_models.heartbeat_jobs(["job_alive"], "host:1") == 1
+    assert db_models.heartbeat_jobs(["job_orphan"], "host:2") == 0
+
+    assert db_models.requeue_stale_jobs(datetime.utcnow() - timedelta(seconds=600)) == 1
+    assert db_models.get_job("job_alive")["status"] == "running"
+    orphan = db_models.get_job("job_orphan")
+    assert orphan["status"] == "queued" and orphan["owner"] is None
+
+def test_running_job_renews_its_lease(mongo, monkeypatch):
+    release = threading.Event()
+
+    def slow_ingest(path, filename=None, progress=None, doc_id=None):
+        release.wait(10)
+        return {"status": "success", "chunks": 1}
+
+    monkeypatch.setattr(config, "INGEST_PIPELINE", False)
+    monkeypatch.setattr(config, "JOB_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(jobs, "process_and_store_file", slow_ingest)
+    db_models.create_job("job_1", "a.txt", "/tmp/a.txt")
+    runner = threading.Thread(target=jobs._run, args=("job_1",))
+    runner.start()
+    try:
+        while db_models.get_job("job_1")["status"] != "running":
+            time.sleep(0.01)
+        _age(mongo, "job_1", 3600)
+        time.sleep(0.3)
+        # Still inside one long stage, but the lease is fresh
+        assert db_models.get_job("job_1")["updated_at"] > datetime.utcnow() - timedelta(seconds=5)
+    finally:
+        release.set()
+        runner.join(10)
+    assert db_models.get_job("job_1")["status"] == "succeeded"
+    assert "job_1" not in jobs._running
+
+@pytest.fixture
+def client(mongo, monkeypatch, tmp_path):
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    app = Flask(__name__)
+    app.register_blueprint(upload.upload_bp, url_prefix="/upload", strict_slashes=False)
+    return app.test_client()
+
+def _post(client, *names):
+    files = [(io.BytesIO(b"pump manual"), name) for name in names]
+    return client.post("/upload/", data={"files": files}, content_type="multipart/form-data")
+
+def test_upload_reports_error_when_nothing_was_queued(client, monkeypatch):
+    def broken_enqueue(file_path, filename, doc_id=None):
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr(jobs, "enqueue", broken_enqueue)
+    res = _post(client, "a.txt", "b.txt")
+    assert res.status_code == 500
+    assert [r["status"] for r in res.get_json()["uploaded"]] == ["failed", "failed"]
+
+def test_upload_queues_jobs_and_reports_status(client, monkeypatch):
+    monkeypatch.setattr(jobs, "schedule", lambda job_id: None)
+    res = _post(client, "a.txt")
+    assert res.status_code == 202
+    job_id = res.get_json()["uploaded"][0]["job_id"]
+    status = client.get(f"/upload/jobs/{job_id}")
+    assert status.status_code == 200
+    assert status.get_json()["status"] == "queued"
+    assert client.get("/upload/jobs/job_missing").status_code == 404
@@ -0,0 +1,116 @@
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+def _chunk(i, text):
+    return {"chunk_id": f"c{i}", "doc_id": "d1", "text": text}
+
+def test_tokenize_keeps_identifiers_and_parts():
+    terms = tokenize("Replace gasket AB-1234 now.")
+    assert "ab-1234" in terms
+    assert "1234" in terms
+    assert "gasket" in terms
+
+def test_bm25_ranks_rare_term_first():
+    index = LexicalIndex()
+    index.add([
+        _chunk(0, "The pump moves water through the system."),
+        _chunk(1, "Part QX-48213 is a pump seal."),
+        _chunk(2, "A pump and another pump and a pump."),
+    ])
+    hits = index.search("QX-48213 pump", top_k=3)
+    assert hits[0][0] == "c1"
+    assert index.search("nonexistent") == []
+
+def test_add_is_incremental_and_persisted(tmp_path):
+    path = str(tmp_path / "lexical.jsonl")
+    index = LexicalIndex(path)
+    assert index.add([_chunk(0, "alpha beta"), _chunk(1, "gamma")]) == 2
+    assert index.add([_chunk(1, "gamma")]) == 0  # already indexed
+    index.add([_chunk(2, "alpha delta")])
+
+    reloaded = LexicalIndex(path)
+    assert len(reloaded) == 3
+    assert [h[0] for h in reloaded.search("delta")] == ["c2"]
+    assert reloaded.stats() == index.stats()
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    ids = [i for i, _ in fused]
+    assert ids[0] == "b"
+    assert set(ids) == {"a", "b", "c", "d"}
+
+def test_search_restricted_to_documents():
+    index = LexicalIndex()
+    index.add([
+        {"chunk_id": "a", "doc_id": "d1", "text": "termination clause"},
+        {"chunk_id": "b", "doc_id": "d2", "text": "termination clause"},
+    ])
+    assert [h[0] for h in index.search("termination", doc_ids={"d2"})] == ["b"]
+
+def test_remove_hides_chunks_and_is_persisted(tmp_path):
+    path = str(tmp_path / "lexical.jsonl")
+    index = LexicalIndex(path)
+    index.add([_chunk(0, "alpha beta"), _chunk(1, "alpha gamma")])
+    assert index.remove(["c0", "c9"]) == 1
+    assert [h[0] for h in index.search("alpha")] == ["c1"]
+
+    reloaded = LexicalIndex(path)
+    assert len(reloaded) == 1
+    assert reloaded.search("beta") == []
+    reloaded.add([_chunk(0, "alpha beta")])  # re-added after removal
+    assert {h[0] for h in reloaded.search("alpha")} == {"c0", "c1"}
+
+def test_removed_chunks_do_not_count_towards_idf():
+    index = LexicalIndex()
+    index.add([_chunk(i, "alpha filler") for i in range(10)])
+    index.add([_chunk(10, "alpha beta"), _chunk(11, "beta gamma")])
+    index.remove([f"c{i}" for i in range(10)])
+    hits = index.search("alpha beta")
+    # Matching both terms must rank above matching one, and no score goes negative
+    assert [h[0] for h in hits] == ["c10", "c11"]
+    assert all(score > 0 for _, _, score in hits)
+
+def test_compact_rewrites_postings_and_log(tmp_path):
+    path = str(tmp_path / "lexical.jsonl")
+    index = LexicalIndex(path)
+    index.add([_chunk(i, f"alpha term{i}") for i in range(4)])
+    index.remove(["c0", "c2"])
+    before = index.search("alpha term3")
+    assert index.compact() == 2
+    assert index.stats()["tombstones"] == 0 and index.stats()["postings"] == 4
+    assert [h[0] for h in index.search("alpha term3")] == [h[0] for h in before]
+
+    reloaded = LexicalIndex(path)
+    assert reloaded.stats() == index.stats()
+
+def test_indexes_sharing_a_log_see_each_others_writes(tmp_path):
+    # Two instances on one path stand in for two worker processes
+    path = str(tmp_path / "lexical.jsonl")
+    first, second = LexicalIndex(path), LexicalIndex(path)
+    first.add([_chunk(0, "alpha beta"), _chunk(1, "alpha gamma")])
+    assert {h[0] for h in second.search("alpha")} == {"c0", "c1"}
+    assert second.add([_chunk(1, "alpha gamma")]) == 0  # already added by the other process
+    second.remove(["c0"])
+    assert [h[0] for h in first.search("alpha")] == ["c1"]
+
+def test_compaction_keeps_other_processes_appends(tmp_path):
+    path = str(tmp_path / "lexical.jsonl")
+    first, second = LexicalIndex(path), LexicalIndex(path)
+    first.add([_chunk(i, f"alpha term{i}") for i in range(4)])
+    first.remove(["c0", "c1"])
+    second.add([_chunk(4, "alpha term4")])  # appended after first last read the log
+    assert first.compact() == 2
+    second.add([_chunk(5, "alpha term5")])  # second reloads the replaced log first
+    for index in (first, second, LexicalIndex(path)):
+        assert {h[0] for h in index.search("alpha", top_k=10)} == {"c2", "c3", "c4", "c5"}
+        assert index.stats()["tombstones"] == 0
+
+def test_partial_line_is_left_for_the_next_refresh(tmp_path):
+    path = str(tmp_path / "lexical.jsonl")
+    index = LexicalIndex(path)
+    line = '{"id":"c0","doc":"d1","tf":{"alpha":1}}\n'
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line[:10])
+    assert index.search("alpha") == []
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line[10:])
+    assert [h[0] for h in index.search("alpha")] == ["c0"]
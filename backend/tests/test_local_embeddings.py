@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services import local_embeddings
+
+class LengthModel:
+    # Stands in for a SentenceTransformer: embeds a text as [len(text)]
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **kwargs):
+        self.batches.append([len(t) for t in texts])
+        return np.array([[float(len(t))] for t in texts])
+
+def test_length_batches_group_similar_lengths():
+    texts = ["a" * n for n in (5, 50, 1, 40, 3, 60)]
+    batches = local_embeddings.length_batches(texts, 2)
+    assert [[len(texts[i]) for i in batch] for batch in batches] == [[60, 50], [40, 5], [3, 1]]
+
+def test_embed_returns_input_order():
+    texts = ["x" * n for n in (7, 300, 2, 150, 90)]
+    model = LengthModel()
+    assert local_embeddings.embed(texts, model=model, batch_size=2) == [[7.0], [300.0], [2.0], [150.0], [90.0]]
+    assert model.batches == [[300, 150], [90, 7], [2]]
+
+def test_nomic_gets_query_and_document_prefixes(monkeypatch):
+    monkeypatch.setattr(local_embeddings.config, "EMBEDDING_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+    model = LengthModel()
+    assert local_embeddings.embed(["pump"], model=model, prompt="query") == [[float(len("search_query: pump"))]]
+    assert local_embeddings.embed(["pump"], model=model, prompt="document") == [[float(len("search_document: pump"))]]
+    assert local_embeddings.embed(["pump"], model=model) == [[4.0]]
+
+def test_models_without_prefixes_embed_text_as_is(monkeypatch):
+    monkeypatch.setattr(local_embeddings.config, "EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    assert local_embeddings.embed(["pump"], model=LengthModel(), prompt="query") == [[4.0]]
+    with pytest.raises(ValueError):
+        local_embeddings.prompt_prefix("passage")
+
+def test_call_sites_ask_for_query_or_document_prompt(monkeypatch):
+    from app.services import embeddings, vector_store
+    from app.services.embedding_cache import EmbeddingCache
+
+    prompts = []
+    def fake_embed(texts, prompt=None):
+        prompts.append(prompt)
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(local_embeddings.config, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(local_embeddings, "embed", fake_embed)
+    monkeypatch.setattr(vector_store, "query_embedding_cache", EmbeddingCache(max_size=8))
+    embeddings.create_embeddings(["chunk text"])
+    vector_store.get_text_embedding("question")
+    vector_store.get_text_embeddings(["another question"])
+    assert prompts == ["document", "query", "query"]
@@ -0,0 +1,78 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.models import db_models
+from app.routes.metadata import metadata_bp
+from app.services import corpus_version
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["ragdb_test"]
+    monkeypatch.setattr(db_models, "documents_collection", db.documents)
+    monkeypatch.setattr(corpus_version, "VERSION_FILE", str(tmp_path / "corpus_version"))
+    monkeypatch.setattr(corpus_version, "LOCK_FILE", str(tmp_path / "corpus_version.lock"))
+    start = datetime(2026, 1, 1)
+    for i in range(7):
+        db.documents.insert_one({
+            "doc_id": f"doc_{i}",
+            "filename": f"report_{i % 2}.pdf",
+            "filepath": f"uploads/report_{i}.pdf",
+            "num_chunks": i,
+            "file_size": 100,
+            "created_at": start + timedelta(days=i // 2)  # pairs share a timestamp
+        })
+    corpus_version.bump()
+
+    app = Flask(__name__)
+    app.register_blueprint(metadata_bp, url_prefix="/metadata", strict_slashes=False)
+    return app.test_client()
+
+def test_pages_follow_cursor_without_gaps(client):
+    seen, cursor = [], None
+    while True:
+        url = "/metadata/?limit=3&fields=doc_id" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        assert len(page["documents"]) <= 3
+        seen += [d["doc_id"] for d in page["documents"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"doc_{i}" for i in range(6, -1, -1)]
+
+def test_fields_and_filters(client):
+    res = client.get("/metadata/?filename=REPORT_1&created_after=2026-01-02&fields=doc_id,num_chunks")
+    assert res.get_json()["documents"] == [{"doc_id": "doc_5", "num_chunks": 5}, {"doc_id": "doc_3", "num_chunks": 3}]
+    assert client.get("/metadata/?fields=text").status_code == 400
+    assert client.get("/metadata/?cursor=not-a-cursor").status_code == 400
+
+def test_etag_revalidation(client):
+    first = client.get("/metadata/")
+    etag = first.headers["ETag"]
+    assert client.get("/metadata/", headers={"If-None-Match": etag}).status_code == 304
+    corpus_version.bump()
+    assert client.get("/metadata/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_back_to_back_bumps_are_all_seen(client):
+    # Bumps within one mtime tick must still change the version readers see;
+    # pin the mtime to simulate a filesystem with coarse timestamps
+    st = os.stat(corpus_version.VERSION_FILE)
+    before = corpus_version.get_version()
+    for expected in range(before + 1, before + 4):
+        corpus_version.bump()
+        os.utime(corpus_version.VERSION_FILE, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert corpus_version.get_version() == expected
+
+def test_export_streams_ndjson(client):
+    res = client.get("/metadata/export?fields=doc_id,created_at")
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert len(rows) == 7
+    assert rows[0] == {"doc_id": "doc_6", "created_at": "2026-01-04T00:00:00"}
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services import ingest, pipeline
+
+@pytest.fixture
+def stores(monkeypatch, tmp_path):
+    calls = {"add": [], "insert": [], "save": []}
+
+    def fake_add(chunks, embeddings, batch_size=None, progress=None):
+        calls["add"].append(len(chunks))
+        return {"added": len(chunks), "failed": []}
+
+    def fake_insert(chunks, batch_size=None):
+        calls["insert"].append(len(chunks))
+        return len(chunks)
+
+    def fake_save(*args, insert_chunks=True):
+        calls["save"].append(insert_chunks)
+
+    monkeypatch.setattr(ingest, "get_document_chunks", lambda doc_id: [])
+    monkeypatch.setattr(pipeline, "embed_chunk_records", lambda chunks: ([[0.0]] * len(chunks), len(chunks)))
+    monkeypatch.setattr(pipeline, "add_embeddings", fake_add)
+    monkeypatch.setattr(pipeline, "insert_chunks_metadata", fake_insert)
+    monkeypatch.setattr(pipeline, "save_metadata", fake_save)
+    monkeypatch.setattr(pipeline.corpus_version, "bump", lambda: None)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc_{i}.txt"
+        path.write_text(f"Document {i} talks about pumps. " * 40)
+        paths.append(str(path))
+    return calls, paths
+
+def test_chunk_metadata_is_inserted_once_per_write_batch(stores):
+    calls, paths = stores
+    pipe = pipeline.IngestPipeline(extract_workers=1, embed_workers=1, write_batch_size=10_000)
+    try:
+        futures = [pipe.submit(path) for path in paths]
+        results = [f.result(timeout=60) for f in futures]
+    finally:
+        pipe.close()
+    assert all(r["status"] == "success" for r in results)
+    assert sum(calls["insert"]) == sum(r["chunks"] for r in results)
+    # One Mongo chunk insert per vector upsert, however many documents a flush holds
+    assert len(calls["insert"]) == len(calls["add"])
+    assert calls["save"] == [False] * 3
+
+def test_failing_progress_and_stage_errors_resolve_futures(stores, monkeypatch):
+    calls, paths = stores
+
+    def broken_progress(stage, done=None, total=None):
+        raise RuntimeError("job store down")
+
+    real_getsize = os.path.getsize
+
+    def getsize(path):
+        if path == paths[1]:
+            raise OSError("gone")
+        return real_getsize(path)
+
+    monkeypatch.setattr(pipeline.os.path, "getsize", getsize)
+    pipe = pipeline.IngestPipeline(extract_workers=1, embed_workers=1)
+    try:
+        futures = [pipe.submit(path, progress=broken_progress) for path in paths]
+        results = [f.result(timeout=60) for f in futures]
+    finally:
+        pipe.close()
+    # Progress failures are ignored; the getsize error fails only its document
+    assert [r.get("status") for r in results] == ["success", None, "success"]
+    assert "gone" in results[1]["error"]
@@ -0,0 +1,144 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.routes import query
+from app.services import corpus_version, http_client
+from app.services.answer_cache import SemanticAnswerCache
+
+def _embedding(text):
+    # Distinct questions get orthogonal-ish vectors, so the answer cache never confuses them
+    vec = [0.0] * 16
+    vec[sum(map(ord, text)) % 16] = 1.0
+    return vec
+
+def _docs(question):
+    return {
+        "documents": [[f"context for {question}"]],
+        "metadatas": [[{"chunk_id": f"c-{question}", "doc_id": "manual"}]]
+    }
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(corpus_version, "VERSION_FILE", str(tmp_path / "corpus_version"))
+    monkeypatch.setattr(query, "answer_cache", SemanticAnswerCache(max_size=16))
+    monkeypatch.setattr(query, "get_text_embedding", _embedding)
+    monkeypatch.setattr(query, "get_text_embeddings", lambda texts: [_embedding(t) for t in texts])
+    monkeypatch.setattr(query, "search_embeddings", lambda q, **options: _docs(q))
+    app = Flask(__name__)
+    app.register_blueprint(query.query_bp, url_prefix="/query", strict_slashes=False)
+    return app.test_client()
+
+def _events(res):
+    events = []
+    for block in res.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def _stream_lines(*deltas, fail=False):
+    def groq_stream(path, payload):
+        for delta in deltas:
+            yield "data: " + json.dumps({"choices": [{"delta": {"content": delta}}]})
+            yield ""
+        if fail:
+            raise ConnectionError("upstream reset")
+        yield "data: " + json.dumps({"choices": [], "x_groq": {"usage": {"prompt_tokens": 12}}})
+        yield "data: [DONE]"
+    return groq_stream
+
+def test_stream_sends_metadata_then_tokens_then_done(client, monkeypatch):
+    monkeypatch.setattr(http_client, "groq_stream", _stream_lines("Check ", "the seal."))
+    res = client.post("/query/stream", json={"query": "pump leak?"})
+    assert res.mimetype == "text/event-stream"
+    events = _events(res)
+    assert [name for name, _ in events] == ["metadata", "token", "token", "done"]
+    assert events[0][1]["chunk_ids"] == ["c-pump leak?"] and events[0][1]["doc_ids"] == ["manual"]
+    assert "".join(data["delta"] for name, data in events if name == "token") == "Check the seal."
+    assert events[-1][1]["answer_chars"] == len("Check the seal.")
+    assert events[-1][1]["usage"] == {"prompt_tokens": 12}
+
+    # The same question is then replayed from the answer cache in the same order
+    events = _events(client.post("/query/stream", json={"query": "pump leak?"}))
+    assert [name for name, _ in events] == ["metadata", "token", "done"]
+    assert events[0][1]["cached"] and events[1][1]["delta"] == "Check the seal."
+
+def test_stream_ends_with_error_when_upstream_fails(client, monkeypatch):
+    monkeypatch.setattr(http_client, "groq_stream", _stream_lines("Check ", fail=True))
+    events = _events(client.post("/query/stream", json={"query": "pump leak?"}))
+    assert [name for name, _ in events] == ["metadata", "token", "error"]
+    assert "upstream reset" in events[-1][1]["answer"]
+    # A failed stream is not cached
+    events = _events(client.post("/query/stream", json={"query": "pump leak?"}))
+    assert events[-1][0] == "error"
+
+def test_stream_rejects_empty_query(client):
+    assert client.post("/query/stream", json={"query": "  "}).status_code == 400
+
+@pytest.fixture
+def batch_client(client, monkeypatch):
+    calls = SimpleNamespace(dense=[], completions=[])
+
+    def dense_search_batch(embeddings, **options):
+        calls.dense.append(len(embeddings))
+        return [None] * len(embeddings)
+
+    def finish_search(question, dense, **options):
+        if question == "broken?":
+            raise RuntimeError("index unavailable")
+        return _docs(question)
+
+    def groq_post(path, payload):
+        question = payload["messages"][1]["content"].rsplit("\n", 1)[-1]
+        calls.completions.append(question)
+        # Earlier questions finish later, so completions arrive out of request order
+        time.sleep(0.05 * (3 - len(calls.completions) % 3))
+        if question == "timeout?":
+            return SimpleNamespace(status_code=503, text="upstream down")
+        return SimpleNamespace(status_code=200, text="", json=lambda: {
+            "choices": [{"message": {"content": f"answer to {question}"}}]
+        })
+
+    monkeypatch.setattr(query, "dense_search_batch", dense_search_batch)
+    monkeypatch.setattr(query, "finish_search", finish_search)
+    monkeypatch.setattr(http_client, "groq_post", groq_post)
+    return client, calls
+
+def test_batch_streams_lines_in_request_order(batch_client):
+    client, calls = batch_client
+    questions = ["pump?", "valve?", "pump?", "broken?", "timeout?", "relay?"]
+    res = client.post("/query/batch", json={"queries": questions})
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+
+    assert [(l["index"], l["query"]) for l in lines] == list(enumerate(questions))
+    assert [l["status"] for l in lines] == [200, 200, 200, 500, 500, 200]
+    assert lines[0]["answer"] == lines[2]["answer"] == "answer to pump?"
+    # Per-line errors carry the failure instead of failing the whole batch
+    assert "index unavailable" in lines[3]["answer"]
+    assert lines[4]["answer"] == "Groq API request failed." and lines[4]["details"] == "upstream down"
+
+    # The repeated question is searched and answered once
+    assert calls.dense == [5]
+    assert sorted(calls.completions) == ["pump?", "relay?", "timeout?", "valve?"]
+
+def test_batch_serves_repeats_from_answer_cache(batch_client):
+    client, calls = batch_client
+    client.post("/query/batch", json={"queries": ["pump?"]})
+    res = client.post("/query/batch", json={"queries": ["pump?", "valve?"]})
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert lines[0]["cached"] and "cached" not in lines[1]
+    assert calls.dense == [1, 1]
+
+def test_batch_rejects_malformed_queries(batch_client):
+    client, _ = batch_client
+    assert client.post("/query/batch", json={"queries": []}).status_code == 400
+    assert client.post("/query/batch", json={"queries": ["ok", ""]}).status_code == 400
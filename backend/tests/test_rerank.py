@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.services.rerank import mmr
+
+QUERY = [1.0, 0.0, 0.0]
+# Two near-duplicates of the best match, one distinct but relevant chunk, one off-topic
+CANDIDATES = [
+    [0.95, 0.30, 0.0],
+    [0.94, 0.31, 0.0],
+    [0.80, 0.0, 0.60],
+    [0.0, 1.0, 0.0],
+]
+
+def test_mmr_skips_near_duplicates():
+    picked, scores = mmr(QUERY, CANDIDATES, 2, lambda_mult=0.5)
+    assert picked == [0, 2]
+    assert scores[0] > scores[1] > 0.7
+
+def test_lambda_one_is_relevance_order():
+    picked, _ = mmr(QUERY, CANDIDATES, 4, lambda_mult=1.0)
+    assert picked == [0, 1, 2, 3]
+
+def test_min_score_trims_weak_candidates():
+    picked, scores = mmr(QUERY, CANDIDATES, 4, lambda_mult=0.5, min_score=0.5)
+    assert sorted(picked) == [0, 1, 2]
+    assert min(scores) >= 0.5
+    assert mmr(QUERY, CANDIDATES, 3, min_score=0.99) == ([], [])
+
+def test_mmr_matches_reference_loop():
+    rng = np.random.default_rng(0)
+    query, candidates = rng.normal(size=16), rng.normal(size=(40, 16))
+    unit = candidates / np.linalg.norm(candidates, axis=1, keepdims=True)
+    relevance = unit @ (query / np.linalg.norm(query))
+    # Textbook MMR with explicit loops
+    expected, remaining = [], list(range(40))
+    for _ in range(8):
+        best = max(remaining, key=lambda c: 0.6 * relevance[c] - 0.4 * max(
+            (unit[c] @ unit[s] for s in expected), default=0.0))
+        expected.append(best)
+        remaining.remove(best)
+    assert mmr(query, candidates, 8, lambda_mult=0.6)[0] == expected
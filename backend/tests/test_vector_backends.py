@@ -0,0 +1,201 @@
+import os
+import numpy as np
+import pytest
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services.vector_backends import NumpyStore, match_where
+
+def _store(tmp_path, **kwargs):
+    return NumpyStore(path=str(tmp_path / "numpy_store"), **kwargs)
+
+def _fill(store):
+    store.upsert(
+        ids=["a", "b", "c"],
+        embeddings=[[1, 0, 0], [0, 1, 0], [0.9, 0.1, 0]],
+        documents=["doc a", "doc b", "doc c"],
+        metadatas=[{"doc_id": "d1"}, {"doc_id": "d2"}, {"doc_id": "d2"}]
+    )
+
+def test_match_where_operators():
+    meta = {"doc_id": "d1", "position": 3}
+    assert match_where(meta, {"doc_id": "d1"})
+    assert match_where(meta, {"$and": [{"doc_id": {"$in": ["d1", "d2"]}}, {"position": {"$gte": 3}}]})
+    assert not match_where(meta, {"$or": [{"doc_id": "d2"}, {"position": {"$lt": 3}}]})
+
+def test_numpy_query_batched_and_filtered(tmp_path):
+    store = _store(tmp_path)
+    _fill(store)
+
+    res = store.query([[1, 0, 0], [0, 1, 0]], top_k=2)
+    assert res["ids"] == [["a", "c"], ["b", "c"]]
+    assert res["documents"][0] == ["doc a", "doc c"]
+    assert res["distances"][0][0] < res["distances"][0][1]
+
+    res = store.query([[1, 0, 0]], top_k=5, where={"doc_id": "d2"})
+    assert res["ids"] == [["c", "b"]]
+
+def test_numpy_upsert_and_reload(tmp_path):
+    store = _store(tmp_path)
+    _fill(store)
+    store.upsert(ids=["b"], embeddings=[[0, 0, 1]], documents=["doc b v2"], metadatas=[{"doc_id": "d2"}])
+    assert store.count() == 3
+
+    reloaded = _store(tmp_path)
+    assert reloaded.count() == 3
+    got = reloaded.get(ids=["b"], include=("documents", "embeddings"))
+    assert got["documents"] == ["doc b v2"]
+    assert np.allclose(got["embeddings"][0], [0, 0, 1])
+
+def test_numpy_float16_matches_float32(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 16)).tolist()
+    ids = [f"v{i}" for i in range(500)]
+    results = []
+    for dtype in ("float32", "float16"):
+        store = NumpyStore(dtype=dtype, persist=False)
+        store.upsert(ids, vectors, None, [{} for _ in ids])
+        results.append(store.query([vectors[7]], top_k=1)["ids"][0])
+    assert results[0] == results[1] == ["v7"]
+
+def _faiss_store(tmp_path, index_type, **kwargs):
+    pytest.importorskip("faiss")
+    from app.services.vector_backends import FaissStore
+    return FaissStore(path=str(tmp_path / "faiss_store"), index_type=index_type, save_every=1, **kwargs)
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_pq", "hnsw"])
+def test_faiss_finds_nearest(tmp_path, index_type):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((2000, 32)).tolist()
+    ids = [f"v{i}" for i in range(2000)]
+    store = _faiss_store(tmp_path, index_type, min_train=1000, pq_m=8)
+    store.upsert(ids[:500], vectors[:500], None, [{} for _ in range(500)])
+    assert (store._index is None) == (index_type.startswith("ivf"))  # exact search until trained
+    store.upsert(ids[500:], vectors[500:], None, [{} for _ in range(1500)])
+    assert store._index is not None and store._indexed == 2000
+
+    res = store.query([vectors[42]], top_k=3, nprobe=64, ef_search=128)
+    assert res["ids"][0][0] == "v42"
+
+def test_faiss_index_reloads_from_disk(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((300, 16)).tolist()
+    ids = [f"v{i}" for i in range(300)]
+    store = _faiss_store(tmp_path, "flat")
+    store.upsert(ids, vectors, None, [{"doc_id": "d"} for _ in ids])
+
+    reloaded = _faiss_store(tmp_path, "flat")
+    assert reloaded._indexed == 300
+    assert reloaded.query([vectors[7]], top_k=1)["ids"] == [["v7"]]
+    reloaded.upsert(["v300"], [vectors[0]], None, [{"doc_id": "d"}])  # writes after an mmapped load
+    assert reloaded._indexed == 301
+
+def test_numpy_filter_uses_partitions(tmp_path):
+    store = NumpyStore(persist=False)
+    rng = np.random.default_rng(3)
+    ids = [f"v{i}" for i in range(1000)]
+    store.upsert(ids, rng.standard_normal((1000, 8)).tolist(), None,
+                 [{"doc_id": f"d{i % 10}", "position": i} for i in range(1000)])
+
+    where = {"$and": [{"doc_id": {"$in": ["d3", "d4"]}}, {"position": {"$lt": 500}}]}
+    assert len(store._candidate_rows(where)) == 200
+    res = store.query([[1] * 8], top_k=500, where=where)
+    metas = res["metadatas"][0]
+    assert len(metas) == 100
+    assert all(m["doc_id"] in ("d3", "d4") and m["position"] < 500 for m in metas)
+
+def test_faiss_filter_through_id_selector(tmp_path, monkeypatch):
+    pytest.importorskip("faiss")
+    import app.config as config
+    monkeypatch.setattr(config, "FAISS_FILTER_EXACT_MAX", 0)
+    rng = np.random.default_rng(4)
+    vectors = rng.standard_normal((600, 16)).tolist()
+    ids = [f"v{i}" for i in range(600)]
+    for index_type in ("flat", "hnsw"):
+        store = _faiss_store(tmp_path / index_type, index_type)
+        store.upsert(ids, vectors, None, [{"doc_id": f"d{i % 3}"} for i in range(600)])
+        res = store.query([vectors[4]], top_k=5, where={"doc_id": "d1"})
+        assert res["ids"][0][0] == "v4"
+        assert all(m["doc_id"] == "d1" for m in res["metadatas"][0])
+
+def test_numpy_delete_masks_rows_and_persists(tmp_path):
+    store = _store(tmp_path)
+    _fill(store)
+    store.delete(["c", "missing"])
+    assert store.count() == 2
+    assert store.query([[1, 0, 0]], top_k=5)["ids"] == [["a", "b"]]
+    assert store.query([[1, 0, 0]], top_k=5, where={"doc_id": "d2"})["ids"] == [["b"]]
+
+    reloaded = _store(tmp_path)
+    assert reloaded.count() == 2
+    assert reloaded.get()["ids"] == ["a", "b"]
+    reloaded.upsert(ids=["c"], embeddings=[[0, 0, 1]], documents=["doc c v2"], metadatas=[{"doc_id": "d2"}])
+    assert reloaded.query([[0, 0, 1]], top_k=1)["documents"] == [["doc c v2"]]
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_faiss_skips_deleted_rows(tmp_path, index_type):
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((300, 16)).tolist()
+    ids = [f"v{i}" for i in range(300)]
+    store = _faiss_store(tmp_path, index_type)
+    store.upsert(ids, vectors, None, [{} for _ in ids])
+    store.delete(["v9"])
+    res = store.query([vectors[9]], top_k=5)
+    assert "v9" not in res["ids"][0] and len(res["ids"][0]) == 5
+
+def test_numpy_compact_purges_tombstones(tmp_path):
+    store = _store(tmp_path)
+    _fill(store)
+    store.delete(["a"])
+    assert store.stats()["tombstone_ratio"] == pytest.approx(1 / 3)
+    assert store.compact() == 1
+    assert store.stats()["tombstones"] == 0 and store._size == 2
+    assert store.query([[1, 0, 0]], top_k=5, where={"doc_id": "d2"})["ids"] == [["c", "b"]]
+    store.upsert(ids=["d"], embeddings=[[0, 0, 1]], documents=["doc d"], metadatas=[{"doc_id": "d3"}])
+
+    reloaded = _store(tmp_path)
+    assert reloaded.get()["ids"] == ["b", "c", "d"]
+    assert not any(name.startswith("segment_000000") for name in os.listdir(tmp_path / "numpy_store"))
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_numpy_snapshot_is_memory_mapped(tmp_path, dtype):
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((50, 8))
+    ids = [f"v{i}" for i in range(50)]
+    store = _store(tmp_path, dtype=dtype)
+    store.upsert(ids, vectors.tolist(), None, [{"doc_id": f"d{i % 5}"} for i in range(50)])
+    store.delete(["v0"])
+    store.compact()
+    store.upsert(["v50"], [vectors[1].tolist()], None, [{"doc_id": "d9"}])  # segment after the snapshot
+
+    reloaded = _store(tmp_path, dtype=dtype)
+    snapshot = os.path.join(reloaded.path, f"snapshot_{reloaded._base:06d}.npy")
+    before = open(snapshot, "rb").read()
+    assert reloaded._frozen_rows == 49 and isinstance(reloaded._frozen, np.memmap)
+    assert reloaded.query([vectors[7]], top_k=1)["ids"] == [["v7"]]
+    assert set(reloaded.query([vectors[1]], top_k=2)["ids"][0]) == {"v1", "v50"}
+    assert reloaded.query([vectors[3]], top_k=1, where={"doc_id": "d3"})["ids"] == [["v3"]]
+
+    # Updates to mapped rows stay in memory; the snapshot file is never written
+    reloaded.upsert(["v7"], [vectors[8].tolist()], None, [{"doc_id": "d2"}])
+    assert set(reloaded.query([vectors[8]], top_k=2)["ids"][0]) == {"v7", "v8"}
+    assert open(snapshot, "rb").read() == before
+    emb = reloaded.get(ids=["v7", "v50"], include=("embeddings",))["embeddings"]
+    assert np.allclose(emb, [vectors[8] / np.linalg.norm(vectors[8]), vectors[1] / np.linalg.norm(vectors[1])], atol=1e-2)
+
+def test_faiss_compact_rebuilds_index(tmp_path):
+    rng = np.random.default_rng(6)
+    vectors = rng.standard_normal((400, 16)).tolist()
+    ids = [f"v{i}" for i in range(400)]
+    store = _faiss_store(tmp_path, "ivf_flat", min_train=100)
+    store.upsert(ids, vectors, None, [{} for _ in ids])
+    store.delete(ids[:200])
+    assert store.compact() == 200
+    assert store._index is not None and store._indexed == 200
+    assert store.query([vectors[250]], top_k=1, nprobe=64)["ids"] == [["v250"]]
+
+    reloaded = _faiss_store(tmp_path, "ivf_flat", min_train=100)
+    assert reloaded.count() == 200 and reloaded._indexed == 200
+    assert reloaded._frozen_rows == 200
+    assert reloaded.query([vectors[250]], top_k=1, nprobe=64)["ids"] == [["v250"]]
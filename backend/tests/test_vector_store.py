@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+# app.config refuses to load without a key; these tests never call Groq
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services import vector_store
+from app.services.lexical_index import LexicalIndex
+
+class FlakyStore:
+    """
+    Vector store stub that caps batches at two rows and fails the second batch.
+    """
+    def __init__(self):
+        self.batches = []
+
+    def max_batch_size(self):
+        return 2
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.batches.append(ids)
+        if len(self.batches) == 2:
+            raise RuntimeError("disk full")
+
+@pytest.fixture
+def flaky_store(monkeypatch):
+    store = FlakyStore()
+    monkeypatch.setattr(vector_store, "store", store)
+    monkeypatch.setattr(vector_store, "lexical_index", LexicalIndex())
+    return store
+
+def test_add_embeddings_batches_and_reports_failed_batch(flaky_store):
+    chunks = [{"chunk_id": f"c{i}", "doc_id": "d1", "text": f"pump part{i}", "position": i} for i in range(5)]
+    done = []
+    result = vector_store.add_embeddings(chunks, [[float(i)] for i in range(5)], batch_size=10, progress=done.append)
+
+    # The store's own limit wins over batch_size, and a failed batch does not stop the rest
+    assert flaky_store.batches == [["c0", "c1"], ["c2", "c3"], ["c4"]]
+    assert result["added"] == 3
+    assert [{k: f[k] for k in ("batch", "start", "end")} for f in result["failed"]] == [{"batch": 1, "start": 2, "end": 4}]
+    assert "disk full" in result["failed"][0]["error"]
+    assert done == [2, 4, 5]
+    # Only chunks whose vectors were stored become searchable by keyword
+    assert "c2" not in vector_store.lexical_index and "c4" in vector_store.lexical_index
+
+def test_add_embeddings_rejects_mismatched_lengths(flaky_store):
+    with pytest.raises(ValueError):
+        vector_store.add_embeddings([{"chunk_id": "c0", "doc_id": "d1", "text": "x"}], [])